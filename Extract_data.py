@@ -1,21 +1,70 @@
 import os
-import re
+import hashlib
+import zipfile
 import tempfile
 import shutil
+import time
 from io import BytesIO
-from collections import defaultdict
-import pandas as pd
+from datetime import date
 import streamlit as st
-import pdfplumber
-from fpdf import FPDF
-from datetime import datetime
-from PIL import Image
-from tempfile import NamedTemporaryFile
-from PyPDF2 import PdfReader
+# Apenas módulos leves no carregamento: pandas (consolidacao), FPDF e openpyxl
+# (relatorios) e os parsers de PDF são importados na primeira etapa que os usa
+from cache_extracao import CacheExtracao
+from historico import HistoricoExtracoes
+from diagnostico import (
+    Diagnostico, configurar_log, exportar_perfil, iniciar_perfil, resumo_perfil
+)
+from extracao import (
+    BACKEND_PADRAO, BACKEND_RESERVA, BACKENDS_TEXTO,
+    criar_pool, pool_quebrado, versao_extracao
+)
+from ingestao import listar_documentos
+from memoria import LimiteMemoria
+from tarefas import CANCELADA, FALHOU, NA_FILA, FilaTarefas, extrair_documentos
 
 # =================== CONFIGURAÇÃO ===================
 st.set_page_config(page_title="CREA-RJ", layout="wide", page_icon="")
 
+CACHE_CAMINHO = os.environ.get(
+    "EXTRATOR_CACHE",
+    os.path.join(tempfile.gettempdir(), "extratorfiscal", "cache_extracao.sqlite")
+)
+HISTORICO_CAMINHO = os.environ.get(
+    "EXTRATOR_HISTORICO",
+    os.path.join(tempfile.gettempdir(), "extratorfiscal", "historico.sqlite")
+)
+CACHE_TAMANHO_MAX = int(os.environ.get("EXTRATOR_CACHE_MB", "512")) * 1024 * 1024
+WORKERS_PADRAO = int(os.environ.get("EXTRATOR_WORKERS", os.cpu_count() or 1))
+# Grava os uploads em disco antes da extração (apenas para parsers que exigem caminho)
+INGESTAO_EM_DISCO = os.environ.get("EXTRATOR_INGESTAO_DISCO") == "1"
+# Documentos em memória por processo de extração (lidos à frente do que está sendo extraído)
+JANELA_POR_PROCESSO = 2
+# Modo de memória limitada: limite de RSS (processo principal e de extração somados)
+MEMORIA_LIMITADA_PADRAO = os.environ.get("EXTRATOR_MEMORIA_LIMITADA") == "1"
+LIMITE_MEMORIA_MB = int(os.environ.get("EXTRATOR_LIMITE_MEMORIA_MB", "1536"))
+# No modo de memória limitada, cada processo de extração é substituído após N arquivos
+TAREFAS_POR_PROCESSO = 50
+LOGO_CAMINHO = "10.png"
+# Extrações em segundo plano executadas ao mesmo tempo no servidor (as demais aguardam na fila)
+TAREFAS_SIMULTANEAS = int(os.environ.get("EXTRATOR_TAREFAS_SIMULTANEAS", "2"))
+# Segundos em que o resultado de uma extração finalizada continua disponível
+RETENCAO_TAREFAS = 3600
+# Segundos entre as consultas ao progresso de uma extração
+INTERVALO_ACOMPANHAMENTO = 1.0
+# Planilhas de autuações já convertidas (Parquet, uma por conteúdo e aba)
+PLANILHAS_CACHE_PASTA = os.environ.get(
+    "EXTRATOR_PLANILHAS_CACHE",
+    os.path.join(tempfile.gettempdir(), "extratorfiscal", "planilhas")
+)
+PLANILHAS_CACHE_TAMANHO_MAX = int(os.environ.get("EXTRATOR_PLANILHAS_CACHE_MB", "1024")) * 1024 * 1024
+# Linhas exibidas na prévia de uma planilha (a consolidação usa todas)
+LINHAS_PREVIA_PLANILHA = 1000
+# Eventos de diagnóstico (um JSON por linha)
+DIAGNOSTICO_LOG = os.environ.get(
+    "EXTRATOR_DIAGNOSTICO_LOG",
+    os.path.join(tempfile.gettempdir(), "extratorfiscal", "diagnostico.jsonl")
+)
+
 # =================== FUNÇÕES AUXILIARES ===================
 def criar_temp_dir():
     """Cria diretório temporário"""
@@ -25,416 +74,313 @@ def limpar_temp_dir(temp_dir):
     """Remove diretório temporário"""
     shutil.rmtree(temp_dir, ignore_errors=True)
 
-def ajustar_texto_para_pdf(texto, largura_max, fonte=8):
-    """Ajusta texto para caber na coluna do PDF"""
-    if not texto:
-        return texto
-    tamanho = len(texto) * fonte * 0.5
-    return texto if tamanho <= largura_max else texto[:int(largura_max/(fonte*0.5))-3] + '...'
-
-def extrair_data_formatada(texto_data):
-    """Extrai e formata a data no padrão dd/mm/yyyy"""
-    padrao_data = re.search(r'(\d{2}/\d{2}/\d{4})', texto_data)
-    return padrao_data.group(1) if padrao_data else texto_data.strip()
-
-# =================== MÓDULO DE EXTRAÇÃO ===================
-def extrair_dados_vinculos_si(texto, filename):
-    """Extrai dados para Vínculos e S.I"""
-    dados = {'Arquivo': filename}
-    
-    # Extrai coordenadas
-    coord = re.search(r"Latitude\s*:\s*([-\d,.]+).*?Longitude\s*:\s*([-\d,.]+)", texto)
-    if coord:
-        try:
-            dados.update({
-                'Latitude': float(coord.group(1).replace(',', '.')),
-                'Longitude': float(coord.group(2).replace(',', '.'))
-            })
-        except ValueError:
-            dados.update({'Latitude': None, 'Longitude': None})
-    
-    # Extrai endereço
-    endereco = re.search(r'01\s*-\s*Endereço\s*Empreendimento\s*(.*?)(?=\s*(?:02\s*-|Descritivo:|$))', texto, re.DOTALL)
-    dados['Endereço'] = re.sub(r'\s+', ' ', endereco.group(1).strip().replace('\n', ' ')) if endereco else None
-    
-    # Conta vínculos
-    secao = re.search(r'04\s*-\s*Identificação.*?(?=05\s*-|$)', texto, re.DOTALL)
-    if secao:
-        secao_texto = secao.group()
-        dados.update({
-            'CONTRATADO': len(re.findall(r'CONTRATADO\s*:', secao_texto)),
-            'RESPONSAVEL TECNICO': len(re.findall(r'RESPONSAVEL\s*TECNICO\s*:', secao_texto))
-        })
-        dados['Vínculos'] = dados['CONTRATADO'] + dados['RESPONSAVEL TECNICO']
-    
-    # Extrai ofícios GFIS
-    oficios = re.findall(r'(?:OF[IÍ]CIO\s*[Nnº°]*\s*[.:-]*\s*)?(\d+.*?GFIS.*?)(?:\n|$)', texto, re.IGNORECASE)
-    dados.update({
-        'Ofícios GFIS': '; '.join(o.strip() for o in oficios) if oficios else '',
-        'S.I': len(oficios) if oficios else 0
-    })
-    
-    return dados
-
-def extrair_dados_ramo_atividade(texto, filename):
-    """Extrai dados para Ramo de Atividade"""
-    dados = {
-        'Arquivo': filename,
-        'Ramo': '',
-        'Qtd. Ramo': ''
-    }
-    
-    secao = re.search(r'04\s*-\s*Identificação.*?(?=05\s*-|$)', texto, re.DOTALL|re.IGNORECASE)
-    if secao:
-        ramos = re.findall(r'Ramo\s*Atividade\s*:\s*(.*?)(?=\n|$)', secao.group(), re.IGNORECASE)
-        if ramos:
-            contagem = defaultdict(int)
-            for ramo in [r.strip() for r in ramos if r.strip()]:
-                contagem[ramo] += 1
-            
-            dados['Ramo'] = ", ".join(contagem.keys())
-            dados['Qtd. Ramo'] = ", ".join(map(str, contagem.values()))
-    
-    return dados
-
-def extrair_dados_processo_protocolo(texto, filename):
-    """Extrai dados para Processo/Protocolo com foco em Legalização"""
-    dados = {
-        'Arquivo': filename,
-        'Fiscal': '',
-        'Protocolo': '',
-        'Legalização': '',
-        'Qtd. Protocolo': 0,
-        'Qtd. Legalização': 0,
-        'Data Relatório': ''
-    }
-    
-    # Extrai fiscal exatamente como aparece no PDF
-    fiscal = re.search(r'Agente\s+de\s+Fiscalização\s*:\s*([^\n]+)', texto)
-    if fiscal:
-        dados['Fiscal'] = fiscal.group(1).strip()
-    
-    # Extrai protocolo
-    protocolo = re.search(r'Fato\s+Gerador\s*:\s*.*?(PROCESSO/PROTOCOLO[\s\-]*\d+[/\-]?\d*)', texto, re.IGNORECASE)
-    if protocolo:
-        nums = re.findall(r'\d+', protocolo.group(1))
-        dados['Protocolo'] = ''.join(nums) if nums else ''
-        dados['Qtd. Protocolo'] = 1 if nums else 0
-    
-    # Extrai conteúdo após "OUTROS" na seção de documentos recebidos
-    secao_docs = re.search(r'(?i)06\s*-\s*Documentos\s*Recebidos(.*?)(?=\n\s*(?:07|$))', texto, re.DOTALL)
-    if secao_docs:
-        outros_match = re.search(r'(?i)OUTROS\s*[:\-]\s*(.*?)(?=\n|$)', secao_docs.group(1))
-        if outros_match:
-            outros_texto = outros_match.group(1).strip()
-            # Remove múltiplos espaços e limpa o texto
-            outros_texto = ' '.join(outros_texto.split())
-            if outros_texto:
-                dados['Legalização'] = outros_texto
-                dados['Qtd. Legalização'] = 1
-    
-    # Extrai data do relatório (para o extrato consolidado)
-    data_relatorio = re.search(r'Data\s+Relatório\s*:\s*([^\n]+)', texto)
-    if data_relatorio:
-        dados['Data Relatório'] = extrair_data_formatada(data_relatorio.group(1))
-    
-    return dados
-
-def extrair_informacoes_complementares(texto_pdf, nome_arquivo):
+@st.cache_resource
+def obter_logo():
+    """Conteúdo do logo, lido uma única vez por processo (None se ausente)"""
+    try:
+        with open(LOGO_CAMINHO, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+@st.cache_resource
+def obter_cache_extracao():
+    """Cache de extração compartilhado por todas as sessões do servidor"""
+    return CacheExtracao(CACHE_CAMINHO, CACHE_TAMANHO_MAX)
+
+@st.cache_resource
+def obter_historico():
+    """Histórico de registros extraídos, compartilhado por todas as sessões do servidor"""
+    return HistoricoExtracoes(HISTORICO_CAMINHO)
+
+@st.cache_resource
+def obter_log_diagnostico():
+    """Configura uma única vez o arquivo de log de diagnóstico"""
+    os.makedirs(os.path.dirname(DIAGNOSTICO_LOG) or '.', exist_ok=True)
+    return configurar_log(DIAGNOSTICO_LOG)
+
+@st.cache_resource(validate=lambda pool: not pool_quebrado(pool))
+def obter_pool_extracao(workers, tarefas_por_processo=None):
+    """Pool de processos de extração, reaproveitado entre execuções e recriado se quebrar"""
+    return criar_pool(workers, tarefas_por_processo)
+
+# =================== RELATÓRIOS SOB DEMANDA ===================
+# nome: (rótulo, arquivo, dados de entrada, gerador(módulo relatorios, dados))
+# dados['pool'] traz os argumentos de obter_pool_extracao escolhidos pelo
+# usuário (None sem processamento paralelo); não entra na impressão digital
+RELATORIOS = {
+    'extrato': (
+        "Extrato Consolidado", "extrato_consolidado.pdf",
+        ('df_vs', 'df_ra', 'df_pp', 'df_ic', 'fiscal', 'data_inicio', 'data_fim'),
+        lambda r, d: r.gerar_extrato_consolidado(
+            d['df_vs'], d['df_ra'], d['df_pp'], d['df_ic'], d['fiscal'], d['data_inicio'], d['data_fim']
+        )
+    ),
+    'extratos_fiscais': (
+        "Extratos por Fiscal", "extratos_por_fiscal.zip", ('df_vs', 'df_ra', 'df_pp', 'df_ic'),
+        lambda r, d: r.gerar_zip_extratos_por_fiscal(
+            d['df_vs'], d['df_ra'], d['df_pp'], d['df_ic'],
+            obter_pool_extracao(*d['pool']) if d['pool'] else None
+        )
+    ),
+    'vinculos_si': (
+        "Vínculos e S.I", "relatorio_vinculos_si.pdf", ('df_vs',),
+        lambda r, d: r.gerar_relatorio_vinculos_si(d['df_vs'])
+    ),
+    'ramo_atividade': (
+        "Ramo de Atividade", "relatorio_ramo_atividade.pdf", ('df_ra',),
+        lambda r, d: r.gerar_relatorio_ramo_atividade(d['df_ra'])
+    ),
+    'processo_protocolo': (
+        "Processo/Protocolo", "relatorio_processo_protocolo.pdf", ('df_pp',),
+        lambda r, d: r.gerar_relatorio_processo_protocolo(d['df_pp'])
+    ),
+    'informacoes_complementares': (
+        "Informações Complementares", "relatorio_informacoes_complementares.pdf", ('df_ic',),
+        lambda r, d: r.gerar_relatorio_informacoes_complementares(d['df_ic'])
+    ),
+    'excel': (
+        "Excel Consolidado", "extrato_consolidado.xlsx",
+        ('df_vs', 'df_ra', 'df_pp', 'df_ic', 'fiscal', 'data_inicio', 'data_fim'),
+        lambda r, d: r.gerar_excel_consolidado(
+            d['df_vs'], d['df_ra'], d['df_pp'], d['df_ic'], d['fiscal'], d['data_inicio'], d['data_fim']
+        )
+    ),
+}
+
+# Tipo MIME de cada formato de relatório
+TIPOS_ARQUIVO = {
+    '.pdf': ('PDF', "application/pdf"),
+    '.xlsx': ('Excel', "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    '.zip': ('ZIP', "application/zip"),
+}
+
+def impressao_digital(dados, chaves):
+    """SHA-256 do conteúdo dos DataFrames e valores usados por um relatório"""
+    import pandas as pd
+    h = hashlib.sha256()
+    for chave in chaves:
+        valor = dados[chave]
+        h.update(chave.encode('utf-8'))
+        if isinstance(valor, pd.DataFrame):
+            h.update(repr(list(valor.columns)).encode('utf-8'))
+            h.update(pd.util.hash_pandas_object(valor, index=True).values.tobytes())
+        else:
+            h.update(repr(valor).encode('utf-8'))
+    return h.hexdigest()
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def gerar_relatorio_memorizado(nome, impressao, _dados):
+    """Renderiza um relatório; o resultado é reaproveitado enquanto a impressão digital não mudar"""
+    import relatorios
+    return RELATORIOS[nome][3](relatorios, _dados)
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def gerar_zip_relatorios(impressoes, _dados):
+    """Compacta todos os relatórios em um único ZIP"""
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for nome, impressao in impressoes:
+            zf.writestr(RELATORIOS[nome][1], gerar_relatorio_memorizado(nome, impressao, _dados))
+    return buffer.getvalue()
+
+def exibir_relatorios(dados, diagnostico):
     """
-    Extrai TODOS os textos entre parênteses do campo 'Informações Complementares'
-    Retorna dict com nome do arquivo e informações entre parênteses
+    Exibe um botão por relatório. Cada arquivo só é renderizado quando o usuário
+    o solicita e fica memorizado pela impressão digital dos dados de entrada,
+    de modo que novas execuções e downloads repetidos não custam nada.
     """
-    padrao = (
-        r'07\s*-\s*Outras\s+Informações.*?'          # Seção 07
-        r'Informações\s+Complementares\s*:\s*'       # Campo específico
-        r'(.*?)'                                     # Captura todo o conteúdo
-        r'(?=\n\s*(?:08\s*-|\d{2}\s*-|$))'           # Até o próximo campo ou fim
-    )
-    
-    match = re.search(padrao, texto_pdf, re.IGNORECASE | re.DOTALL)
-    if not match:
-        return {'Arquivo': nome_arquivo, 'Informações': ''}
-    
-    # Extrai apenas textos entre parênteses
-    informacoes = re.findall(r'\((.*?)\)', match.group(1))
-    
-    if not informacoes:
-        return {'Arquivo': nome_arquivo, 'Informações': ''}
-    
-    # Processamento igual ao original
-    dados_limpos = [info.strip().replace('\n', ' ') for info in informacoes if info.strip()]
-    return {
-        'Arquivo': nome_arquivo,
-        'Informações': ', '.join(dados_limpos) if dados_limpos else ''
-    }
-
-# =================== GERADORES DE RELATÓRIO PDF ===================
-def gerar_relatorio_vinculos_si(df):
-    """Gera PDF para Vínculos e S.I"""
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    
-    pdf.set_font('Arial', 'B', 16)
-    pdf.cell(0, 10, 'Relatório Vínculos e S.I', 0, 1, 'C')
-    pdf.set_font('Arial', '', 10)
-    pdf.cell(0, 10, f'Gerado em: {datetime.now().strftime("%d/%m/%Y %H:%M:%S")}', 0, 1)
-    pdf.ln(10)
-    
-    col_widths = [80, 30, 30]
-    headers = ['Arquivo', 'Vínculos', 'S.I']
-    
-    pdf.set_font('Arial', 'B', 12)
-    for i, header in enumerate(headers):
-        pdf.cell(col_widths[i], 10, header, 1, 0, 'C')
-    pdf.ln()
-    
-    pdf.set_font('Arial', '', 10)
-    for _, row in df[df['Arquivo'] != 'TOTAL'].iterrows():
-        pdf.cell(col_widths[0], 10, str(row['Arquivo']), 1)
-        pdf.cell(col_widths[1], 10, str(row['Vínculos']), 1, 0, 'C')
-        pdf.cell(col_widths[2], 10, str(row['S.I']), 1, 0, 'C')
-        pdf.ln()
-    
-    total = df[df['Arquivo'] == 'TOTAL'].iloc[0]
-    pdf.set_font('Arial', 'B', 10)
-    pdf.cell(col_widths[0], 10, 'TOTAL GERAL', 1)
-    pdf.cell(col_widths[1], 10, str(total['Vínculos']), 1, 0, 'C')
-    pdf.cell(col_widths[2], 10, str(total['S.I']), 1, 0, 'C')
-    
-    return pdf.output(dest='S').encode('latin1')
-
-def gerar_relatorio_ramo_atividade(df):
-    """Gera PDF para Ramo de Atividade"""
-    pdf = FPDF()
-    pdf.add_page()
-    
-    pdf.set_font("Arial", 'B', 16)
-    pdf.cell(0, 10, "RELATÓRIO DE RAMOS DE ATIVIDADE", 0, 1, 'C')
-    pdf.ln(10)
-    
-    # Processa dados
-    contagem = defaultdict(int)
-    for _, row in df[df['Arquivo'] != 'TOTAL GERAL'].iterrows():
-        if row['Ramo'] and row['Qtd. Ramo']:
-            for ramo, qtd in zip(row['Ramo'].split(','), row['Qtd. Ramo'].split(',')):
-                if ramo.strip() and qtd.strip().isdigit():
-                    contagem[ramo.strip()] += int(qtd.strip())
-    
-    # Ordena por quantidade
-    ramos_ordenados = sorted(contagem.items(), key=lambda x: x[1], reverse=True)
-    total = sum(contagem.values())
-    
-    # Cabeçalho
-    pdf.set_font("Arial", 'B', 10)
-    pdf.cell(120, 8, "RAMO DE ATIVIDADE", 1, 0, 'C')
-    pdf.cell(30, 8, "QUANTIDADE", 1, 0, 'C')
-    pdf.cell(30, 8, "PORCENTAGEM", 1, 1, 'C')
-    
-    # Dados
-    pdf.set_font("Arial", size=9)
-    for ramo, qtd in ramos_ordenados:
-        pdf.cell(120, 8, ramo[:60] + ('...' if len(ramo) > 60 else ''), 1)
-        pdf.cell(30, 8, str(qtd), 1, 0, 'C')
-        pdf.cell(30, 8, f"{(qtd/total)*100:.1f}%" if total > 0 else "0%", 1, 1, 'C')
-    
-    # Rodapé
-    pdf.set_font("Arial", 'B', 10)
-    pdf.cell(120, 8, "TOTAL GERAL", 1)
-    pdf.cell(30, 8, str(total), 1, 0, 'C')
-    pdf.cell(30, 8, "100%", 1, 1, 'C')
-    
-    pdf.ln(10)
-    pdf.set_font("Arial", 'I', 8)
-    pdf.cell(0, 10, f"Gerado em: {datetime.now().strftime('%d/%m/%Y %H:%M')}", 0, 0, 'C')
-    
-    return pdf.output(dest='S').encode('latin1')
-
-def gerar_relatorio_processo_protocolo(df):
-    """Gera PDF para Processo/Protocolo com foco em Legalização"""
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(0, 10, "RELATÓRIO DE PROCESSOS/PROTOCOLOS", 0, 1, 'C')
-    pdf.ln(8)
-    
-    # Configuração de colunas
-    widths = [35, 30, 40, 40, 20, 20]
-    headers = ['Arquivo', 'Fiscal', 'Protocolo', 'Legalização', 'Protocolo', 'Legalização']
-    
-    # Cabeçalho
-    pdf.set_font("Arial", 'B', 8)
-    for w, h in zip(widths, headers):
-        pdf.cell(w, 8, h, 1, 0, 'C')
-    pdf.ln()
-    
-    # Dados
-    pdf.set_font("Arial", size=8)
-    for _, row in df[df['Arquivo'] != 'TOTAL GERAL'].iterrows():
-        # Calcula número de linhas necessárias
-        lines_arquivo = len(str(row['Arquivo'])) // 30 + 1
-        lines_legalizacao = len(str(row['Legalização'])) // 25 + 1 if row['Legalização'] else 1
-        lines = max(lines_arquivo, lines_legalizacao, 1)
-        line_height = 5
-        
-        # Arquivo
-        x = pdf.get_x()
-        y = pdf.get_y()
-        pdf.multi_cell(widths[0], line_height, str(row['Arquivo']), border=1, align='L')
-        pdf.set_xy(x + widths[0], y)
-        
-        # Fiscal
-        pdf.cell(widths[1], line_height * lines, str(row['Fiscal']), border=1, align='C')
-        
-        # Protocolo
-        pdf.cell(widths[2], line_height * lines, str(row['Protocolo']), border=1, align='C')
-        
-        # Legalização
-        x_legal = pdf.get_x()
-        y_legal = pdf.get_y()
-        legalizacao_text = str(row['Legalização']) if row['Legalização'] else ''
-        pdf.multi_cell(widths[3], line_height, legalizacao_text, border=1, align='L')
-        pdf.set_xy(x_legal + widths[3], y_legal)
-        
-        # Contagens
-        pdf.cell(widths[4], line_height * lines, str(row['Qtd. Protocolo']), border=1, align='C')
-        pdf.cell(widths[5], line_height * lines, str(row['Qtd. Legalização']), border=1, align='C')
+    impressoes = {nome: impressao_digital(dados, spec[2]) for nome, spec in RELATORIOS.items()}
+    lote = impressao_digital({'lote': tuple(impressoes.values())}, ('lote',))
+    
+    # Solicitações valem apenas para o conjunto de dados atual
+    estado = st.session_state.setdefault('relatorios', {'lote': lote, 'solicitados': set()})
+    if estado['lote'] != lote:
+        estado.update({'lote': lote, 'solicitados': set()})
+    solicitados = estado['solicitados']
+    
+    st.subheader("Relatórios")
+    colunas = st.columns(len(RELATORIOS) + 1)
+    for coluna, (nome, (rotulo, arquivo, _, _)) in zip(colunas, RELATORIOS.items()):
+        with coluna:
+            if nome in solicitados or 'zip' in solicitados:
+                with st.spinner(f"Gerando {rotulo}..."), diagnostico.etapa('relatorios'):
+                    conteudo = gerar_relatorio_memorizado(nome, impressoes[nome], dados)
+                formato, mime = TIPOS_ARQUIVO[os.path.splitext(arquivo)[1]]
+                st.download_button(f"⬇️ {rotulo} ({formato})", conteudo, arquivo, mime, key=f"baixar_{nome}")
+            else:
+                st.button(f"Gerar {rotulo}", key=f"gerar_{nome}", on_click=solicitados.add, args=(nome,))
+    
+    with colunas[-1]:
+        if 'zip' in solicitados:
+            with st.spinner("Compactando relatórios..."), diagnostico.etapa('relatorios'):
+                conteudo_zip = gerar_zip_relatorios(tuple(impressoes.items()), dados)
+            st.download_button("⬇️ Todos (ZIP)", conteudo_zip, "relatorios.zip", "application/zip", key="baixar_zip")
+        else:
+            st.button("Gerar todos (ZIP)", key="gerar_zip", on_click=solicitados.add, args=('zip',))
+
+def descrever_fiscais(fiscais):
+    """Agente de Fiscalização exibido no extrato de um conjunto de fiscais"""
+    from consolidacao import FISCAL_NAO_IDENTIFICADO
+    fiscais = {f for f in fiscais if f}
+    if len(fiscais) == 1:
+        return next(iter(fiscais))
+    return f"{len(fiscais)} agentes de fiscalização" if fiscais else FISCAL_NAO_IDENTIFICADO
+
+# =================== DIAGNÓSTICO ===================
+def exibir_diagnostico(diagnostico, perfil=None):
+    """Painel com os arquivos mais lentos, o tempo por etapa e, se ativado, o perfil da execução"""
+    with st.expander("Diagnóstico de desempenho"):
+        st.markdown("**Tempo por etapa**")
+        st.caption(
+            "Etapas por arquivo somam o tempo nos processos de extração; "
+            "etapas da execução são o tempo de parede no processo principal."
+        )
+        st.dataframe(diagnostico.por_etapa(), column_config={
+            'Segundos': st.column_config.NumberColumn(format="%.3f"),
+            '%': st.column_config.NumberColumn(format="%.1f%%")
+        }, hide_index=True)
         
-        pdf.ln(line_height * lines)
+        mais_lentos = diagnostico.mais_lentos()
+        st.markdown("**Arquivos mais lentos**")
+        if mais_lentos.empty:
+            st.caption("Todos os arquivos vieram do cache de extração")
+        else:
+            st.dataframe(mais_lentos, hide_index=True)
+        st.caption(f"Execução {diagnostico.execucao} registrada em {DIAGNOSTICO_LOG}")
         
-        if pdf.get_y() > 270 - (line_height * lines):
-            pdf.add_page()
-            pdf.set_font("Arial", 'B', 8)
-            for w, h in zip(widths, headers):
-                pdf.cell(w, 8, h, 1, 0, 'C')
-            pdf.ln()
-            pdf.set_font("Arial", size=8)
-    
-    # Total
-    if 'TOTAL GERAL' in df['Arquivo'].values:
-        total = df[df['Arquivo'] == 'TOTAL GERAL'].iloc[0]
-        pdf.set_font("Arial", 'B', 8)
-        pdf.cell(sum(widths[:4]), line_height, 'TOTAL GERAL', 1, 0, 'R')
-        pdf.cell(widths[4], line_height, str(total['Qtd. Protocolo']), 1, 0, 'C')
-        pdf.cell(widths[5], line_height, str(total['Qtd. Legalização']), 1, 0, 'C')
-    
-    pdf.ln(12)
-    pdf.set_font("Arial", 'I', 8)
-    pdf.cell(0, 10, f"Gerado em: {datetime.now().strftime('%d/%m/%Y %H:%M')}", 0, 0, 'C')
-    
-    return pdf.output(dest='S').encode('latin1')
-
-def gerar_relatorio_informacoes_complementares(df):
-    """Gera PDF para Informações Complementares com dados entre parênteses"""
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    
-    # Cabeçalho padrão
-    pdf.set_font("Arial", 'B', 14)
-    pdf.cell(0, 10, "RELATÓRIO DE INFORMAÇÕES COMPLEMENTARES", 0, 1, 'C')
-    pdf.ln(5)
-    
-    pdf.set_font("Arial", '', 10)
-    pdf.cell(0, 10, f"Gerado em: {datetime.now().strftime('%d/%m/%Y %H:%M')}", 0, 1)
-    pdf.ln(10)
-    
-    # Conteúdo apenas para arquivos com informações entre parênteses
-    pdf.set_font("Arial", size=10)
-    line_height = 6
-    
-    for _, row in df.iterrows():
-        if row['Informações']:
-            # Nome do arquivo em negrito
-            pdf.set_font("Arial", 'B', 10)
-            pdf.cell(0, line_height, f"Arquivo: {row['Arquivo']}", 0, 1)
-            
-            # Informações entre parênteses
-            pdf.set_font("Arial", '', 10)
-            pdf.multi_cell(0, line_height, row['Informações'])
-            pdf.ln(line_height)
-    
-    return pdf.output(dest='S').encode('latin1')
-
-def gerar_extrato_consolidado(df_vs, df_ra, df_pp, df_ic, fiscal, data_inicio, data_fim):
-    """Gera o PDF do Extrato Consolidado de Produtividade"""
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    
-    # Adiciona logo
+        if perfil:
+            st.markdown("**Perfil (cProfile)**")
+            st.code(resumo_perfil(perfil), language=None)
+            st.download_button(
+                "⬇️ Perfil completo (.prof)", exportar_perfil(perfil),
+                f"perfil_{diagnostico.execucao}.prof", "application/octet-stream", key="baixar_perfil"
+            )
+
+def exibir_memoria(memoria):
+    """Pico de memória da execução e, no modo de memória limitada, o limite configurado"""
+    texto = f"Pico de memória (processo principal e de extração): {memoria.pico_mb:.0f} MB"
+    if memoria.limite_mb:
+        texto += f" | limite: {memoria.limite_mb} MB"
+        if memoria.excedido:
+            texto += f", excedido em {memoria.excedido} medição(ões)"
+    st.caption(texto)
+    if memoria.limite_mb and memoria.excedido:
+        st.warning("O limite de memória foi ultrapassado; reduza o número de processos de extração")
+
+# =================== EXTRAÇÃO EM SEGUNDO PLANO ===================
+@st.cache_resource
+def obter_fila_tarefas():
+    """Fila de extrações em segundo plano, compartilhada por todas as sessões do servidor"""
+    return FilaTarefas(TAREFAS_SIMULTANEAS, RETENCAO_TAREFAS)
+
+def identificar_envio(arquivos):
+    """Identifica um conjunto de uploads, para não reenviar a mesma extração a cada rerun"""
+    h = hashlib.sha256()
+    for arquivo in arquivos:
+        h.update(f"{arquivo.file_id}:{arquivo.name}:{arquivo.size}\n".encode('utf-8'))
+    return h.hexdigest()
+
+def processar_em_segundo_plano(tarefa, documentos, erros, cache, historico, pool, opcoes_pool, backend,
+                               podar, workers, memoria_limitada, limite_memoria, perfilar):
+    """
+    Corpo da tarefa de extração, executado fora do script do Streamlit: extrai
+    os documentos, grava o histórico e monta as tabelas finais em tarefa.dados.
+    opcoes_pool (argumentos de obter_pool_extracao, ou None) fica em
+    tarefa.dados para os relatórios usarem o mesmo pool da extração.
+    """
+    from consolidacao import montar_tabelas
+    temp_dir = criar_temp_dir() if INGESTAO_EM_DISCO else None
+    dados = tarefa.dados
+    dados['erros'] = erros
+    dados['opcoes_pool'] = opcoes_pool
+    diagnostico = dados['diagnostico'] = Diagnostico()
+    perfil = dados['perfil'] = iniciar_perfil() if perfilar else None
+    # A memória é sempre medida (para informar o pico); o limite só vale no modo de memória limitada
+    memoria = dados['memoria'] = LimiteMemoria(
+        limite_memoria if memoria_limitada else None, pool, workers * JANELA_POR_PROCESSO
+    )
     try:
-        logo_path = "10.png"
-        if os.path.exists(logo_path):
-            pdf.image(logo_path, x=10, y=8, w=40)
-    except:
-        pass
-    
-    # Título
-    pdf.set_font('Arial', 'B', 16)
-    pdf.cell(0, 30, "EXTRATO CONSOLIDADO PRODUTIVIDADE", 0, 1, 'C')
-    
-    # Informações do cabeçalho
-    pdf.set_font('Arial', '', 12)
-    pdf.cell(0, 10, f"Agente de Fiscalização: {fiscal}", 0, 1)
-    pdf.cell(0, 10, f"Período: {data_inicio} a {data_fim}", 0, 1)
-    pdf.ln(10)
-    
-    # Dados consolidados
-    pdf.set_font('Arial', 'B', 14)
-    pdf.cell(0, 10, "RESUMO GERAL", 0, 1, 'C')
-    pdf.ln(5)
-    
-    # Obtém totais dos dataframes
-    total_acoes = len(df_vs[df_vs['Arquivo'] != 'TOTAL'])  # Total de documentos analisados
-    total_vinculos = df_vs[df_vs['Arquivo'] == 'TOTAL']['Vínculos'].values[0]
-    total_si = df_vs[df_vs['Arquivo'] == 'TOTAL']['S.I'].values[0]
-    
-    total_ramo = sum(int(q) for r in df_ra.to_dict('records') for q in r['Qtd. Ramo'].split(',') 
-                    if r['Qtd. Ramo'] and q.strip().isdigit()) if 'Qtd. Ramo' in df_ra.columns else 0
-    
-    total_protocolo = df_pp[df_pp['Arquivo'] == 'TOTAL GERAL']['Qtd. Protocolo'].values[0]
-    total_legalizacao = df_pp[df_pp['Arquivo'] == 'TOTAL GERAL']['Qtd. Legalização'].values[0]
-    
-    # Adiciona os dados ao PDF (começando com TOTAL AÇÕES)
-    pdf.set_font('Arial', 'B', 12)
-    pdf.cell(0, 10, f"TOTAL AÇÕES: {total_acoes}", 0, 1)
-    pdf.cell(0, 10, f"TOTAL VÍNCULOS: {total_vinculos}", 0, 1)
-    pdf.cell(0, 10, f"TOTAL S.I: {total_si}", 0, 1)
-    pdf.cell(0, 10, f"TOTAL DE RAMO DE ATIVIDADE: {total_ramo}", 0, 1)
-    pdf.cell(0, 10, f"TOTAL PROTOCOLO: {total_protocolo}", 0, 1)
-    pdf.cell(0, 10, f"TOTAL LEGALIZAÇÃO: {total_legalizacao}", 0, 1)
-    pdf.ln(15)
-    
-    # Filtra apenas arquivos com informações complementares entre parênteses
-    df_ic_filtrado = df_ic[df_ic['Informações'] != '']
-    
-    if not df_ic_filtrado.empty:
-        # Informações complementares (apenas para arquivos com dados entre parênteses)
-        pdf.set_font('Arial', 'B', 14)
-        pdf.cell(0, 10, "INFORMAÇÕES COMPLEMENTARES:", 0, 1)
-        pdf.ln(5)
+        extrair_documentos(
+            tarefa, documentos, cache, versao_extracao(backend, podar), pool, temp_dir, backend, podar,
+            janela=(memoria.janela if memoria_limitada else memoria.janela_max) if pool else None,
+            diagnostico=diagnostico, manter_texto=not memoria_limitada, memoria=memoria,
+            guardar_registros=historico is not None
+        )
+        if tarefa.cancelada or not dados['vs']:
+            return
+        if historico:
+            with diagnostico.etapa('historico'):
+                historico.gravar(dados['registros'])
         
-        pdf.set_font('Arial', '', 10)
-        for _, row in df_ic_filtrado.iterrows():
-            # Nome do arquivo em negrito
-            pdf.set_font('Arial', 'B', 10)
-            pdf.cell(0, 8, f"Arquivo: {row['Arquivo']}", 0, 1)
-            
-            # Informações entre parênteses
-            pdf.set_font('Arial', '', 10)
-            pdf.multi_cell(0, 8, row['Informações'])
-            pdf.ln(5)
-    
-    # Data de geração
-    pdf.ln(10)
-    pdf.set_font('Arial', 'I', 10)
-    pdf.cell(0, 10, f"Gerado em: {datetime.now().strftime('%d/%m/%Y %H:%M')}", 0, 0, 'C')
-    
-    return pdf.output(dest='S').encode('latin1')
+        # Cria DataFrames, com totais
+        with diagnostico.etapa('tabelas'):
+            dados['tabelas'] = montar_tabelas(dados['vs'], dados['ra'], dados['pp'], dados['ic'])
+    finally:
+        # A tarefa fica na fila por RETENCAO_TAREFAS; os registros só servem ao histórico
+        dados.get('registros', []).clear()
+        if perfil:
+            perfil.disable()
+        diagnostico.memoria = memoria.resumo()
+        diagnostico.registrar_log()
+        if temp_dir:
+            limpar_temp_dir(temp_dir)
+
+def enviar_extracao(arquivos, paralelo, workers, backend, podar, salvar_historico,
+                    memoria_limitada, limite_memoria, perfilar):
+    """Enfileira a extração dos arquivos enviados e devolve a tarefa"""
+    documentos, erros = listar_documentos(arquivos, liberar=memoria_limitada)
+    obter_log_diagnostico()
+    # Recursos compartilhados são obtidos aqui, no script, e entregues à tarefa
+    opcoes_pool = (workers, TAREFAS_POR_PROCESSO if memoria_limitada else None) if paralelo else None
+    pool = obter_pool_extracao(*opcoes_pool) if opcoes_pool and len(documentos) > 1 else None
+    return obter_fila_tarefas().submeter(
+        processar_em_segundo_plano, len(documentos), documentos, erros, obter_cache_extracao(),
+        obter_historico() if salvar_historico else None, pool, opcoes_pool, backend, podar,
+        workers, memoria_limitada, limite_memoria, perfilar
+    )
+
+@st.fragment(run_every=INTERVALO_ACOMPANHAMENTO)
+def acompanhar_tarefa(tarefa_id):
+    """Progresso de uma tarefa, consultado periodicamente sem reexecutar a página inteira"""
+    import pandas as pd
+    from consolidacao import exibicao_ramos, montar_ramos
+    fila = obter_fila_tarefas()
+    tarefa = fila.obter(tarefa_id)
+    if tarefa is None or tarefa.finalizada:
+        st.rerun()  # Resultado exibido pela página inteira
+    
+    if tarefa.estado == NA_FILA:
+        em_execucao, na_fila = fila.ativas()
+        st.info(
+            f"Extração {tarefa.id} na fila: {em_execucao} em execução e {na_fila} aguardando "
+            f"(até {fila.simultaneas} simultâneas no servidor)"
+        )
+    else:
+        dados = tarefa.dados
+        processados, total = tarefa.processados, max(tarefa.total, 1)
+        lidos_cache = dados.get('lidos_cache', 0)
+        st.progress(processados / total, text=f"Processando arquivos... {processados}/{tarefa.total}")
+        col1, col2, col3, col4, col5 = st.columns(5)
+        col1.metric("Processados", f"{processados}/{tarefa.total}")
+        col2.metric("Extraídos", processados - lidos_cache)
+        col3.metric("Do cache", lidos_cache)
+        col4.metric("Erros", len(dados.get('erros', [])))
+        col5.metric("Tempo", f"{tarefa.duracao():.1f} s")
+        
+        # Tabelas parciais com os registros extraídos até agora
+        tab1, tab2, tab3, tab4 = st.tabs(["Vínculos e S.I", "Ramo Atividade", "Processo/Protocolo", "Informações Complementares"])
+        tab1.dataframe(pd.DataFrame(list(dados.get('vs', []))))
+        dados_ra = list(dados.get('ra', []))
+        tab2.dataframe(exibicao_ramos(montar_ramos(dados_ra), [d['Arquivo'] for d in dados_ra]))
+        tab3.dataframe(pd.DataFrame(list(dados.get('pp', []))))
+        tab4.dataframe(pd.DataFrame(list(dados.get('ic', []))))
+    
+    if tarefa.cancelada:
+        st.caption("Cancelando...")
+    else:
+        st.button("Cancelar extração", key="cancelar_tarefa", on_click=fila.cancelar, args=(tarefa.id,))
+    st.caption(f"Extração {tarefa.id}: o processamento continua mesmo que a página seja recarregada")
 
 # =================== MÓDULO PRINCIPAL ===================
 def extrator_pdf_consolidado():
@@ -448,123 +394,406 @@ def extrator_pdf_consolidado():
     - Extrato Consolidado de Produtividade
     """)
 
-    uploaded_files = st.file_uploader("Selecione os PDFs", type="pdf", accept_multiple_files=True)
+    uploaded_files = st.file_uploader(
+        "Selecione os PDFs ou arquivos ZIP", type=["pdf", "zip"], accept_multiple_files=True,
+        help="Arquivos ZIP (inclusive com pastas) são lidos um PDF por vez, sem descompactar tudo"
+    )
     
+    with st.expander("Opções de processamento"):
+        paralelo = st.checkbox("Processamento paralelo", value=True)
+        workers = st.number_input(
+            "Processos de extração", min_value=1, max_value=64,
+            value=WORKERS_PADRAO, disabled=not paralelo
+        )
+        backend = st.selectbox(
+            "Extração de texto", list(BACKENDS_TEXTO),
+            index=list(BACKENDS_TEXTO).index(BACKEND_PADRAO),
+            help=f"Arquivos sem as seções esperadas são relidos com {BACKEND_RESERVA}"
+        )
+        podar = st.checkbox(
+            "Ignorar páginas após as seções do relatório", value=True,
+            help="Interrompe a leitura quando as seções 01, 04, 06 e 07 e o cabeçalho já foram encontrados; "
+                 "ofícios GFIS e coordenadas em páginas posteriores (anexos) não são lidos"
+        )
+        salvar_historico = st.checkbox(
+            "Salvar registros no histórico", value=True,
+            help="Permite gerar extratos de qualquer período depois, sem reenviar os PDFs"
+        )
+        memoria_limitada = st.checkbox(
+            "Modo de memória limitada", value=MEMORIA_LIMITADA_PADRAO,
+            help="Descarta o texto dos PDFs e os uploads assim que processados, recicla os processos "
+                 "de extração e reduz a extração a um arquivo por vez perto do limite"
+        )
+        limite_memoria = st.number_input(
+            "Limite de memória (MB)", min_value=256, max_value=65536, value=LIMITE_MEMORIA_MB,
+            step=256, disabled=not memoria_limitada
+        )
+        perfilar = st.checkbox(
+            "Gerar perfil (cProfile) da execução", value=False,
+            help="Perfila apenas a tarefa no processo principal; desative o processamento paralelo para incluir a extração"
+        )
+    
+    fila = obter_fila_tarefas()
     if uploaded_files:
-        temp_dir = criar_temp_dir()
-        try:
-            with st.spinner("Processando arquivos..."):
-                dados_vs, dados_ra, dados_pp, dados_ic = [], [], [], []
-                datas_relatorio = []
-                fiscais = set()
-                
-                for file in uploaded_files:
-                    temp_path = os.path.join(temp_dir, file.name)
-                    with open(temp_path, "wb") as f:
-                        f.write(file.getbuffer())
-                    
-                    with pdfplumber.open(temp_path) as pdf:
-                        texto = "\n".join(p.extract_text() or "" for p in pdf.pages)
-                    
-                    # Extrai dados de todos os módulos
-                    dados_vs.append(extrair_dados_vinculos_si(texto, file.name))
-                    dados_ra.append(extrair_dados_ramo_atividade(texto, file.name))
-                    dados_pp.append(extrair_dados_processo_protocolo(texto, file.name))
-                    dados_ic.append(extrair_informacoes_complementares(texto, file.name))
-                    
-                    # Extrai data do relatório e fiscal para o extrato consolidado
-                    data_relatorio = re.search(r'Data\s+Relatório\s*:\s*([^\n]+)', texto)
-                    if data_relatorio:
-                        datas_relatorio.append(extrair_data_formatada(data_relatorio.group(1)))
-                    
-                    fiscal = re.search(r'Agente\s+de\s+Fiscalização\s*:\s*([^\n]+)', texto)
-                    if fiscal:
-                        # Mantém exatamente como aparece no PDF
-                        fiscais.add(fiscal.group(1).strip())
-                    
-                    os.unlink(temp_path)
-                
-                # Cria DataFrames
-                df_vs = pd.DataFrame(dados_vs)
-                df_ra = pd.DataFrame(dados_ra)
-                df_pp = pd.DataFrame(dados_pp)
-                df_ic = pd.DataFrame(dados_ic)
-                
-                # Adiciona totais
-                df_vs.loc['TOTAL'] = {
-                    'Arquivo': 'TOTAL',
-                    'Vínculos': df_vs['Vínculos'].sum(),
-                    'S.I': df_vs['S.I'].sum()
-                }
-                
-                total_ra = sum(int(q) for r in dados_ra for q in r['Qtd. Ramo'].split(',') if r['Qtd. Ramo'] and q.strip().isdigit())
-                df_ra = pd.concat([df_ra, pd.DataFrame({
-                    'Arquivo': ['TOTAL GERAL'],
-                    'Ramo': [''],
-                    'Qtd. Ramo': [str(total_ra)]
-                })], ignore_index=True)
-                
-                # Total para Processo/Protocolo
-                total_pp = pd.DataFrame({
-                    'Arquivo': ['TOTAL GERAL'],
-                    'Qtd. Protocolo': [df_pp['Qtd. Protocolo'].sum()],
-                    'Qtd. Legalização': [df_pp['Qtd. Legalização'].sum()]
-                })
-                df_pp = pd.concat([df_pp, total_pp], ignore_index=True)
-                
-                # Exibição
-                tab1, tab2, tab3, tab4 = st.tabs(["Vínculos e S.I", "Ramo Atividade", "Processo/Protocolo", "Informações Complementares"])
-                
-                with tab1:
-                    st.dataframe(df_vs)
-                
-                with tab2:
-                    st.dataframe(df_ra)
-                
-                with tab3:
-                    st.dataframe(df_pp)
-                
-                with tab4:
-                    st.dataframe(df_ic)
-                
-                # Geração de relatórios
-                pdf_vs = gerar_relatorio_vinculos_si(df_vs)
-                pdf_ra = gerar_relatorio_ramo_atividade(df_ra)
-                pdf_pp = gerar_relatorio_processo_protocolo(df_pp)
-                pdf_ic = gerar_relatorio_informacoes_complementares(df_ic)
-                
-                # Prepara dados para o extrato consolidado
-                fiscal_principal = list(fiscais)[0] if fiscais else "Não identificado"
-                data_inicio = min(datas_relatorio) if datas_relatorio else "Não disponível"
-                data_fim = max(datas_relatorio) if datas_relatorio else "Não disponível"
-                
-                # Gera extrato consolidado
-                pdf_extrato = gerar_extrato_consolidado(
-                    df_vs, df_ra, df_pp, df_ic, 
-                    fiscal_principal, data_inicio, data_fim
-                )
-                
-                # Download
-                st.success("Processamento concluído!")
-                
-                # Mostra apenas o botão para baixar o Extrato Consolidado
+        # Um novo conjunto de arquivos vira uma nova tarefa; reruns e mudanças nas opções não a reiniciam
+        envio = identificar_envio(uploaded_files)
+        if st.session_state.get('envio') != envio:
+            anterior = st.query_params.get('tarefa')
+            if anterior:
+                fila.cancelar(anterior)
+            tarefa = enviar_extracao(
+                uploaded_files, paralelo, int(workers), backend, podar, salvar_historico,
+                memoria_limitada, int(limite_memoria), perfilar
+            )
+            st.session_state['envio'] = envio
+            st.query_params['tarefa'] = tarefa.id
+    
+    # A tarefa fica na URL: recarregar a página retoma o acompanhamento ou o resultado
+    tarefa_id = st.query_params.get('tarefa')
+    tarefa = fila.obter(tarefa_id) if tarefa_id else None
+    if tarefa is None:
+        if tarefa_id:
+            st.info(f"A extração {tarefa_id} não está mais disponível. Envie os arquivos novamente.")
+        return
+    
+    if not tarefa.finalizada:
+        acompanhar_tarefa(tarefa.id)
+        return
+    
+    exibir_tarefa(tarefa)
+    if uploaded_files:
+        st.button(
+            "Extrair novamente com as opções atuais", key="reprocessar",
+            on_click=st.session_state.pop, args=('envio', None)
+        )
+
+def exibir_tarefa(tarefa):
+    """Tabelas finais, relatórios e diagnóstico de uma extração finalizada"""
+    from consolidacao import converter_datas, exibicao_ramos, periodo, ranking_ramos
+    import pandas as pd
+    dados = tarefa.dados
+    erros = dados.get('erros', [])
+    
+    if tarefa.estado == FALHOU:
+        st.error(f"A extração {tarefa.id} falhou: {tarefa.falha}")
+        return
+    if tarefa.estado == CANCELADA:
+        st.warning(f"Extração {tarefa.id} cancelada após {tarefa.processados} de {tarefa.total} arquivo(s)")
+        return
+    if 'tabelas' not in dados:
+        st.error("Nenhum arquivo pôde ser processado")
+        st.dataframe(pd.DataFrame(erros))
+        return
+    
+    # Exibição das tabelas finais, com totais
+    df_vs, df_ra, df_pp, df_ic = dados['tabelas']
+    tab1, tab2, tab3, tab4 = st.tabs(["Vínculos e S.I", "Ramo Atividade", "Processo/Protocolo", "Informações Complementares"])
+    tab1.dataframe(df_vs)
+    with tab2:
+        st.dataframe(exibicao_ramos(df_ra, df_vs['Arquivo'].drop('TOTAL')))
+        st.dataframe(ranking_ramos(df_ra), column_config={
+            'Porcentagem': st.column_config.NumberColumn(format="%.1f%%")
+        })
+    tab3.dataframe(df_pp)
+    tab4.dataframe(df_ic)
+    
+    if erros:
+        st.warning(f"{len(erros)} arquivo(s) não puderam ser processados")
+        st.dataframe(pd.DataFrame(erros))
+    
+    lidos_cache = dados['lidos_cache']
+    estatisticas = obter_cache_extracao().estatisticas()
+    st.caption(
+        f"Cache de extração: {lidos_cache} acerto(s) e {tarefa.total - lidos_cache} falha(s) nesta execução "
+        f"| {estatisticas['entradas']} arquivo(s) armazenados "
+        f"({estatisticas['tamanho'] / (1024 * 1024):.1f} MB)"
+    )
+    
+    detalhes = dados['detalhes']
+    paginas_total = sum(d['Páginas'] for d in detalhes)
+    paginas_ignoradas = paginas_total - sum(d['Páginas lidas'] for d in detalhes)
+    st.caption(f"Páginas ignoradas após as seções do relatório: {paginas_ignoradas} de {paginas_total}")
+    exibir_memoria(dados['memoria'])
+    
+    with st.expander("Detalhes da extração"):
+        st.dataframe(pd.DataFrame(detalhes))
+    
+    # Prepara dados para o extrato consolidado (por fiscal em "Extratos por Fiscal")
+    fiscal_principal = descrever_fiscais(dados['fiscais'])
+    data_inicio, data_fim = periodo(converter_datas(dados['datas']))
+    
+    st.success(f"Processamento concluído em {tarefa.duracao():.1f} s!")
+    
+    # Relatórios gerados apenas quando solicitados
+    diagnostico = dados['diagnostico']
+    exibir_relatorios({
+        'df_vs': df_vs, 'df_ra': df_ra, 'df_pp': df_pp, 'df_ic': df_ic,
+        'fiscal': fiscal_principal, 'data_inicio': data_inicio, 'data_fim': data_fim,
+        'pool': dados['opcoes_pool']
+    }, diagnostico)
+    exibir_diagnostico(diagnostico, dados['perfil'])
+
+# =================== EXTRATO A PARTIR DO HISTÓRICO ===================
+def extrato_historico():
+    st.title("🗂️ Extrato a partir do Histórico")
+    st.markdown("Gera os relatórios de qualquer fiscal e período com os registros já extraídos, sem reenviar os PDFs.")
+    
+    historico = obter_historico()
+    fiscais = {fiscal: (registros, inicio, fim, sem_data) for fiscal, registros, inicio, fim, sem_data in historico.fiscais()}
+    if not fiscais:
+        st.info("O histórico está vazio. Processe PDFs no Extrator PDF Consolidado para preenchê-lo.")
+        return
+    from consolidacao import FISCAL_NAO_IDENTIFICADO, exibicao_ramos, montar_tabelas
+    
+    fiscal = st.selectbox(
+        "Agente de Fiscalização", [None, *fiscais],
+        format_func=lambda f: "Todos" if f is None else f"{f or FISCAL_NAO_IDENTIFICADO} ({fiscais[f][0]} registro(s))"
+    )
+    selecionados = fiscais.values() if fiscal is None else [fiscais[fiscal]]
+    datas = [date.fromisoformat(d) for _, inicio, fim, _ in selecionados for d in (inicio, fim) if d]
+    periodo_selecionado = st.date_input(
+        "Período", value=(min(datas), max(datas)) if datas else (), format="DD/MM/YYYY"
+    )
+    if len(periodo_selecionado) != 2:
+        st.info("Selecione as datas inicial e final")
+        return
+    inicio, fim = periodo_selecionado
+    # Registros sem Data Relatório não pertencem a nenhum período
+    sem_data = sum(s for *_, s in selecionados)
+    incluir_sem_data = sem_data > 0 and st.checkbox(
+        f"Incluir {sem_data} registro(s) sem Data Relatório", value=False,
+        help="Relatórios em que a data não foi encontrada; sem esta opção, ficam fora de todos os períodos"
+    )
+    with st.expander("Opções de processamento"):
+        paralelo = st.checkbox(
+            "Processamento paralelo", value=True, help="Gera os Extratos por Fiscal em processos separados"
+        )
+        workers = st.number_input(
+            "Processos de extração", min_value=1, max_value=64,
+            value=WORKERS_PADRAO, disabled=not paralelo
+        )
+    
+    diagnostico = Diagnostico()
+    with diagnostico.etapa('consulta'):
+        resultados = historico.consultar(fiscal, inicio, fim, incluir_sem_data)
+    if not resultados:
+        st.warning("Nenhum registro no histórico para o fiscal e o período selecionados")
+        return
+    with diagnostico.etapa('tabelas'):
+        df_vs, df_ra, df_pp, df_ic = montar_tabelas(*([r[m] for r in resultados] for m in ('vs', 'ra', 'pp', 'ic')))
+    
+    st.caption(
+        f"{len(resultados)} registro(s) consultados em {diagnostico.etapas['consulta'] * 1000:.0f} ms "
+        f"e tabelas montadas em {diagnostico.etapas['tabelas'] * 1000:.0f} ms"
+        + ("" if incluir_sem_data or not sem_data else f" | {sem_data} registro(s) sem Data Relatório não incluídos")
+    )
+    tab1, tab2, tab3, tab4 = st.tabs(["Vínculos e S.I", "Ramo Atividade", "Processo/Protocolo", "Informações Complementares"])
+    tab1.dataframe(df_vs)
+    tab2.dataframe(exibicao_ramos(df_ra, df_vs['Arquivo'].drop('TOTAL')))
+    tab3.dataframe(df_pp)
+    tab4.dataframe(df_ic)
+    
+    exibir_relatorios({
+        'df_vs': df_vs, 'df_ra': df_ra, 'df_pp': df_pp, 'df_ic': df_ic,
+        'fiscal': descrever_fiscais(r['pp']['Fiscal'] for r in resultados),
+        'data_inicio': inicio.strftime('%d/%m/%Y'), 'data_fim': fim.strftime('%d/%m/%Y'),
+        'pool': (int(workers), None) if paralelo else None
+    }, diagnostico)
+
+# =================== PROCESSADOR DE PLANILHAS DE AUTUAÇÕES ===================
+@st.cache_resource
+def obter_cache_planilhas():
+    """Planilhas convertidas em Parquet, compartilhadas por todas as sessões do servidor"""
+    from planilhas import CachePlanilhas
+    return CachePlanilhas(PLANILHAS_CACHE_PASTA, PLANILHAS_CACHE_TAMANHO_MAX)
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def abas_planilha(hash_conteudo, _conteudo):
+    """Abas da planilha, memorizadas pelo hash do conteúdo"""
+    from planilhas import listar_abas
+    return listar_abas(_conteudo)
+
+@st.cache_resource(max_entries=4, show_spinner="Convertendo a planilha...")
+def obter_planilha(hash_conteudo, aba, _conteudo):
+    """
+    Tabela Arrow de uma aba, lida do cache em Parquet ou, na primeira vez,
+    convertida em blocos. As últimas abertas ficam em memória (a tabela é
+    imutável e pode ser compartilhada entre as sessões).
+    Retorna (tabela, do_cache, segundos).
+    """
+    from planilhas import ler_planilha
+    cache = obter_cache_planilhas()
+    inicio = time.perf_counter()
+    tabela = cache.obter(hash_conteudo, aba)
+    do_cache = tabela is not None
+    if not do_cache:
+        tabela = ler_planilha(_conteudo, aba)
+        cache.gravar(hash_conteudo, aba, tabela)
+    return tabela, do_cache, time.perf_counter() - inicio
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def gerar_excel_planilha(chave, _consolidado, _totais):
+    """Excel da consolidação, memorizado por (hash, aba, agrupamento, somas)"""
+    from relatorios import gerar_excel_autuacoes
+    colunas = _consolidado.column_names
+    linhas = zip(*(_consolidado[c].to_pylist() for c in colunas))
+    return gerar_excel_autuacoes(colunas, linhas, _totais)
+
+def processador_planilhas():
+    st.title("📊 Processador de Planilhas de Autuações")
+    st.markdown(
+        "Consolida planilhas Excel de autuações. Cada planilha é convertida uma única vez "
+        "e reaberta do cache nas próximas vezes, mesmo em outra sessão."
+    )
+    arquivo = st.file_uploader("Selecione a planilha de autuações", type=["xlsx", "xlsm"])
+    if arquivo is None:
+        return
+    from cache_extracao import calcular_hash
+    
+    # O hash é calculado uma vez por upload, não a cada nova execução
+    conteudo = arquivo.getvalue()
+    envio = st.session_state.get('planilha')
+    if envio is None or envio[0] != arquivo.file_id:
+        envio = st.session_state['planilha'] = (arquivo.file_id, calcular_hash(conteudo))
+    hash_conteudo = envio[1]
+    
+    try:
+        abas = abas_planilha(hash_conteudo, conteudo)
+    except Exception as e:
+        st.error(f"Não foi possível abrir a planilha: {e}")
+        return
+    aba = st.selectbox("Aba", abas) if len(abas) > 1 else abas[0]
+    tabela, do_cache, segundos = obter_planilha(hash_conteudo, aba, conteudo)
+    if not tabela.num_rows:
+        st.warning("A aba selecionada não tem linhas de dados")
+        return
+    from planilhas import colunas_numericas, colunas_valores, consolidar, totais
+    
+    st.caption(
+        f"{tabela.num_rows} linha(s) e {tabela.num_columns} coluna(s) | " + (
+            f"lida do cache em Parquet em {segundos * 1000:.0f} ms" if do_cache else
+            f"convertida em {segundos:.1f} s (as próximas aberturas usam o cache)"
+        )
+    )
+    with st.expander(f"Prévia (primeiras {min(LINHAS_PREVIA_PLANILHA, tabela.num_rows)} linhas)"):
+        st.dataframe(tabela.slice(0, LINHAS_PREVIA_PLANILHA).to_pandas())
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        agrupar_por = st.multiselect("Agrupar por", tabela.column_names)
+    with col2:
+        # Uma coluna usada no agrupamento não é somada
+        somar = st.multiselect(
+            "Somar", [c for c in colunas_numericas(tabela) if c not in agrupar_por],
+            default=[c for c in colunas_valores(tabela) if c not in agrupar_por]
+        )
+    
+    resumo = totais(tabela, somar)
+    st.subheader("Totais")
+    for linha in range(0, len(resumo), 4):
+        for coluna, (rotulo, valor) in zip(st.columns(4), list(resumo.items())[linha:linha + 4]):
+            coluna.metric(rotulo, f"{valor:,.2f}".rstrip('0').rstrip('.') if isinstance(valor, float) else valor)
+    
+    if not agrupar_por:
+        st.info("Selecione ao menos uma coluna em \"Agrupar por\" para consolidar as autuações")
+        return
+    consolidado = consolidar(tabela, agrupar_por, somar)
+    st.subheader(f"Consolidado ({consolidado.num_rows} grupo(s))")
+    st.dataframe(consolidado.to_pandas(), hide_index=True)
+    
+    # Arquivos gerados apenas quando solicitados, para o agrupamento atual
+    chave = (hash_conteudo, aba, tuple(agrupar_por), tuple(somar))
+    solicitados = st.session_state.setdefault('planilha_arquivos', {})
+    col1, col2 = st.columns(2)
+    with col1:
+        if solicitados.get('excel') == chave:
+            with st.spinner("Gerando Excel Consolidado..."):
+                conteudo_excel = gerar_excel_planilha(chave, consolidado, resumo)
+            formato, mime = TIPOS_ARQUIVO['.xlsx']
+            st.download_button(f"⬇️ Consolidado ({formato})", conteudo_excel, "autuacoes_consolidado.xlsx", mime)
+        else:
+            st.button("Gerar Excel Consolidado", on_click=solicitados.__setitem__, args=('excel', chave))
+    with col2:
+        if solicitados.get('parquet') == (hash_conteudo, aba):
+            with open(obter_cache_planilhas().caminho(hash_conteudo, aba), 'rb') as f:
                 st.download_button(
-                    "⬇️ Baixar Extrato Consolidado (PDF)",
-                    pdf_extrato,
-                    "extrato_consolidado.pdf",
-                    "application/pdf"
+                    "⬇️ Planilha completa (Parquet)", f.read(), "autuacoes.parquet", "application/octet-stream"
                 )
-        
-        finally:
-            limpar_temp_dir(temp_dir)
+        else:
+            st.button(
+                "Exportar planilha completa (Parquet)",
+                on_click=solicitados.__setitem__, args=('parquet', (hash_conteudo, aba))
+            )
+
+# =================== MAPA DE FISCALIZAÇÕES ===================
+@st.cache_resource(max_entries=8, show_spinner="Indexando as coordenadas do histórico...")
+def obter_indice_mapa(versao, tamanho):
+    """Grade do mapa, reconstruída apenas quando os registros do histórico (versao) mudam"""
+    from mapa import IndiceMapa
+    historico = obter_historico()
+    return IndiceMapa(historico.coordenadas(), historico.ramos(), tamanho)
+
+def mapa_fiscalizacoes():
+    st.title("🗺️ Mapa de Fiscalizações")
+    st.markdown("Fiscalizações do histórico agregadas em uma grade; apenas as células são enviadas ao navegador.")
+    import pydeck as pdk
+    from consolidacao import FISCAL_NAO_IDENTIFICADO
+    from mapa import TAMANHOS_CELULA
+    
+    historico = obter_historico()
+    versao = historico.versao()
+    if not versao[0]:
+        st.info("O histórico está vazio. Processe PDFs no Extrator PDF Consolidado para preenchê-lo.")
+        return
+    
+    col1, col2, col3, col4 = st.columns([2, 2, 2, 1])
+    with col4:
+        tamanho = st.selectbox("Célula", list(TAMANHOS_CELULA), index=1)
+    indice = obter_indice_mapa(tuple(versao), TAMANHOS_CELULA[tamanho])
+    if not indice.pontos:
+        st.info("Nenhum registro do histórico tem coordenadas")
+        return
+    
+    with col1:
+        fiscais = st.multiselect(
+            "Agentes de Fiscalização", indice.fiscais, placeholder="Todos",
+            format_func=lambda f: f or FISCAL_NAO_IDENTIFICADO
+        )
+    with col2:
+        ramo = st.selectbox("Ramo de atividade", [None, *indice.ramos], format_func=lambda r: "Todos" if r is None else r)
+    with col3:
+        periodo_total = indice.periodo()
+        periodo_selecionado = st.date_input(
+            "Período", value=periodo_total or (), format="DD/MM/YYYY", disabled=periodo_total is None
+        )
+    # O período completo inclui também os registros sem data
+    inicio, fim = (None, None)
+    if len(periodo_selecionado) == 2 and tuple(periodo_selecionado) != periodo_total:
+        inicio, fim = periodo_selecionado
+    
+    celulas = indice.agregar(fiscais, inicio, fim, ramo)
+    st.caption(
+        f"{int(celulas['quantidade'].sum())} fiscalização(ões) em {len(celulas)} célula(s) "
+        f"| {indice.pontos} registro(s) com coordenadas no histórico"
+    )
+    if celulas.empty:
+        st.warning("Nenhuma fiscalização para os filtros selecionados")
+        return
+    
+    camada = pdk.Layer(
+        "PolygonLayer", celulas[['poligono', 'cor', 'quantidade']],
+        get_polygon='poligono', get_fill_color='cor', opacity=0.6, stroked=False, pickable=True
+    )
+    vista = pdk.data_utils.compute_view(celulas[['longitude', 'latitude']].values.tolist())
+    st.pydeck_chart(pdk.Deck(
+        layers=[camada], initial_view_state=vista, map_style=None,
+        tooltip={'text': "{quantidade} fiscalização(ões)"}
+    ))
 
 # =================== INTERFACE PRINCIPAL ===================
 def main():
     # Configuração visual
-    try:
-        logo = Image.open("10.png")
-    except:
-        logo = None
+    logo = obter_logo()
     
     # Layout do cabeçalho
     col1, col2 = st.columns([1, 2])
@@ -575,8 +804,18 @@ def main():
     
     st.markdown("---")
     
-    # Exibe apenas o módulo principal
-    extrator_pdf_consolidado()
+    modo = st.radio(
+        "Modo", ["Processar PDFs", "Gerar a partir do histórico", "Mapa de fiscalizações", "Planilhas de autuações"],
+        horizontal=True, label_visibility="collapsed"
+    )
+    if modo == "Processar PDFs":
+        extrator_pdf_consolidado()
+    elif modo == "Gerar a partir do histórico":
+        extrato_historico()
+    elif modo == "Mapa de fiscalizações":
+        mapa_fiscalizacoes()
+    else:
+        processador_planilhas()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,90 @@
+"""
+Compara a ingestão em memória com a ingestão via diretório temporário.
+
+Uso:
+    python benchmarks/bench_ingestao.py [--arquivos 200] [--pasta PDFS]
+
+Sem --pasta, um PDF sintético é gerado com FPDF e replicado.
+"""
+import argparse
+import glob
+import logging
+import os
+import sys
+import tempfile
+import shutil
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fpdf import FPDF
+from extracao import processar_lote
+
+def gerar_pdf_sintetico(indice):
+    """Gera um relatório mínimo com as seções usadas pelos extratores"""
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font('Arial', '', 10)
+    linhas = [
+        "Data Relatório: 10/03/2025",
+        "Agente de Fiscalização: FISCAL TESTE",
+        "01 - Endereço Empreendimento",
+        f"Rua Exemplo {indice}, Centro",
+        "Latitude: -22,90 Longitude: -43,20",
+        "04 - Identificação",
+        "CONTRATADO: EMPRESA EXEMPLO",
+        "RESPONSAVEL TECNICO: ENGENHEIRO EXEMPLO",
+        "Ramo Atividade: ENGENHARIA CIVIL",
+        "05 - Documentos Solicitados",
+        f"OFICIO {indice}/2025 GFIS",
+        "06 - Documentos Recebidos",
+        "OUTROS: ART registrada",
+        "07 - Outras Informações",
+        "Informações Complementares: (exemplo)",
+    ]
+    for linha in linhas:
+        pdf.cell(0, 6, linha, 0, 1)
+    return pdf.output(dest='S').encode('latin1')
+
+def carregar_itens(args):
+    """Carrega os PDFs da pasta ou gera o lote sintético"""
+    if args.pasta:
+        caminhos = sorted(glob.glob(os.path.join(args.pasta, '*.pdf')))[:args.arquivos]
+        itens = []
+        for caminho in caminhos:
+            with open(caminho, 'rb') as f:
+                itens.append((f.read(), os.path.basename(caminho)))
+        return itens
+    return [(gerar_pdf_sintetico(i), f"relatorio_{i:04d}.pdf") for i in range(args.arquivos)]
+
+def medir(descricao, funcao):
+    inicio = time.perf_counter()
+    resultados = funcao()
+    duracao = time.perf_counter() - inicio
+    erros = sum(1 for r in resultados if 'erro' in r)
+    print(f"{descricao:<28} {duracao:8.3f} s  ({len(resultados) / duracao:7.1f} arquivos/s, {erros} erro(s))")
+    return duracao
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--arquivos', type=int, default=200)
+    parser.add_argument('--pasta', help='Pasta com PDFs reais')
+    args = parser.parse_args()
+    logging.getLogger('pdfminer').setLevel(logging.ERROR)
+
+    itens = carregar_itens(args)
+    print(f"Lote: {len(itens)} arquivo(s), {sum(len(c) for c, _ in itens) / 1024:.0f} KB")
+
+    # Aquecimento (imports e caches do pdfminer)
+    processar_lote(itens[:1])
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        t_disco = medir("Diretório temporário", lambda: processar_lote(itens, temp_dir=temp_dir))
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    t_memoria = medir("Em memória", lambda: processar_lote(itens))
+    print(f"Ganho: {t_disco / t_memoria:.2f}x")
+
+if __name__ == "__main__":
+    main()
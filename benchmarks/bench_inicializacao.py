@@ -0,0 +1,139 @@
+"""
+Mede o custo de inicialização e de cada nova execução (rerun) da interface
+Streamlit (Extract_data.py), sem abrir um navegador.
+
+Uso:
+    python benchmarks/bench_inicializacao.py [--repeticoes 5] [--reruns 20]
+        [--salvar-baseline inicio.json] [--baseline inicio.json] [--tolerancia 0.15]
+
+Cada repetição roda em um processo novo (imports a frio) com o AppTest do
+Streamlit e mede:
+    streamlit         import do Streamlit e do AppTest (comum a qualquer app)
+    primeira_exibicao primeira execução do script: imports do projeto e
+                      montagem da página inicial
+    rerun             mediana das execuções seguintes (custo de cada interação)
+    historico         primeira troca para "Gerar a partir do histórico" (com o
+                      histórico vazio, sem consulta nem pandas)
+São listados também os módulos pesados já carregados após a primeira exibição.
+
+Com --salvar-baseline os resultados são gravados em JSON; com --baseline
+são comparados a um arquivo salvo anteriormente (por exemplo, antes de uma
+alteração) e o código de saída é 1 se alguma medida piorar além da tolerância.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(RAIZ, "Extract_data.py")
+MEDIDAS = ['streamlit', 'primeira_exibicao', 'rerun', 'historico']
+MODULOS_PESADOS = ['pandas', 'pyarrow', 'pdfplumber', 'pypdfium2', 'fpdf', 'openpyxl', 'PyPDF2', 'PIL.Image']
+FORMATO_BASELINE = 1
+
+def medir_inicializacao(reruns, historico):
+    """Executa o app a frio neste processo e mede a primeira exibição e os reruns"""
+    os.chdir(RAIZ)  # O app procura o logo no diretório atual
+    sys.path.insert(0, RAIZ)  # Como o `streamlit run`, que inclui o diretório do script
+    # Histórico em um diretório próprio para não depender dos dados locais
+    os.environ.setdefault("EXTRATOR_HISTORICO", historico)
+
+    inicio = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    medidas = {'streamlit': time.perf_counter() - inicio}
+
+    app = AppTest.from_file(APP, default_timeout=120)
+    inicio = time.perf_counter()
+    app.run()
+    medidas['primeira_exibicao'] = time.perf_counter() - inicio
+    if app.exception:
+        raise RuntimeError(app.exception[0].value)
+    carregados = [m for m in MODULOS_PESADOS if m in sys.modules]
+
+    tempos = []
+    for _ in range(reruns):
+        inicio = time.perf_counter()
+        app.run()
+        tempos.append(time.perf_counter() - inicio)
+    medidas['rerun'] = statistics.median(tempos)
+
+    inicio = time.perf_counter()
+    app.radio[0].set_value("Gerar a partir do histórico").run()
+    medidas['historico'] = time.perf_counter() - inicio
+    return {'segundos': medidas, 'modulos_carregados': carregados}
+
+def mediana_repeticoes(repeticoes):
+    """Mediana de cada medida entre as repetições"""
+    return {m: statistics.median(r['segundos'][m] for r in repeticoes) for m in MEDIDAS}
+
+def exibir(medidas, carregados):
+    for medida in MEDIDAS:
+        print(f"  {medida:<18} {medidas[medida] * 1000:9.1f} ms")
+    print(f"  Módulos pesados após a primeira exibição: {', '.join(carregados) or 'nenhum'}")
+
+def comparar(medidas, baseline, tolerancia):
+    """Compara com o baseline; retorna o número de regressões"""
+    regressoes = 0
+    print(f"\nComparação com o baseline (tolerância {tolerancia:.0%}):")
+    for medida in MEDIDAS:
+        base = baseline['medidas'].get(medida)
+        if not base:
+            continue
+        variacao = medidas[medida] / base - 1
+        regressao = variacao > tolerancia
+        regressoes += regressao
+        print(f"  {medida:<18} {base * 1000:9.1f} -> {medidas[medida] * 1000:9.1f} ms ({variacao:+7.1%})"
+              f"{'  MAIS LENTO' if regressao else ''}")
+    return regressoes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeticoes', type=int, default=5, help='Processos novos medidos (padrão: 5)')
+    parser.add_argument('--reruns', type=int, default=20, help='Reruns medidos por processo (padrão: 20)')
+    parser.add_argument('--salvar-baseline', help='Grava os resultados neste arquivo JSON')
+    parser.add_argument('--baseline', help='Compara os resultados com este arquivo JSON')
+    parser.add_argument('--tolerancia', type=float, default=0.15,
+                        help='Variação relativa aceita antes de apontar regressão (padrão: 0.15)')
+    args = parser.parse_args()
+
+    print(f"Inicialização de {os.path.basename(APP)}: {args.repeticoes} processo(s), {args.reruns} rerun(s) cada, "
+          f"Python {platform.python_version()} em {platform.platform()}")
+    historico = os.path.join(RAIZ, "benchmarks", ".historico_bench.sqlite")
+    repeticoes = []
+    for _ in range(args.repeticoes):
+        # Um processo por repetição: todos os imports acontecem a frio
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+            repeticoes.append(executor.submit(medir_inicializacao, args.reruns, historico).result())
+    for sufixo in ("", "-wal", "-shm"):
+        if os.path.exists(historico + sufixo):
+            os.unlink(historico + sufixo)
+
+    medidas = mediana_repeticoes(repeticoes)
+    print("\nMediana entre os processos:")
+    exibir(medidas, repeticoes[-1]['modulos_carregados'])
+
+    if args.salvar_baseline:
+        with open(args.salvar_baseline, 'w', encoding='utf-8') as f:
+            json.dump({
+                'formato': FORMATO_BASELINE,
+                'ambiente': {'python': platform.python_version(), 'plataforma': platform.platform()},
+                'medidas': medidas,
+                'modulos_carregados': repeticoes[-1]['modulos_carregados']
+            }, f, ensure_ascii=False, indent=2)
+        print(f"\nBaseline gravado em {args.salvar_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressoes = comparar(medidas, baseline, args.tolerancia)
+        print(f"{regressoes} regressão(ões) encontrada(s)")
+        return 1 if regressoes else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
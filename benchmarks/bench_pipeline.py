@@ -0,0 +1,231 @@
+"""
+Mede o pipeline completo do Extrator PDF Consolidado sobre o corpus
+sintético, em lotes de tamanhos crescentes.
+
+Uso:
+    python benchmarks/bench_pipeline.py [--tamanhos 10 100 1000 10000]
+        [--salvar-baseline baseline.json] [--baseline baseline.json] [--tolerancia 0.15]
+
+Para cada tamanho, em um processo novo (para que o pico de RSS seja o do
+próprio lote), o corpus é gerado em memória e cada etapa é cronometrada:
+    texto       extração de texto (extrair_texto_pdf)
+    extratores  tokenização e os quatro extrair_* (extrair_todos_modulos)
+    tabelas     montagem dos DataFrames com totais (montar_tabelas)
+    relatorios  todos os relatórios PDF e o Excel Consolidado
+São informados a vazão (arquivos/s) e o pico de RSS ao fim de cada etapa.
+Os dados extraídos são conferidos com os valores usados na geração, e as
+coordenadas, com a grade do mapa de fiscalizações.
+
+Com --salvar-baseline os resultados são gravados em JSON; com --baseline
+são comparados a um arquivo salvo anteriormente e o código de saída é 1
+se alguma etapa ficar mais lenta (ou usar mais memória) que a tolerância.
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import platform
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from consolidacao import montar_tabelas
+from corpus_sintetico import divergencias, gerar_corpus
+from extracao import BACKEND_PADRAO, BACKENDS_TEXTO, extrair_texto_pdf, extrair_todos_modulos
+from mapa import IndiceMapa
+from relatorios import (
+    gerar_excel_consolidado, gerar_extrato_consolidado, gerar_relatorio_informacoes_complementares,
+    gerar_relatorio_processo_protocolo, gerar_relatorio_ramo_atividade, gerar_relatorio_vinculos_si
+)
+
+TAMANHOS_PADRAO = [10, 100, 1000, 10000]
+ETAPAS = ['texto', 'extratores', 'tabelas', 'relatorios']
+FORMATO_BASELINE = 1
+
+def pico_rss_mb():
+    """Pico de memória residente do processo, em MB (None se indisponível)"""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / 2**20 if sys.platform == 'darwin' else pico / 1024  # bytes no macOS, KB no Linux
+
+def gerar_relatorios(df_vs, df_ra, df_pp, df_ic, fiscal, data_inicio, data_fim):
+    """Renderiza todos os relatórios oferecidos pelo Extrator PDF Consolidado"""
+    return [
+        gerar_extrato_consolidado(df_vs, df_ra, df_pp, df_ic, fiscal, data_inicio, data_fim),
+        gerar_relatorio_vinculos_si(df_vs),
+        gerar_relatorio_ramo_atividade(df_ra),
+        gerar_relatorio_processo_protocolo(df_pp),
+        gerar_relatorio_informacoes_complementares(df_ic),
+        gerar_excel_consolidado(df_vs, df_ra, df_pp, df_ic, fiscal, data_inicio, data_fim),
+    ]
+
+def divergencias_mapa(resultados, tamanho=0.01):
+    """
+    Células do mapa (IndiceMapa) cuja posição ou quantidade difere da grade
+    calculada aqui, ponto a ponto; o corpus fica no Rio de Janeiro, com
+    latitude e longitude negativas
+    """
+    pontos = [
+        (str(i), r['pp']['Fiscal'], None, r['vs'].get('Latitude'), r['vs'].get('Longitude'))
+        for i, r in enumerate(resultados) if r['vs'].get('Latitude') is not None
+    ]
+    esperado = Counter((math.floor(lat / tamanho), math.floor(lon / tamanho)) for *_, lat, lon in pontos)
+    obtido = Counter()
+    for poligono, quantidade in IndiceMapa(pontos, [], tamanho).agregar()[['poligono', 'quantidade']].itertuples(index=False):
+        oeste, sul = poligono[0]
+        obtido[(round(sul / tamanho), round(oeste / tamanho))] += quantidade
+    return len(set(esperado.items()) ^ set(obtido.items()))
+
+def medir_tamanho(tamanho, semente, backend, podar):
+    """Executa o pipeline para um lote de `tamanho` arquivos e mede cada etapa"""
+    logging.getLogger('pdfminer').setLevel(logging.ERROR)
+    corpus = list(gerar_corpus(tamanho, semente))
+    etapas = {}
+
+    def cronometrar(etapa, funcao):
+        inicio = time.perf_counter()
+        retorno = funcao()
+        segundos = time.perf_counter() - inicio
+        etapas[etapa] = {
+            'segundos': segundos,
+            'arquivos_s': tamanho / segundos if segundos > 0 else None,
+            'pico_rss_mb': pico_rss_mb()
+        }
+        return retorno
+
+    # Aquecimento (imports e inicialização dos backends)
+    extrair_todos_modulos(extrair_texto_pdf(corpus[0][0], backend, podar)[0], corpus[0][1])
+    rss_inicial = pico_rss_mb()
+
+    extraidos = cronometrar('texto', lambda: [
+        extrair_texto_pdf(conteudo, backend, podar) for conteudo, _, _ in corpus
+    ])
+    resultados = cronometrar('extratores', lambda: [
+        extrair_todos_modulos(texto, nome) for (texto, _), (_, nome, _) in zip(extraidos, corpus)
+    ])
+    tabelas = cronometrar('tabelas', lambda: montar_tabelas(
+        [r['vs'] for r in resultados], [r['ra'] for r in resultados],
+        [r['pp'] for r in resultados], [r['ic'] for r in resultados]
+    ))
+
+    datas = [r['pp']['Data Relatório'] for r in resultados if r['pp']['Data Relatório']]
+    fiscal = resultados[0]['pp']['Fiscal'] or "Não identificado"
+    cronometrar('relatorios', lambda: gerar_relatorios(*tabelas, fiscal, min(datas), max(datas)))
+
+    return {
+        'arquivos': tamanho,
+        'megabytes': sum(len(conteudo) for conteudo, _, _ in corpus) / 2**20,
+        'paginas': sum(info['paginas_total'] for _, info in extraidos),
+        'paginas_lidas': sum(info['paginas'] for _, info in extraidos),
+        'divergencias': sum(1 for r, (_, _, esperado) in zip(resultados, corpus) if divergencias(r, esperado)),
+        'divergencias_mapa': divergencias_mapa(resultados),
+        'rss_inicial_mb': rss_inicial,
+        'etapas': etapas
+    }
+
+def _formatar_rss(valor):
+    return f"{valor:8.1f} MB" if valor is not None else "     n/d   "
+
+def exibir(resultado):
+    print(f"\n{resultado['arquivos']} arquivo(s), {resultado['megabytes']:.1f} MB, "
+          f"{resultado['paginas_lidas']} de {resultado['paginas']} página(s) lidas "
+          f"(RSS inicial: {_formatar_rss(resultado['rss_inicial_mb']).strip()})")
+    for etapa in ETAPAS:
+        medida = resultado['etapas'][etapa]
+        print(f"  {etapa:<12} {medida['segundos']:9.3f} s  {medida['arquivos_s'] or 0:10.1f} arquivos/s  "
+              f"pico RSS {_formatar_rss(medida['pico_rss_mb'])}")
+    if resultado['divergencias']:
+        print(f"  ATENÇÃO: {resultado['divergencias']} arquivo(s) com dados diferentes dos gerados")
+    if resultado['divergencias_mapa']:
+        print(f"  ATENÇÃO: {resultado['divergencias_mapa']} célula(s) do mapa fora da posição ou com outra quantidade")
+
+def comparar(resultados, baseline, tolerancia):
+    """Compara com o baseline; retorna o número de regressões"""
+    regressoes = 0
+    print(f"\nComparação com o baseline (tolerância {tolerancia:.0%}):")
+    for tamanho, resultado in resultados.items():
+        anterior = baseline['resultados'].get(str(tamanho))
+        if anterior is None:
+            print(f"  {tamanho:>6}: sem medida no baseline")
+            continue
+        for etapa in ETAPAS:
+            atual, base = resultado['etapas'][etapa], anterior['etapas'].get(etapa)
+            if not base or not base['arquivos_s'] or not atual['arquivos_s']:
+                continue
+            variacao = atual['arquivos_s'] / base['arquivos_s'] - 1
+            marcas = []
+            if variacao < -tolerancia:
+                marcas.append("MAIS LENTO")
+            if atual['pico_rss_mb'] and base['pico_rss_mb'] and \
+                    atual['pico_rss_mb'] > base['pico_rss_mb'] * (1 + tolerancia):
+                marcas.append("MAIS MEMÓRIA")
+            regressoes += bool(marcas)
+            print(f"  {tamanho:>6} {etapa:<12} {base['arquivos_s']:10.1f} -> {atual['arquivos_s']:10.1f} arquivos/s "
+                  f"({variacao:+7.1%})  {' '.join(marcas)}")
+        if resultado['divergencias'] > anterior.get('divergencias', 0):
+            regressoes += 1
+            print(f"  {tamanho:>6} divergências: {anterior.get('divergencias', 0)} -> {resultado['divergencias']}")
+        if resultado['divergencias_mapa'] > anterior.get('divergencias_mapa', 0):
+            regressoes += 1
+            print(f"  {tamanho:>6} células divergentes no mapa: "
+                  f"{anterior.get('divergencias_mapa', 0)} -> {resultado['divergencias_mapa']}")
+    return regressoes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=TAMANHOS_PADRAO)
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--backend', choices=list(BACKENDS_TEXTO), default=BACKEND_PADRAO)
+    parser.add_argument('--sem-podar', dest='podar', action='store_false',
+                        help='Lê todas as páginas, mesmo após as seções do relatório')
+    parser.add_argument('--salvar-baseline', help='Grava os resultados neste arquivo JSON')
+    parser.add_argument('--baseline', help='Compara os resultados com este arquivo JSON')
+    parser.add_argument('--tolerancia', type=float, default=0.15,
+                        help='Variação relativa aceita antes de apontar regressão (padrão: 0.15)')
+    args = parser.parse_args()
+
+    configuracao = {'semente': args.semente, 'backend': args.backend, 'podar': args.podar}
+    print(f"Pipeline: backend {args.backend}, {'com' if args.podar else 'sem'} poda de páginas, "
+          f"Python {platform.python_version()} em {platform.platform()}")
+
+    resultados = {}
+    for tamanho in args.tamanhos:
+        # Um processo por tamanho: o pico de RSS não carrega o lote anterior
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+            resultados[tamanho] = executor.submit(medir_tamanho, tamanho, args.semente, args.backend, args.podar).result()
+        exibir(resultados[tamanho])
+
+    if args.salvar_baseline:
+        with open(args.salvar_baseline, 'w', encoding='utf-8') as f:
+            json.dump({
+                'formato': FORMATO_BASELINE,
+                'configuracao': configuracao,
+                'ambiente': {'python': platform.python_version(), 'plataforma': platform.platform()},
+                'resultados': {str(t): r for t, r in resultados.items()}
+            }, f, ensure_ascii=False, indent=2)
+        print(f"\nBaseline gravado em {args.salvar_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('configuracao') != configuracao:
+            print(f"\nAVISO: configuração do baseline difere da atual: {baseline.get('configuracao')}")
+        regressoes = comparar(resultados, baseline, args.tolerancia)
+        print(f"{regressoes} regressão(ões) encontrada(s)")
+        return 1 if regressoes else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
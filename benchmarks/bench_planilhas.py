@@ -0,0 +1,126 @@
+"""
+Compara a leitura de uma planilha de autuações com pandas.read_excel e com
+o Processador de Planilhas (leitura em blocos, Arrow e cache em Parquet).
+
+Uso:
+    python benchmarks/bench_planilhas.py [--linhas 200000] [--planilha autuacoes.xlsx] [--sem-pandas]
+
+Sem --planilha, uma planilha sintética é gerada com o openpyxl (modo
+write-only). Cada medida roda em um processo novo, para que o pico de RSS
+seja apenas o dela (entre parênteses, o acréscimo sobre o RSS após os imports):
+    pandas      pandas.read_excel da aba inteira (referência)
+    conversao   ler_planilha em blocos e gravação no cache em Parquet
+    reabertura  leitura do Parquet em cache (planilha enviada de novo)
+    consolidacao totais e consolidação por fiscal e município (Arrow)
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from multiprocessing import get_context
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FISCAIS = ["ANA SOUZA", "JOSÉ LIMA", "FERNANDA ROCHA", "CARLOS MELO", "PAULA REIS"]
+MUNICIPIOS = ["Rio de Janeiro", "Niterói", "Petrópolis", "Campos dos Goytacazes", "Volta Redonda", "Macaé"]
+INFRACOES = ["Falta de ART", "Exercício ilegal", "Falta de registro de empresa", "Acobertamento"]
+SITUACOES = ["Em aberto", "Paga", "Cancelada", "Em recurso"]
+
+def pico_rss_mb():
+    """Pico de memória residente do processo, em MB (None se indisponível)"""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / 2**20 if sys.platform == 'darwin' else pico / 1024  # bytes no macOS, KB no Linux
+
+def gerar_planilha(caminho, linhas, semente=42):
+    """Planilha de autuações sintética, gravada linha a linha"""
+    from openpyxl import Workbook
+    aleatorio = random.Random(semente)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Autuações")
+    ws.append(["Nº Auto", "Data", "Fiscal", "Município", "Infração", "Situação", "Processo", "Valor (R$)"])
+    inicio = datetime(2024, 1, 1)
+    for i in range(linhas):
+        # Alguns números de processo vêm como texto, como nas exportações reais
+        processo = aleatorio.randint(100000, 999999)
+        if aleatorio.random() < 0.05:
+            processo = f"PR-{processo}"
+        ws.append([
+            i + 1, inicio + timedelta(days=aleatorio.randint(0, 729)), aleatorio.choice(FISCAIS),
+            aleatorio.choice(MUNICIPIOS), aleatorio.choice(INFRACOES), aleatorio.choice(SITUACOES),
+            processo, round(aleatorio.uniform(500, 25000), 2)
+        ])
+    wb.save(caminho)
+
+def medir(medida, caminho, pasta_cache):
+    """Executa uma medida neste processo; retorna (segundos, RSS após os imports, pico de RSS, linhas)"""
+    import pandas as pd
+    from cache_extracao import calcular_hash
+    from planilhas import CachePlanilhas, consolidar, colunas_numericas, ler_planilha, totais
+    with open(caminho, 'rb') as f:
+        conteudo = f.read()
+    cache = CachePlanilhas(pasta_cache)
+    hash_conteudo = calcular_hash(conteudo)
+    if medida == 'consolidacao':
+        tabela = cache.obter(hash_conteudo, None)
+    rss_inicial = pico_rss_mb()
+
+    inicio = time.perf_counter()
+    if medida == 'pandas':
+        linhas = len(pd.read_excel(caminho, engine='openpyxl'))
+    else:
+        if medida == 'conversao':
+            tabela = ler_planilha(conteudo)
+            cache.gravar(hash_conteudo, None, tabela)
+        elif medida == 'reabertura':
+            tabela = cache.obter(hash_conteudo, None)
+        else:
+            somar = colunas_numericas(tabela)
+            totais(tabela, somar)
+            consolidar(tabela, ['Fiscal', 'Município'], somar)
+        linhas = tabela.num_rows
+    return time.perf_counter() - inicio, rss_inicial, pico_rss_mb(), linhas
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--linhas', type=int, default=200000, help='Linhas da planilha sintética (padrão: 200000)')
+    parser.add_argument('--planilha', help='Usa esta planilha em vez da sintética')
+    parser.add_argument('--sem-pandas', action='store_true', help='Não mede o pandas.read_excel (lento)')
+    args = parser.parse_args()
+
+    pasta = tempfile.mkdtemp()
+    try:
+        caminho = args.planilha
+        if not caminho:
+            caminho = os.path.join(pasta, "autuacoes.xlsx")
+            inicio = time.perf_counter()
+            gerar_planilha(caminho, args.linhas)
+            print(f"Planilha sintética de {args.linhas} linhas gerada em {time.perf_counter() - inicio:.1f} s")
+        print(f"{os.path.basename(caminho)}: {os.path.getsize(caminho) / 2**20:.1f} MB\n")
+
+        medidas = ['conversao', 'reabertura', 'consolidacao']
+        if not args.sem_pandas:
+            medidas.insert(0, 'pandas')
+        cache = os.path.join(pasta, "cache")
+        for medida in medidas:
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+                segundos, inicial, pico, linhas = executor.submit(medir, medida, caminho, cache).result()
+            rss = f"pico RSS {pico:7.1f} MB (+{pico - inicial:6.1f} MB)" if pico is not None else "pico RSS n/d"
+            print(f"  {medida:<13} {segundos * 1000:10.1f} ms  {rss}  ({linhas} linhas)")
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
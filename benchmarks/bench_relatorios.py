@@ -0,0 +1,115 @@
+"""
+Mede o tempo e a memória de renderização dos relatórios PDF e do Excel
+Consolidado.
+
+Uso:
+    python benchmarks/bench_relatorios.py [--linhas 10000]
+
+Gera DataFrames sintéticos com o formato produzido pelo Extrator PDF
+Consolidado (incluindo textos longos que quebram em várias linhas) e
+renderiza cada um dos relatórios, informando o tempo, o pico de
+memória alocada (tracemalloc, medido em uma segunda renderização), o
+número de páginas (PDF) e o tamanho do arquivo.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from relatorios import (
+    gerar_excel_consolidado, gerar_extrato_consolidado, gerar_relatorio_informacoes_complementares,
+    gerar_relatorio_processo_protocolo, gerar_relatorio_ramo_atividade, gerar_relatorio_vinculos_si
+)
+
+RAMOS = [
+    'ENGENHARIA CIVIL', 'ENGENHARIA ELÉTRICA', 'AGRONOMIA', 'ENGENHARIA MECÂNICA',
+    'ENGENHARIA DE SEGURANÇA DO TRABALHO E MANUTENÇÃO DE SISTEMAS PREDIAIS COMPLEXOS',
+]
+MARCADOR_PAGINA = b'/Type /Page\n'
+PALAVRAS = 'obra reforma laudo vistoria fachada estrutura projeto instalação elétrica ART registrada'.split()
+
+def texto_aleatorio(rng, minimo, maximo):
+    return ' '.join(rng.choice(PALAVRAS) for _ in range(rng.randint(minimo, maximo)))
+
+def gerar_dados(linhas, semente=0):
+    """Monta os DataFrames de entrada dos relatórios com `linhas` arquivos"""
+    rng = random.Random(semente)
+    arquivos = [f"relatorio_fiscalizacao_{i:06d}_{texto_aleatorio(rng, 0, 3).replace(' ', '_')}.pdf"
+                for i in range(linhas)]
+
+    df_vs = pd.DataFrame({
+        'Arquivo': arquivos,
+        'Vínculos': [rng.randint(0, 5) for _ in arquivos],
+        'S.I': [rng.randint(0, 3) for _ in arquivos],
+    })
+    df_vs.loc['TOTAL'] = {'Arquivo': 'TOTAL', 'Vínculos': df_vs['Vínculos'].sum(), 'S.I': df_vs['S.I'].sum()}
+
+    ramos = [(i, a, rng.choice(RAMOS), rng.randint(1, 3))
+             for i, a in enumerate(arquivos) for _ in range(rng.randint(0, 2))]
+    df_ra = pd.DataFrame(ramos, columns=['Documento', 'Arquivo', 'Ramo', 'Qtd'])
+    df_ra['Arquivo'] = df_ra['Arquivo'].astype('category')
+    df_ra['Ramo'] = df_ra['Ramo'].astype('category')
+
+    protocolos = [', '.join(f"{rng.randint(100000, 999999)}/2025" for _ in range(rng.randint(0, 4)))
+                  for _ in arquivos]
+    legalizacoes = [texto_aleatorio(rng, 0, 12) for _ in arquivos]
+    df_pp = pd.DataFrame({
+        'Arquivo': arquivos,
+        'Fiscal': 'FISCAL DE TESTE',
+        'Protocolo': protocolos,
+        'Legalização': legalizacoes,
+        'Qtd. Protocolo': [p.count('/') for p in protocolos],
+        'Qtd. Legalização': [1 if l else 0 for l in legalizacoes],
+    })
+    total_pp = pd.DataFrame({
+        'Arquivo': ['TOTAL GERAL'],
+        'Qtd. Protocolo': [df_pp['Qtd. Protocolo'].sum()],
+        'Qtd. Legalização': [df_pp['Qtd. Legalização'].sum()]
+    })
+    df_pp = pd.concat([df_pp, total_pp], ignore_index=True)
+
+    df_ic = pd.DataFrame({
+        'Arquivo': arquivos,
+        'Informações': [texto_aleatorio(rng, 0, 60) if rng.random() < 0.5 else '' for _ in arquivos],
+    })
+    return df_vs, df_ra, df_pp, df_ic
+
+def medir(descricao, funcao):
+    # O tempo é medido sem o tracemalloc, que torna a alocação mais lenta
+    inicio = time.perf_counter()
+    pdf = funcao()
+    duracao = time.perf_counter() - inicio
+    tracemalloc.start()
+    funcao()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    paginas = f"{pdf.count(MARCADOR_PAGINA):6d} página(s)" if pdf.startswith(b'%PDF') else ' ' * 16
+    print(f"{descricao:<28} {duracao:8.2f} s  pico {pico / 2**20:7.1f} MB  {paginas}  {len(pdf) / 2**20:6.1f} MB")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--linhas', type=int, default=10000)
+    args = parser.parse_args()
+
+    df_vs, df_ra, df_pp, df_ic = gerar_dados(args.linhas)
+    print(f"Relatórios com {args.linhas} arquivo(s), {len(df_ra)} linha(s) de ramo")
+
+    medir("Vínculos e S.I", lambda: gerar_relatorio_vinculos_si(df_vs))
+    medir("Ramo de Atividade", lambda: gerar_relatorio_ramo_atividade(df_ra))
+    medir("Processo/Protocolo", lambda: gerar_relatorio_processo_protocolo(df_pp))
+    medir("Informações Complementares", lambda: gerar_relatorio_informacoes_complementares(df_ic))
+    medir("Extrato Consolidado", lambda: gerar_extrato_consolidado(
+        df_vs, df_ra, df_pp, df_ic, 'FISCAL DE TESTE', '01/01/2025', '31/12/2025'
+    ))
+    medir("Excel Consolidado", lambda: gerar_excel_consolidado(
+        df_vs, df_ra, df_pp, df_ic, 'FISCAL DE TESTE', '01/01/2025', '31/12/2025'
+    ))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Compara os extratores baseados no tokenizador de seções com a implementação
+anterior (buscas regex repetidas sobre o texto inteiro) em textos sintéticos
+grandes, verificando que as saídas são idênticas.
+
+Uso:
+    python benchmarks/bench_tokenizador.py [--repeticoes 20]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from consolidacao import formatar_ramos
+from extracao import extrair_data_formatada, extrair_todos_modulos
+
+# =================== IMPLEMENTAÇÃO ANTERIOR (REFERÊNCIA) ===================
+def antigo_vinculos_si(texto, filename):
+    dados = {'Arquivo': filename}
+    coord = re.search(r"Latitude\s*:\s*([-\d,.]+).*?Longitude\s*:\s*([-\d,.]+)", texto)
+    if coord:
+        try:
+            dados.update({
+                'Latitude': float(coord.group(1).replace(',', '.')),
+                'Longitude': float(coord.group(2).replace(',', '.'))
+            })
+        except ValueError:
+            dados.update({'Latitude': None, 'Longitude': None})
+    endereco = re.search(r'01\s*-\s*Endereço\s*Empreendimento\s*(.*?)(?=\s*(?:02\s*-|Descritivo:|$))', texto, re.DOTALL)
+    dados['Endereço'] = re.sub(r'\s+', ' ', endereco.group(1).strip().replace('\n', ' ')) if endereco else None
+    secao = re.search(r'04\s*-\s*Identificação.*?(?=05\s*-|$)', texto, re.DOTALL)
+    if secao:
+        secao_texto = secao.group()
+        dados.update({
+            'CONTRATADO': len(re.findall(r'CONTRATADO\s*:', secao_texto)),
+            'RESPONSAVEL TECNICO': len(re.findall(r'RESPONSAVEL\s*TECNICO\s*:', secao_texto))
+        })
+        dados['Vínculos'] = dados['CONTRATADO'] + dados['RESPONSAVEL TECNICO']
+    oficios = re.findall(r'(?:OF[IÍ]CIO\s*[Nnº°]*\s*[.:-]*\s*)?(\d+.*?GFIS.*?)(?:\n|$)', texto, re.IGNORECASE)
+    dados.update({
+        'Ofícios GFIS': '; '.join(o.strip() for o in oficios) if oficios else '',
+        'S.I': len(oficios) if oficios else 0
+    })
+    return dados
+
+def antigo_ramo_atividade(texto, filename):
+    dados = {'Arquivo': filename, 'Ramo': '', 'Qtd. Ramo': ''}
+    secao = re.search(r'04\s*-\s*Identificação.*?(?=05\s*-|$)', texto, re.DOTALL|re.IGNORECASE)
+    if secao:
+        ramos = re.findall(r'Ramo\s*Atividade\s*:\s*(.*?)(?=\n|$)', secao.group(), re.IGNORECASE)
+        if ramos:
+            contagem = defaultdict(int)
+            for ramo in [r.strip() for r in ramos if r.strip()]:
+                contagem[ramo] += 1
+            dados['Ramo'] = ", ".join(contagem.keys())
+            dados['Qtd. Ramo'] = ", ".join(map(str, contagem.values()))
+    return dados
+
+def antigo_processo_protocolo(texto, filename):
+    dados = {
+        'Arquivo': filename, 'Fiscal': '', 'Protocolo': '', 'Legalização': '',
+        'Qtd. Protocolo': 0, 'Qtd. Legalização': 0, 'Data Relatório': ''
+    }
+    fiscal = re.search(r'Agente\s+de\s+Fiscalização\s*:\s*([^\n]+)', texto)
+    if fiscal:
+        dados['Fiscal'] = fiscal.group(1).strip()
+    protocolo = re.search(r'Fato\s+Gerador\s*:\s*.*?(PROCESSO/PROTOCOLO[\s\-]*\d+[/\-]?\d*)', texto, re.IGNORECASE)
+    if protocolo:
+        nums = re.findall(r'\d+', protocolo.group(1))
+        dados['Protocolo'] = ''.join(nums) if nums else ''
+        dados['Qtd. Protocolo'] = 1 if nums else 0
+    secao_docs = re.search(r'(?i)06\s*-\s*Documentos\s*Recebidos(.*?)(?=\n\s*(?:07|$))', texto, re.DOTALL)
+    if secao_docs:
+        outros_match = re.search(r'(?i)OUTROS\s*[:\-]\s*(.*?)(?=\n|$)', secao_docs.group(1))
+        if outros_match:
+            outros_texto = ' '.join(outros_match.group(1).strip().split())
+            if outros_texto:
+                dados['Legalização'] = outros_texto
+                dados['Qtd. Legalização'] = 1
+    data_relatorio = re.search(r'Data\s+Relatório\s*:\s*([^\n]+)', texto)
+    if data_relatorio:
+        dados['Data Relatório'] = extrair_data_formatada(data_relatorio.group(1))
+    return dados
+
+def antigo_informacoes_complementares(texto_pdf, nome_arquivo):
+    padrao = (
+        r'07\s*-\s*Outras\s+Informações.*?'
+        r'Informações\s+Complementares\s*:\s*'
+        r'(.*?)'
+        r'(?=\n\s*(?:08\s*-|\d{2}\s*-|$))'
+    )
+    match = re.search(padrao, texto_pdf, re.IGNORECASE | re.DOTALL)
+    if not match:
+        return {'Arquivo': nome_arquivo, 'Informações': ''}
+    informacoes = re.findall(r'\((.*?)\)', match.group(1))
+    if not informacoes:
+        return {'Arquivo': nome_arquivo, 'Informações': ''}
+    dados_limpos = [info.strip().replace('\n', ' ') for info in informacoes if info.strip()]
+    return {'Arquivo': nome_arquivo, 'Informações': ', '.join(dados_limpos) if dados_limpos else ''}
+
+def antigo_todos_modulos(texto, filename):
+    """Fluxo anterior: quatro extratores + buscas repetidas de data e fiscal"""
+    resultado = {
+        'vs': antigo_vinculos_si(texto, filename),
+        'ra': antigo_ramo_atividade(texto, filename),
+        'pp': antigo_processo_protocolo(texto, filename),
+        'ic': antigo_informacoes_complementares(texto, filename)
+    }
+    re.search(r'Data\s+Relatório\s*:\s*([^\n]+)', texto)
+    re.search(r'Agente\s+de\s+Fiscalização\s*:\s*([^\n]+)', texto)
+    return resultado
+
+# =================== TEXTOS SINTÉTICOS ===================
+def gerar_texto(linhas_por_secao, completo=True):
+    """Relatório sintético com seções longas; sem o campo de Informações Complementares quando completo=False"""
+    partes = [
+        "Data Relatório: 10/03/2025 09:30",
+        "Agente de Fiscalização: FISCAL TESTE",
+        "01 - Endereço Empreendimento",
+        "Rua Exemplo, 100 - Centro",
+        "Latitude: -22,906 Longitude: -43,172",
+        "02 - Descritivo",
+    ]
+    partes += [f"Linha descritiva {i} com números 123 456 e texto livre" for i in range(linhas_por_secao)]
+    partes.append("04 - Identificação")
+    for i in range(linhas_por_secao):
+        partes += [f"CONTRATADO: EMPRESA {i}", f"RESPONSAVEL TECNICO: PROFISSIONAL {i}",
+                   f"Ramo Atividade: RAMO {i % 7}"]
+    partes += ["05 - Documentos Solicitados", "OFICIO 12/2025 GFIS", "06 - Documentos Recebidos"]
+    partes += [f"Documento {i} recebido em 01/01/2025" for i in range(linhas_por_secao)]
+    partes += ["OUTROS: ART registrada", "07 - Outras Informações",
+               "Fato Gerador: PROCESSO/PROTOCOLO 2025-000123"]
+    partes += [f"Observação {i} (nota {i})" for i in range(linhas_por_secao)]
+    if completo:
+        partes.append("Informações Complementares: (vistoria concluída) (retorno agendado)")
+    partes.append("08 - Fotos")
+    partes += [f"Foto {i} 2025 legenda" for i in range(linhas_por_secao)]
+    return "\n".join(partes)
+
+def medir(funcao, texto, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        resultado = funcao(texto, 'relatorio.pdf')
+    return (time.perf_counter() - inicio) / repeticoes, resultado
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeticoes', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'Linhas/seção':>12} {'Texto (KB)':>10} {'Anterior (ms)':>14} {'Tokenizador (ms)':>17} {'Ganho':>7}")
+    for completo in (True, False):
+        for linhas in (50, 500, 2000, 8000):
+            texto = gerar_texto(linhas, completo)
+            t_antigo, antigo = medir(antigo_todos_modulos, texto, args.repeticoes)
+            t_novo, novo = medir(extrair_todos_modulos, texto, args.repeticoes)
+            # Ramo de Atividade passou ao formato de lista; compara o texto de apresentação
+            ramo, qtd = formatar_ramos(novo['ra']['Ramos'])
+            novo['ra'] = {'Arquivo': novo['ra']['Arquivo'], 'Ramo': ramo, 'Qtd. Ramo': qtd}
+            for modulo in ('vs', 'ra', 'pp', 'ic'):
+                assert antigo[modulo] == novo[modulo], f"Saída divergente em '{modulo}'"
+            print(f"{linhas:>12} {len(texto) / 1024:>10.0f} {t_antigo * 1000:>14.2f} "
+                  f"{t_novo * 1000:>17.2f} {t_antigo / t_novo:>6.1f}x"
+                  + ("" if completo else "  (sem Informações Complementares)"))
+
+if __name__ == "__main__":
+    main()
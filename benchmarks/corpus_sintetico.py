@@ -0,0 +1,234 @@
+"""
+Gera relatórios de fiscalização sintéticos, com o layout esperado pelos
+extratores, para medições sem depender de relatórios reais do CREA-RJ.
+
+Uso:
+    python benchmarks/corpus_sintetico.py PASTA [--arquivos 1000] [--semente 0]
+
+Cada relatório traz o cabeçalho (Data Relatório, Agente de Fiscalização e
+Fato Gerador), as seções 01 a 07 com um número variável de CONTRATADO,
+RESPONSAVEL TECNICO e Ramo Atividade, ofícios GFIS, documentos recebidos,
+informações complementares entre parênteses e, opcionalmente, páginas de
+anexo (registro fotográfico) que não contêm dados extraídos.
+Parte dos relatórios tem linhas longas (ponto de referência do endereço,
+descritivo, atividade e OUTROS dos documentos recebidos) quebradas com
+hífen no meio das palavras, como nos relatórios reais.
+A geração é determinística para uma mesma semente.
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+from fpdf import FPDF
+
+FISCAIS = ['ANA PAULA MOREIRA', 'CARLOS EDUARDO SANTOS', 'FERNANDA LIMA COSTA', 'JOSÉ ROBERTO ALVES']
+RAMOS = [
+    'ENGENHARIA CIVIL', 'ENGENHARIA ELÉTRICA', 'AGRONOMIA', 'ENGENHARIA MECÂNICA',
+    'ENGENHARIA DE SEGURANÇA DO TRABALHO', 'GEOLOGIA', 'ENGENHARIA SANITÁRIA E AMBIENTAL',
+]
+EMPRESAS = ['CONSTRUTORA HORIZONTE LTDA', 'MONTAGENS ATLÂNTICO S.A.', 'ELETRO SERVIÇOS RIO LTDA',
+            'ENGEPLAN PROJETOS E OBRAS', 'AGRO VALE CONSULTORIA']
+PROFISSIONAIS = ['MARCELO TAVARES', 'LUCIANA PEREIRA', 'RICARDO GOMES', 'PATRÍCIA NUNES', 'ANDRÉ SOUZA']
+LOGRADOUROS = ['Rua da Assembleia', 'Avenida Presidente Vargas', 'Rua Conde de Bonfim',
+               'Estrada do Galeão', 'Avenida das Américas', 'Rua Voluntários da Pátria']
+BAIRROS = ['Centro', 'Tijuca', 'Barra da Tijuca', 'Botafogo', 'Ilha do Governador', 'Campo Grande']
+FATOS_GERADORES = ['DENÚNCIA', 'AÇÃO DE ROTINA', 'OPERAÇÃO ESPECIAL']
+DOCUMENTOS = ['ART de execução', 'ART de projeto', 'Alvará de obra', 'Contrato social',
+              'Certidão de registro', 'Laudo técnico']
+PALAVRAS = ('obra reforma vistoria fachada estrutura projeto instalação elétrica fundação '
+            'cobertura alvenaria pavimento andaime equipamento canteiro responsável execução').split()
+
+# Caracteres por linha nos trechos quebrados com hífen
+LARGURA_LINHA = 80
+
+def _frase(rng, minimo, maximo):
+    return ' '.join(rng.choice(PALAVRAS) for _ in range(rng.randint(minimo, maximo)))
+
+def _quebrar(texto, largura=LARGURA_LINHA):
+    """
+    Quebra o texto em linhas de até `largura` caracteres. A palavra que
+    passa do limite é dividida com hífen no fim da linha (se sobrarem ao
+    menos duas letras de cada lado).
+    """
+    linhas, atual = [], ''
+    for palavra in texto.split(' '):
+        separador = ' ' if atual else ''
+        while len(atual) + len(separador) + len(palavra) > largura:
+            cabe = largura - len(atual) - len(separador) - 1
+            if cabe >= 2 and len(palavra) - cabe >= 2:
+                linhas.append(f"{atual}{separador}{palavra[:cabe]}-")
+                palavra = palavra[cabe:]
+            elif atual:
+                linhas.append(atual)
+            else:
+                break
+            atual, separador = '', ''
+        atual += separador + palavra
+    return linhas + [atual]
+
+def gerar_relatorio(indice, rng, anexos=None):
+    """
+    Gera um relatório sintético.
+    Retorna (conteúdo do PDF, valores esperados dos extratores).
+    """
+    data = date(2025, 1, 1) + timedelta(days=rng.randint(0, 364))
+    fiscal = rng.choice(FISCAIS)
+    protocolo = f"{rng.randint(2020, 2025)}{rng.randint(100000, 999999)}" if rng.random() < 0.6 else None
+    fato_gerador = f"PROCESSO/PROTOCOLO - {protocolo}" if protocolo else rng.choice(FATOS_GERADORES)
+
+    # 04 - Identificação: pares CONTRATADO / RESPONSAVEL TECNICO com os ramos
+    contratados, responsaveis, ramos = 0, 0, {}
+    identificacao = []
+    for _ in range(rng.randint(0, 4)):
+        identificacao.append(f"CONTRATADO: {rng.choice(EMPRESAS)}")
+        contratados += 1
+        for _ in range(rng.randint(0, 2)):
+            ramo = rng.choice(RAMOS)
+            identificacao.append(f"RESPONSAVEL TECNICO: {rng.choice(PROFISSIONAIS)}")
+            identificacao.append(f"Ramo Atividade: {ramo}")
+            responsaveis += 1
+            ramos[ramo] = ramos.get(ramo, 0) + 1
+
+    oficios = [f"{rng.randint(100, 9999)}/{data.year} GFIS - {rng.choice(DOCUMENTOS)}"
+               for _ in range(rng.randint(0, 3))]
+    # Linhas longas, quebradas com hífen, em parte dos relatórios
+    longo = rng.random() < 0.5
+    legalizacao = _frase(rng, 2, 30 if longo else 8) if rng.random() < 0.5 else ''
+    complementares = [_frase(rng, 2, 6) for _ in range(rng.randint(0, 3))]
+
+    pdf = FPDF()
+    pdf.set_auto_page_break(True, 15)
+    pdf.add_page()
+
+    def titulo(texto):
+        pdf.set_font('Arial', 'B', 10)
+        pdf.cell(0, 7, texto, 0, 1)
+        pdf.set_font('Arial', '', 9)
+
+    def linhas(*textos):
+        for texto in textos:
+            pdf.multi_cell(0, 5, texto)
+
+    def linhas_hifenizadas(*textos):
+        linhas(*(linha for texto in textos for linha in _quebrar(texto)))
+
+    pdf.set_font('Arial', 'B', 12)
+    pdf.cell(0, 8, "RELATÓRIO DE FISCALIZAÇÃO", 0, 1, 'C')
+    pdf.set_font('Arial', '', 9)
+    linhas(
+        f"Número: {indice:08d}",
+        f"Data Relatório: {data.strftime('%d/%m/%Y')}",
+        f"Agente de Fiscalização: {fiscal}",
+        f"Fato Gerador: {fato_gerador}",
+    )
+
+    titulo("01 - Endereço Empreendimento")
+    endereco = f"{rng.choice(LOGRADOUROS)}, nº {rng.randint(1, 3000)}, {rng.choice(BAIRROS)}, Rio de Janeiro/RJ"
+    if longo:
+        endereco += f" - Ponto de referência: {_frase(rng, 5, 15)}"
+    linhas_hifenizadas(endereco)
+    latitude = round(-22.75 - rng.random() * 0.3, 6)
+    longitude = round(-43.1 - rng.random() * 0.5, 6)
+    # Latitude e Longitude na mesma linha, como nos relatórios reais
+    coordenadas = f"Latitude: {latitude:.6f} Longitude: {longitude:.6f}".replace('.', ',')
+    linhas(coordenadas)
+
+    titulo("02 - Descritivo")
+    linhas_hifenizadas(f"Descritivo: {_frase(rng, 10, 60)}")
+
+    titulo("03 - Atividade Desenvolvida")
+    linhas_hifenizadas(_frase(rng, 5, 30))
+
+    titulo("04 - Identificação dos Envolvidos")
+    linhas(*identificacao or ["Nenhum envolvido identificado"])
+
+    titulo("05 - Documentos Solicitados")
+    linhas(*[f"OFÍCIO Nº {o}" for o in oficios] or ["Nenhum documento solicitado"])
+
+    titulo("06 - Documentos Recebidos")
+    recebidos = rng.sample(DOCUMENTOS, rng.randint(0, 3))
+    linhas(*recebidos)
+    linhas_hifenizadas(f"OUTROS: {legalizacao}")
+
+    titulo("07 - Outras Informações")
+    # Uma observação entre parênteses por linha
+    observacoes = [f"({c})" for c in complementares] or [""]
+    linhas(f"Informações Complementares: {observacoes[0]}", *observacoes[1:])
+
+    # 08 e anexos: registro fotográfico, sem dados extraídos
+    if anexos is None:
+        anexos = rng.choice([0, 0, 1, 2, 4])
+    titulo("08 - Registro Fotográfico")
+    linhas(f"{anexos} página(s) de anexo" if anexos else "Sem registro fotográfico")
+    for pagina in range(anexos):
+        pdf.add_page()
+        pdf.set_font('Arial', 'B', 10)
+        pdf.cell(0, 7, f"ANEXO {pagina + 1} - REGISTRO FOTOGRÁFICO", 0, 1)
+        for foto in range(4):
+            y = 25 + foto * 65
+            pdf.rect(15, y, 85, 55)
+            pdf.rect(110, y, 85, 55)
+            pdf.set_xy(15, y + 56)
+            pdf.set_font('Arial', '', 7)
+            pdf.cell(0, 4, f"Foto {foto + 1}: {_frase(rng, 3, 10)}", 0, 1)
+
+    esperado = {
+        'Data Relatório': data.strftime('%d/%m/%Y'),
+        'Fiscal': fiscal,
+        'Latitude': latitude,
+        'Longitude': longitude,
+        # A seção 01 inteira, com a linha das coordenadas; cada quebra de
+        # linha vira um espaço e a palavra dividida mantém o hífen
+        'Endereço': f"{' '.join(_quebrar(endereco))} {coordenadas}",
+        'Vínculos': contratados + responsaveis,
+        'S.I': len(oficios),
+        'Ramos': sorted(ramos.items()),
+        'Protocolo': protocolo or '',
+        'Qtd. Legalização': 1 if legalizacao else 0,
+        'Informações': ', '.join(complementares),
+    }
+    return pdf.output(dest='S').encode('latin1'), esperado
+
+def gerar_corpus(quantidade, semente=0):
+    """Gera (conteúdo, nome do arquivo, valores esperados) para `quantidade` relatórios"""
+    rng = random.Random(semente)
+    for indice in range(quantidade):
+        conteudo, esperado = gerar_relatorio(indice, rng)
+        yield conteudo, f"relatorio_fiscalizacao_{indice:06d}.pdf", esperado
+
+def divergencias(resultado, esperado):
+    """Campos em que o resultado de extrair_todos_modulos difere do esperado"""
+    obtido = {
+        'Data Relatório': resultado['pp']['Data Relatório'],
+        'Fiscal': resultado['pp']['Fiscal'],
+        'Latitude': resultado['vs'].get('Latitude'),
+        'Longitude': resultado['vs'].get('Longitude'),
+        'Endereço': resultado['vs'].get('Endereço'),
+        'Vínculos': resultado['vs'].get('Vínculos'),
+        'S.I': resultado['vs']['S.I'],
+        'Ramos': sorted((ramo, qtd) for ramo, qtd in resultado['ra']['Ramos']),
+        'Protocolo': resultado['pp']['Protocolo'],
+        'Qtd. Legalização': resultado['pp']['Qtd. Legalização'],
+        'Informações': resultado['ic']['Informações'],
+    }
+    return [campo for campo, valor in esperado.items() if obtido[campo] != valor]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('pasta', help='Pasta onde os PDFs serão gravados')
+    parser.add_argument('--arquivos', type=int, default=1000)
+    parser.add_argument('--semente', type=int, default=0)
+    args = parser.parse_args()
+
+    os.makedirs(args.pasta, exist_ok=True)
+    tamanho = 0
+    for conteudo, nome, _ in gerar_corpus(args.arquivos, args.semente):
+        with open(os.path.join(args.pasta, nome), 'wb') as f:
+            f.write(conteudo)
+        tamanho += len(conteudo)
+    print(f"{args.arquivos} relatório(s) gravados em {args.pasta} ({tamanho / 2**20:.1f} MB)")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+# =================== CACHE DE EXTRAÇÃO ===================
+def calcular_hash(conteudo):
+    """Retorna o SHA-256 (hex) do conteúdo de um arquivo"""
+    return hashlib.sha256(conteudo).hexdigest()
+
+class CacheExtracao:
+    """
+    Cache em disco (SQLite) dos resultados de extração, indexado pelo
+    SHA-256 do arquivo e pela versão do extrator. O tamanho total é limitado
+    e as entradas menos usadas recentemente são removidas primeiro (LRU).
+    Uma única instância pode ser compartilhada entre sessões e threads.
+    """
+
+    def __init__(self, caminho, tamanho_max=512 * 1024 * 1024):
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        self.caminho = caminho
+        self.tamanho_max = tamanho_max
+        self.acertos = 0
+        self.falhas = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(caminho, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS extracoes (
+                chave TEXT PRIMARY KEY,
+                dados BLOB NOT NULL,
+                tamanho INTEGER NOT NULL,
+                ultimo_acesso REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_acesso ON extracoes (ultimo_acesso)")
+        self._conn.commit()
+
+    @staticmethod
+    def _chave(hash_conteudo, versao):
+        return f"{versao}:{hash_conteudo}"
+
+    def obter(self, hash_conteudo, versao):
+        """Retorna o resultado armazenado ou None se não houver entrada"""
+        chave = self._chave(hash_conteudo, versao)
+        with self._lock:
+            linha = self._conn.execute(
+                "SELECT dados FROM extracoes WHERE chave = ?", (chave,)
+            ).fetchone()
+            if linha is None:
+                self.falhas += 1
+                return None
+            self._conn.execute(
+                "UPDATE extracoes SET ultimo_acesso = ? WHERE chave = ?", (time.time(), chave)
+            )
+            self._conn.commit()
+            self.acertos += 1
+        return json.loads(zlib.decompress(linha[0]).decode('utf-8'))
+
+    def gravar(self, hash_conteudo, versao, dados):
+        """Armazena o resultado e aplica o limite de tamanho"""
+        blob = zlib.compress(json.dumps(dados, ensure_ascii=False).encode('utf-8'))
+        chave = self._chave(hash_conteudo, versao)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extracoes (chave, dados, tamanho, ultimo_acesso) VALUES (?, ?, ?, ?)",
+                (chave, blob, len(blob), time.time())
+            )
+            self._remover_excedente()
+            self._conn.commit()
+
+    def _remover_excedente(self):
+        """Remove as entradas menos usadas até caber no tamanho máximo"""
+        total = self._conn.execute("SELECT COALESCE(SUM(tamanho), 0) FROM extracoes").fetchone()[0]
+        if total <= self.tamanho_max:
+            return
+        for chave, tamanho in self._conn.execute(
+            "SELECT chave, tamanho FROM extracoes ORDER BY ultimo_acesso"
+        ).fetchall():
+            self._conn.execute("DELETE FROM extracoes WHERE chave = ?", (chave,))
+            total -= tamanho
+            if total <= self.tamanho_max:
+                break
+
+    def estatisticas(self):
+        """Retorna contadores de acertos/falhas e ocupação do cache"""
+        with self._lock:
+            entradas, tamanho = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM extracoes"
+            ).fetchone()
+        return {
+            'acertos': self.acertos,
+            'falhas': self.falhas,
+            'entradas': entradas,
+            'tamanho': tamanho
+        }
@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+
+# =================== RAMO DE ATIVIDADE ===================
+COLUNAS_RAMOS = ['Documento', 'Arquivo', 'Ramo', 'Qtd']
+
+def montar_ramos(dados_ra):
+    """
+    Monta a tabela longa de Ramo de Atividade: uma linha por
+    (Documento, Arquivo, Ramo, Qtd). Documento é a posição do arquivo em
+    dados_ra (a mesma das linhas de Vínculos e de Processo/Protocolo) e
+    distingue PDFs com o mesmo nome, como membros de ZIPs diferentes.
+    Arquivo e Ramo são categóricos na ordem em que aparecem; arquivos sem
+    ramo não têm linhas.
+    """
+    linhas = [(i, d['Arquivo'], ramo, qtd) for i, d in enumerate(dados_ra) for ramo, qtd in d['Ramos']]
+    df = pd.DataFrame(linhas, columns=COLUNAS_RAMOS)
+    df['Documento'] = df['Documento'].astype('int64')
+    arquivos = pd.unique(pd.Series([d['Arquivo'] for d in dados_ra], dtype=object))
+    df['Arquivo'] = pd.Categorical(df['Arquivo'], categories=arquivos)
+    df['Ramo'] = pd.Categorical(df['Ramo'], categories=pd.unique(df['Ramo'].astype(object)))
+    df['Qtd'] = df['Qtd'].astype('int64')
+    return df
+
+def ranking_ramos(df_ramos):
+    """Total por ramo em ordem decrescente, com a participação percentual"""
+    ranking = (
+        df_ramos.groupby('Ramo', observed=True)['Qtd'].sum()
+        .sort_values(ascending=False, kind='stable')
+        .reset_index()
+    )
+    ranking['Ramo'] = ranking['Ramo'].astype(str)
+    total = ranking['Qtd'].sum()
+    ranking['Porcentagem'] = ranking['Qtd'] / total * 100 if total > 0 else 0.0
+    return ranking
+
+def formatar_ramos(ramos):
+    """Texto de apresentação de uma lista de (ramo, qtd): ('A, B', '2, 1')"""
+    return ', '.join(str(r) for r, _ in ramos), ', '.join(str(q) for _, q in ramos)
+
+def exibicao_ramos(df_ramos, arquivos):
+    """
+    Tabela de apresentação no formato de uma linha por documento (com o
+    nome em `arquivos`, na ordem dos documentos), com os ramos e
+    quantidades em texto e a linha de TOTAL GERAL
+    """
+    textos = df_ramos[['Ramo', 'Qtd']].astype(str).groupby(df_ramos['Documento'], sort=True).agg(', '.join)
+    textos = textos.reindex(range(len(arquivos)), fill_value='')
+    exibicao = pd.DataFrame({
+        'Arquivo': [str(a) for a in arquivos],
+        'Ramo': textos['Ramo'].to_numpy(),
+        'Qtd. Ramo': textos['Qtd'].to_numpy()
+    })
+    total = pd.DataFrame({
+        'Arquivo': ['TOTAL GERAL'],
+        'Ramo': [''],
+        'Qtd. Ramo': [str(df_ramos['Qtd'].sum())]
+    })
+    return pd.concat([exibicao, total], ignore_index=True)
+
+# =================== TABELAS CONSOLIDADAS ===================
+FISCAL_NAO_IDENTIFICADO = "Não identificado"
+PERIODO_INDISPONIVEL = "Não disponível"
+
+def adicionar_totais(df_vs, df_pp):
+    """Acrescenta as linhas de TOTAL de Vínculos e S.I e de Processo/Protocolo"""
+    df_vs = df_vs.copy()
+    df_vs.loc['TOTAL'] = {
+        'Arquivo': 'TOTAL',
+        'Vínculos': df_vs['Vínculos'].sum(),
+        'S.I': df_vs['S.I'].sum()
+    }
+
+    # Total para Processo/Protocolo
+    total_pp = pd.DataFrame({
+        'Arquivo': ['TOTAL GERAL'],
+        'Qtd. Protocolo': [df_pp['Qtd. Protocolo'].sum()],
+        'Qtd. Legalização': [df_pp['Qtd. Legalização'].sum()]
+    })
+    df_pp = pd.concat([df_pp, total_pp], ignore_index=True)
+
+    return df_vs, df_pp
+
+def montar_tabelas(dados_vs, dados_ra, dados_pp, dados_ic):
+    """
+    Monta os DataFrames dos quatro módulos a partir dos resultados por
+    arquivo, com as linhas de TOTAL usadas pelos relatórios
+    """
+    df_vs, df_pp = adicionar_totais(pd.DataFrame(dados_vs), pd.DataFrame(dados_pp))
+    return df_vs, montar_ramos(dados_ra), df_pp, pd.DataFrame(dados_ic)
+
+def converter_datas(datas):
+    """Converte textos dd/mm/aaaa em datas (NaT quando inválidos ou vazios)"""
+    return pd.to_datetime(pd.Series(datas, dtype=object), format='%d/%m/%Y', errors='coerce')
+
+def periodo(datas):
+    """(início, fim) de uma série de datas, como dd/mm/aaaa, comparadas como datas"""
+    inicio, fim = datas.min(), datas.max()
+    if pd.isna(inicio):
+        return PERIODO_INDISPONIVEL, PERIODO_INDISPONIVEL
+    return inicio.strftime('%d/%m/%Y'), fim.strftime('%d/%m/%Y')
+
+def particionar_por_fiscal(df_vs, df_ra, df_pp, df_ic):
+    """
+    Divide as tabelas consolidadas por Agente de Fiscalização em uma única
+    passada de groupby. As linhas de arquivo de df_vs, df_pp e df_ic estão
+    na mesma ordem; df_ra é filtrada pelos documentos de cada fiscal, que
+    são renumerados na ordem da partição.
+
+    Retorna uma lista de dicts com 'fiscal', 'data_inicio', 'data_fim' e as
+    quatro tabelas do fiscal, com os totais recalculados, ordenada do
+    fiscal com mais arquivos para o com menos.
+    """
+    arquivos_vs = df_vs[df_vs['Arquivo'] != 'TOTAL']
+    arquivos_pp = df_pp[df_pp['Arquivo'] != 'TOTAL GERAL']
+    base = pd.DataFrame({
+        'Fiscal': arquivos_pp['Fiscal'].fillna('').replace('', FISCAL_NAO_IDENTIFICADO).to_numpy(),
+        'Data': converter_datas(arquivos_pp['Data Relatório'].to_numpy()).to_numpy()
+    })
+
+    grupos = base.groupby('Fiscal', sort=True)
+    periodos = grupos['Data'].agg(['min', 'max'])
+    particoes = []
+    for fiscal, posicoes in grupos.indices.items():
+        df_vs_fiscal, df_pp_fiscal = adicionar_totais(
+            arquivos_vs.iloc[posicoes].reset_index(drop=True),
+            arquivos_pp.iloc[posicoes].reset_index(drop=True)
+        )
+        arquivos = pd.unique(arquivos_pp['Arquivo'].iloc[posicoes])
+        df_ra_fiscal = df_ra[df_ra['Documento'].isin(posicoes)].reset_index(drop=True)
+        df_ra_fiscal['Documento'] = np.searchsorted(posicoes, df_ra_fiscal['Documento'].to_numpy())
+        df_ra_fiscal['Arquivo'] = df_ra_fiscal['Arquivo'].cat.set_categories(arquivos)
+        df_ra_fiscal['Ramo'] = df_ra_fiscal['Ramo'].cat.remove_unused_categories()
+        data_inicio, data_fim = periodo(periodos.loc[fiscal, ['min', 'max']])
+        particoes.append({
+            'fiscal': fiscal,
+            'data_inicio': data_inicio,
+            'data_fim': data_fim,
+            'df_vs': df_vs_fiscal,
+            'df_ra': df_ra_fiscal,
+            'df_pp': df_pp_fiscal,
+            'df_ic': df_ic.iloc[posicoes].reset_index(drop=True)
+        })
+    particoes.sort(key=lambda p: len(p['df_pp']), reverse=True)
+    return particoes
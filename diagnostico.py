@@ -0,0 +1,139 @@
+import cProfile
+import io
+import json
+import logging
+import marshal
+import pstats
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Etapas medidas por arquivo, dentro de processar_pdf (somadas entre os processos de extração)
+ETAPAS_ARQUIVO = ['abrir', 'texto', 'poda', 'extratores']
+DESCRICAO_ETAPAS = {
+    'abrir': "Abertura do PDF",
+    'texto': "Extração de texto",
+    'poda': "Verificação das seções (poda)",
+    'extratores': "Extratores (regex)",
+    'leitura': "Leitura dos uploads (ZIP)",
+    'cache': "Hash e cache de extração",
+    'extracao': "Espera pela extração",
+    'historico': "Gravação no histórico",
+    'consulta': "Consulta ao histórico",
+    'tabelas': "DataFrames e totais (pandas)",
+    'relatorios': "Relatórios (FPDF/Excel)",
+}
+
+LOGGER = logging.getLogger('extratorfiscal.diagnostico')
+
+# =================== COLETA ===================
+class Diagnostico:
+    """
+    Tempos de uma execução do Extrator PDF Consolidado: por arquivo (etapas
+    medidas em processar_pdf) e da execução inteira (tempo de parede de cada
+    etapa no processo principal).
+    """
+
+    def __init__(self):
+        self.execucao = uuid.uuid4().hex[:12]
+        self.inicio = time.time()
+        self.arquivos = []
+        self.etapas = defaultdict(float)
+        self.memoria = None  # Resumo de LimiteMemoria, quando medido
+
+    @contextmanager
+    def etapa(self, nome):
+        """Acumula o tempo do bloco na etapa `nome` da execução"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.etapas[nome] += time.perf_counter() - inicio
+
+    def registrar_arquivo(self, arquivo, resultado, do_cache):
+        """Registra os tempos por etapa de um arquivo (zerados quando veio do cache)"""
+        tempos = {} if do_cache else resultado.get('tempos', {})
+        self.arquivos.append({
+            'Arquivo': arquivo,
+            'Cache': do_cache,
+            'Erro': resultado.get('erro', ''),
+            'Páginas lidas': resultado.get('paginas', 0),
+            **{etapa: tempos.get(etapa, 0.0) for etapa in ETAPAS_ARQUIVO},
+            'total': 0.0 if do_cache else resultado.get('tempo', sum(tempos.values()))
+        })
+
+    # =================== RESUMOS ===================
+    def mais_lentos(self, quantidade=10):
+        """Arquivos extraídos nesta execução, do mais lento ao mais rápido"""
+        import pandas as pd
+        df = pd.DataFrame(self.arquivos, columns=['Arquivo', 'Cache', 'Erro', 'Páginas lidas', *ETAPAS_ARQUIVO, 'total'])
+        return df[~df['Cache']].nlargest(quantidade, 'total').drop(columns='Cache').reset_index(drop=True)
+
+    def por_etapa(self):
+        """Tempo total por etapa, por arquivo (soma) e da execução (parede)"""
+        import pandas as pd
+        linhas = [
+            ('Por arquivo', DESCRICAO_ETAPAS[etapa], sum(a[etapa] for a in self.arquivos))
+            for etapa in ETAPAS_ARQUIVO
+        ]
+        linhas += [('Execução', DESCRICAO_ETAPAS.get(etapa, etapa), segundos) for etapa, segundos in self.etapas.items()]
+        df = pd.DataFrame(linhas, columns=['Escopo', 'Etapa', 'Segundos'])
+        totais = df.groupby('Escopo')['Segundos'].transform('sum')
+        df['%'] = (df['Segundos'] / totais.where(totais > 0) * 100).fillna(0.0)
+        return df
+
+    # =================== LOGS ESTRUTURADOS ===================
+    def eventos(self):
+        """Eventos JSON da execução: um por arquivo extraído e um resumo"""
+        for registro in self.arquivos:
+            if not registro['Cache']:
+                yield {
+                    'evento': 'arquivo', 'execucao': self.execucao,
+                    'arquivo': registro['Arquivo'], 'erro': registro['Erro'] or None,
+                    'paginas': registro['Páginas lidas'],
+                    'tempos': {etapa: round(registro[etapa], 6) for etapa in ETAPAS_ARQUIVO},
+                    'total': round(registro['total'], 6)
+                }
+        yield {
+            'evento': 'execucao', 'execucao': self.execucao,
+            'inicio': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.inicio)),
+            'arquivos': len(self.arquivos),
+            'do_cache': sum(1 for a in self.arquivos if a['Cache']),
+            'erros': sum(1 for a in self.arquivos if a['Erro']),
+            'etapas_arquivo': {etapa: round(sum(a[etapa] for a in self.arquivos), 6) for etapa in ETAPAS_ARQUIVO},
+            'etapas_execucao': {etapa: round(segundos, 6) for etapa, segundos in self.etapas.items()},
+            'memoria': self.memoria
+        }
+
+    def registrar_log(self, logger=LOGGER):
+        """Escreve os eventos da execução como uma linha JSON cada"""
+        for evento in self.eventos():
+            logger.info(json.dumps(evento, ensure_ascii=False))
+
+def configurar_log(caminho):
+    """Envia os eventos de diagnóstico para um arquivo JSON Lines"""
+    handler = logging.FileHandler(caminho, encoding='utf-8')
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    LOGGER.addHandler(handler)
+    LOGGER.setLevel(logging.INFO)
+    LOGGER.propagate = False
+    return handler
+
+# =================== PERFIL (cProfile) ===================
+def iniciar_perfil():
+    """Inicia um cProfile do processo atual"""
+    perfil = cProfile.Profile()
+    perfil.enable()
+    return perfil
+
+def resumo_perfil(perfil, linhas=30):
+    """Funções com maior tempo acumulado, no formato do pstats"""
+    saida = io.StringIO()
+    pstats.Stats(perfil, stream=saida).sort_stats('cumulative').print_stats(linhas)
+    return saida.getvalue()
+
+def exportar_perfil(perfil):
+    """Conteúdo de um arquivo .prof (o mesmo de Profile.dump_stats), legível por pstats e snakeviz"""
+    perfil.create_stats()
+    return marshal.dumps(perfil.stats)
@@ -0,0 +1,580 @@
+import itertools
+import os
+import re
+import time
+from collections import defaultdict, deque
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+
+# Incrementar sempre que a lógica de extração mudar, invalidando o cache
+EXTRATOR_VERSAO = "5"
+
+# =================== FUNÇÕES AUXILIARES ===================
+def extrair_data_formatada(texto_data):
+    """Extrai e formata a data no padrão dd/mm/yyyy"""
+    padrao_data = re.search(r'(\d{2}/\d{2}/\d{4})', texto_data)
+    return padrao_data.group(1) if padrao_data else texto_data.strip()
+
+# =================== TOKENIZADOR DE SEÇÕES ===================
+# Padrões compilados uma única vez e compartilhados por todos os extratores
+PADRAO_DATA_RELATORIO = re.compile(r'Data\s+Relatório\s*:\s*([^\n]+)')
+PADRAO_FISCAL = re.compile(r'Agente\s+de\s+Fiscalização\s*:\s*([^\n]+)')
+PADRAO_FATO_GERADOR = re.compile(
+    r'Fato\s+Gerador\s*:\s*.*?(PROCESSO/PROTOCOLO[\s\-]*\d+[/\-]?\d*)', re.IGNORECASE
+)
+PADRAO_COORDENADAS = re.compile(r"Latitude\s*:\s*([-\d,.]+).*?Longitude\s*:\s*([-\d,.]+)")
+PADRAO_GFIS = re.compile(r'GFIS', re.IGNORECASE)
+PADRAO_DIGITO = re.compile(r'\d')
+
+INICIO_SECAO_01 = re.compile(r'01\s*-\s*Endereço\s*Empreendimento\s*')
+FIM_SECAO_01 = re.compile(r'02\s*-|Descritivo:')
+INICIO_SECAO_04 = re.compile(r'04\s*-\s*Identificação', re.IGNORECASE)
+INICIO_SECAO_04_EXATA = re.compile(r'04\s*-\s*Identificação')
+FIM_SECAO_04 = re.compile(r'05\s*-')
+INICIO_SECAO_06 = re.compile(r'06\s*-\s*Documentos\s*Recebidos', re.IGNORECASE)
+FIM_SECAO_06 = re.compile(r'\n\s*07')
+INICIO_SECAO_07 = re.compile(r'07\s*-\s*Outras\s+Informações', re.IGNORECASE)
+CAMPO_COMPLEMENTARES = re.compile(r'Informações\s+Complementares\s*:\s*', re.IGNORECASE)
+FIM_SECAO_07 = re.compile(r'\n\s*\d{2}\s*-')
+
+PADRAO_CONTRATADO = re.compile(r'CONTRATADO\s*:')
+PADRAO_RESPONSAVEL = re.compile(r'RESPONSAVEL\s*TECNICO\s*:')
+PADRAO_RAMO = re.compile(r'Ramo\s*Atividade\s*:\s*(.*?)(?=\n|$)', re.IGNORECASE)
+PADRAO_OUTROS = re.compile(r'(?i)OUTROS\s*[:\-]\s*(.*?)(?=\n|$)')
+PADRAO_PARENTESES = re.compile(r'\((.*?)\)')
+
+def _primeira_posicao(*posicoes):
+    """Menor posição válida (>= 0) ou None"""
+    validas = [p for p in posicoes if p is not None and p >= 0]
+    return min(validas) if validas else None
+
+def _quebra_final(texto, inicio):
+    """Posição da primeira quebra de linha seguida apenas de espaços até o fim"""
+    return texto.find('\n', max(inicio, len(texto.rstrip())))
+
+def _fim_texto(texto):
+    """Posição em que '$' casa primeiro (antes de uma quebra de linha final)"""
+    return len(texto) - 1 if texto.endswith('\n') else len(texto)
+
+def _secao_04(texto, padrao_inicio):
+    """Trecho da seção 04 até o início da seção 05 (ou fim do texto)"""
+    inicio = padrao_inicio.search(texto)
+    if not inicio:
+        return None, False
+    fim = FIM_SECAO_04.search(texto, inicio.end())
+    return texto[inicio.start():fim.start() if fim else _fim_texto(texto)], fim is not None
+
+def _extrair_oficios(texto):
+    """
+    Ofícios GFIS: em cada linha que contém 'GFIS' precedido de um número, o
+    trecho a partir do primeiro dígito até o fim da linha. Parte das
+    ocorrências de 'GFIS' em vez de tentar um casamento a cada dígito.
+    """
+    oficios = []
+    fim_linha = -1
+    for gfis in PADRAO_GFIS.finditer(texto):
+        if gfis.start() < fim_linha:
+            continue  # Linha já registrada
+        inicio_linha = texto.rfind('\n', 0, gfis.start()) + 1
+        digito = PADRAO_DIGITO.search(texto, inicio_linha, gfis.start())
+        if digito:
+            fim_linha = texto.find('\n', gfis.end())
+            fim_linha = len(texto) if fim_linha < 0 else fim_linha
+            oficios.append(texto[digito.start():fim_linha])
+    return oficios
+
+def tokenizar_relatorio(texto):
+    """
+    Localiza, em uma única passada por marcador, os campos de cabeçalho e as
+    seções numeradas usadas pelos extratores. Cada busca parte da posição
+    do marcador anterior, sem varreduras preguiçosas sobre o texto inteiro.
+
+    Retorna um dict com:
+    - 'cabecalho': Data Relatório, Agente de Fiscalização e Fato Gerador
+    - 'secoes': conteúdo das seções '01', '04', '06' e '07' (None se ausente)
+    - 'fechadas': seções cujo terminador já apareceu no texto
+    - 'coordenadas' e 'oficios': ocorrências espalhadas pelo documento
+    """
+    cabecalho = {}
+    for campo, padrao in (('Data Relatório', PADRAO_DATA_RELATORIO),
+                          ('Agente de Fiscalização', PADRAO_FISCAL),
+                          ('Fato Gerador', PADRAO_FATO_GERADOR)):
+        encontrado = padrao.search(texto)
+        cabecalho[campo] = encontrado.group(1) if encontrado else None
+
+    secoes = {'01': None, '04': None, '04_exata': None, '06': None, '07': None}
+    fechadas = set()
+
+    # 01 - Endereço: até "02 -", "Descritivo:" ou fim do texto
+    inicio = INICIO_SECAO_01.search(texto)
+    if inicio:
+        fim = FIM_SECAO_01.search(texto, inicio.end())
+        secoes['01'] = texto[inicio.end():fim.start() if fim else len(texto)].strip()
+        if fim:
+            fechadas.add('01')
+
+    # 04 - Identificação: até "05 -". A busca sem distinção de maiúsculas
+    # alimenta Ramo de Atividade; a busca exata alimenta Vínculos.
+    secoes['04'], fechada = _secao_04(texto, INICIO_SECAO_04)
+    if fechada:
+        fechadas.add('04')
+    if secoes['04'] is not None and INICIO_SECAO_04_EXATA.match(secoes['04']):
+        secoes['04_exata'] = secoes['04']
+    else:
+        secoes['04_exata'], _ = _secao_04(texto, INICIO_SECAO_04_EXATA)
+
+    # 06 - Documentos Recebidos: até a linha iniciada por "07"
+    inicio = INICIO_SECAO_06.search(texto)
+    if inicio:
+        fim = FIM_SECAO_06.search(texto, inicio.end())
+        posicao = _primeira_posicao(fim.start() if fim else None, _quebra_final(texto, inicio.end()))
+        if posicao is not None:
+            secoes['06'] = texto[inicio.end():posicao]
+        if fim:
+            fechadas.add('06')
+
+    # 07 - Informações Complementares: até a próxima linha numerada "NN -"
+    inicio = INICIO_SECAO_07.search(texto)
+    campo = CAMPO_COMPLEMENTARES.search(texto, inicio.end()) if inicio else None
+    if campo:
+        fim = FIM_SECAO_07.search(texto, campo.end())
+        posicao = _primeira_posicao(fim.start() if fim else None, _quebra_final(texto, campo.end()))
+        if posicao is not None:
+            secoes['07'] = texto[campo.end():posicao]
+        if fim:
+            fechadas.add('07')
+
+    coordenadas = PADRAO_COORDENADAS.search(texto)
+    return {
+        'cabecalho': cabecalho,
+        'secoes': secoes,
+        'fechadas': fechadas,
+        'coordenadas': coordenadas.groups() if coordenadas else None,
+        'oficios': _extrair_oficios(texto)
+    }
+
+# =================== MÓDULO DE EXTRAÇÃO ===================
+def extrair_dados_vinculos_si(texto, filename, tokens=None):
+    """Extrai dados para Vínculos e S.I"""
+    tokens = tokens or tokenizar_relatorio(texto)
+    dados = {'Arquivo': filename}
+
+    # Extrai coordenadas
+    coord = tokens['coordenadas']
+    if coord:
+        try:
+            dados.update({
+                'Latitude': float(coord[0].replace(',', '.')),
+                'Longitude': float(coord[1].replace(',', '.'))
+            })
+        except ValueError:
+            dados.update({'Latitude': None, 'Longitude': None})
+
+    # Extrai endereço
+    endereco = tokens['secoes']['01']
+    dados['Endereço'] = re.sub(r'\s+', ' ', endereco.replace('\n', ' ')) if endereco is not None else None
+
+    # Conta vínculos
+    secao_texto = tokens['secoes']['04_exata']
+    if secao_texto is not None:
+        dados.update({
+            'CONTRATADO': len(PADRAO_CONTRATADO.findall(secao_texto)),
+            'RESPONSAVEL TECNICO': len(PADRAO_RESPONSAVEL.findall(secao_texto))
+        })
+        dados['Vínculos'] = dados['CONTRATADO'] + dados['RESPONSAVEL TECNICO']
+
+    # Extrai ofícios GFIS
+    oficios = tokens['oficios']
+    dados.update({
+        'Ofícios GFIS': '; '.join(o.strip() for o in oficios) if oficios else '',
+        'S.I': len(oficios) if oficios else 0
+    })
+
+    return dados
+
+def extrair_dados_ramo_atividade(texto, filename, tokens=None):
+    """Extrai dados para Ramo de Atividade"""
+    tokens = tokens or tokenizar_relatorio(texto)
+    dados = {
+        'Arquivo': filename,
+        'Ramos': []
+    }
+
+    # Lista de [ramo, quantidade] na ordem em que aparecem
+    secao = tokens['secoes']['04']
+    if secao is not None:
+        ramos = PADRAO_RAMO.findall(secao)
+        if ramos:
+            contagem = defaultdict(int)
+            for ramo in [r.strip() for r in ramos if r.strip()]:
+                contagem[ramo] += 1
+            
+            dados['Ramos'] = [[ramo, qtd] for ramo, qtd in contagem.items()]
+
+    return dados
+
+def extrair_dados_processo_protocolo(texto, filename, tokens=None):
+    """Extrai dados para Processo/Protocolo com foco em Legalização"""
+    tokens = tokens or tokenizar_relatorio(texto)
+    cabecalho = tokens['cabecalho']
+    dados = {
+        'Arquivo': filename,
+        'Fiscal': '',
+        'Protocolo': '',
+        'Legalização': '',
+        'Qtd. Protocolo': 0,
+        'Qtd. Legalização': 0,
+        'Data Relatório': ''
+    }
+
+    # Extrai fiscal exatamente como aparece no PDF
+    if cabecalho['Agente de Fiscalização'] is not None:
+        dados['Fiscal'] = cabecalho['Agente de Fiscalização'].strip()
+
+    # Extrai protocolo
+    if cabecalho['Fato Gerador'] is not None:
+        nums = re.findall(r'\d+', cabecalho['Fato Gerador'])
+        dados['Protocolo'] = ''.join(nums) if nums else ''
+        dados['Qtd. Protocolo'] = 1 if nums else 0
+
+    # Extrai conteúdo após "OUTROS" na seção de documentos recebidos
+    secao_docs = tokens['secoes']['06']
+    if secao_docs is not None:
+        outros_match = PADRAO_OUTROS.search(secao_docs)
+        if outros_match:
+            outros_texto = outros_match.group(1).strip()
+            # Remove múltiplos espaços e limpa o texto
+            outros_texto = ' '.join(outros_texto.split())
+            if outros_texto:
+                dados['Legalização'] = outros_texto
+                dados['Qtd. Legalização'] = 1
+
+    # Extrai data do relatório (para o extrato consolidado)
+    if cabecalho['Data Relatório'] is not None:
+        dados['Data Relatório'] = extrair_data_formatada(cabecalho['Data Relatório'])
+
+    return dados
+
+def extrair_informacoes_complementares(texto_pdf, nome_arquivo, tokens=None):
+    """
+    Extrai TODOS os textos entre parênteses do campo 'Informações Complementares'
+    Retorna dict com nome do arquivo e informações entre parênteses
+    """
+    tokens = tokens or tokenizar_relatorio(texto_pdf)
+    conteudo = tokens['secoes']['07']
+    if conteudo is None:
+        return {'Arquivo': nome_arquivo, 'Informações': ''}
+
+    # Extrai apenas textos entre parênteses
+    informacoes = PADRAO_PARENTESES.findall(conteudo)
+
+    if not informacoes:
+        return {'Arquivo': nome_arquivo, 'Informações': ''}
+
+    # Processamento igual ao original
+    dados_limpos = [info.strip().replace('\n', ' ') for info in informacoes if info.strip()]
+    return {
+        'Arquivo': nome_arquivo,
+        'Informações': ', '.join(dados_limpos) if dados_limpos else ''
+    }
+
+def extrair_todos_modulos(texto, filename):
+    """Executa os quatro extratores sobre o texto de um PDF, tokenizado uma única vez"""
+    tokens = tokenizar_relatorio(texto)
+    return {
+        'texto': texto,
+        'vs': extrair_dados_vinculos_si(texto, filename, tokens),
+        'ra': extrair_dados_ramo_atividade(texto, filename, tokens),
+        'pp': extrair_dados_processo_protocolo(texto, filename, tokens),
+        'ic': extrair_informacoes_complementares(texto, filename, tokens)
+    }
+
+def renomear_resultado(resultado, filename):
+    """Ajusta o nome do arquivo em um resultado vindo do cache"""
+    for modulo in ('vs', 'ra', 'pp', 'ic'):
+        resultado[modulo]['Arquivo'] = filename
+    return resultado
+
+
+# =================== PROCESSAMENTO DE ARQUIVOS ===================
+# O pdfium troca o hífen de fim de linha (palavra dividida) por '\x02' (ou
+# U+FFFE) e remove a quebra de linha; volta a ser hífen e quebra, como no pdfplumber
+PADRAO_HIFEN_PDFIUM = re.compile('[\x02\ufffe]\n?')
+
+def _paginas_pdfium(origem, tempos=None):
+    """Extração nativa do pdfium (rápida, sem análise de layout)"""
+    import pypdfium2 as pdfium  # Importado no primeiro uso, fora do carregamento da interface
+    if isinstance(origem, (bytearray, memoryview)):
+        origem = BytesIO(origem)
+    inicio = time.perf_counter()
+    pdf = pdfium.PdfDocument(origem)
+    if tempos is not None:
+        tempos['abrir'] += time.perf_counter() - inicio
+    try:
+        total = len(pdf)
+        for indice in range(total):
+            pagina = pdf[indice]
+            textpage = pagina.get_textpage()
+            texto = PADRAO_HIFEN_PDFIUM.sub('-\n', textpage.get_text_bounded().replace('\r\n', '\n'))
+            textpage.close()
+            pagina.close()
+            yield total, texto
+    finally:
+        pdf.close()
+
+def _paginas_pdfplumber(origem, tempos=None):
+    """Extração do pdfplumber com análise de layout por caractere"""
+    import pdfplumber
+    if isinstance(origem, (bytes, bytearray, memoryview)):
+        origem = BytesIO(origem)
+    inicio = time.perf_counter()
+    with pdfplumber.open(origem) as pdf:
+        if tempos is not None:
+            tempos['abrir'] += time.perf_counter() - inicio
+        total = len(pdf.pages)
+        for pagina in pdf.pages:
+            texto = pagina.extract_text() or ""
+            pagina.close()  # Libera os caracteres e objetos analisados da página
+            yield total, texto
+
+# Cada backend é um gerador de (total de páginas, texto da página) que
+# acumula em tempos['abrir'] o tempo de abertura do documento
+BACKENDS_TEXTO = {
+    'pdfium': _paginas_pdfium,
+    'pdfplumber': _paginas_pdfplumber
+}
+BACKEND_PADRAO = 'pdfium'
+BACKEND_RESERVA = 'pdfplumber'
+
+# Pelo menos um destes marcadores deve existir em um relatório válido
+MARCADORES_RELATORIO = re.compile(
+    r'01\s*-\s*Endereço|04\s*-\s*Identificação|Agente\s+de\s+Fiscalização'
+)
+
+def texto_valido(texto):
+    """Verifica se o texto extraído contém as seções esperadas do relatório"""
+    return bool(texto) and MARCADORES_RELATORIO.search(texto) is not None
+
+# Marcadores que precisam aparecer, cada sequência na ordem, antes de parar a
+# leitura: os campos do cabeçalho (a linha inteira do Fato Gerador) e as
+# seções 01, 04, 06 e 07 com os seus terminadores, como em tokenizar_relatorio.
+# Coordenadas e ofícios GFIS (seções 01 e 05) ficam antes da seção 07; com a
+# poda, ocorrências em páginas posteriores (anexos) não são lidas.
+LINHA_FATO_GERADOR = re.compile(r'Fato\s+Gerador\s*:\s*[^\n]*\n')
+MARCADORES_COMPLETO = (
+    (PADRAO_DATA_RELATORIO,),
+    (PADRAO_FISCAL,),
+    (LINHA_FATO_GERADOR,),
+    (INICIO_SECAO_01, FIM_SECAO_01),
+    (INICIO_SECAO_04, FIM_SECAO_04),
+    (INICIO_SECAO_06, FIM_SECAO_06),
+    (INICIO_SECAO_07, CAMPO_COMPLEMENTARES, FIM_SECAO_07),
+)
+# Caracteres do fim do texto já lido procurados de novo com a página
+# seguinte, para marcadores divididos entre duas páginas
+SOBREPOSICAO_PAGINAS = 1000
+
+class LeituraSecoes:
+    """
+    Acompanha, página a página, os marcadores de MARCADORES_COMPLETO já
+    encontrados. Cada página é procurada uma única vez (com o fim da
+    anterior), sem tokenizar de novo o texto já lido. Um marcador que
+    termina no fim do texto lido (como o '\s*' final de um padrão) ainda
+    pode crescer com a página seguinte e só é aceito depois dela.
+    """
+
+    def __init__(self):
+        # Para cada sequência pendente: [padrões, próximo padrão, posição no texto]
+        self.pendentes = [[padroes, 0, 0] for padroes in MARCADORES_COMPLETO]
+        self.lidos = 0
+        self._cauda = None
+
+    @property
+    def completo(self):
+        return not self.pendentes
+
+    def acrescentar(self, pagina):
+        """Acrescenta o texto de uma página; retorna True se o relatório ficou completo"""
+        if self._cauda is None:
+            trecho, deslocamento = pagina, 0
+        else:
+            trecho = f"{self._cauda}\n{pagina}"
+            deslocamento = self.lidos - len(self._cauda)
+            self.lidos += 1
+        self.lidos += len(pagina)
+        self._cauda = trecho[-SOBREPOSICAO_PAGINAS:]
+
+        for pendente in self.pendentes:
+            padroes, indice, posicao = pendente
+            while indice < len(padroes):
+                encontrado = padroes[indice].search(trecho, max(posicao - deslocamento, 0))
+                if not encontrado or encontrado.end() == len(trecho):
+                    break
+                indice, posicao = indice + 1, deslocamento + encontrado.end()
+            pendente[1], pendente[2] = indice, posicao
+        self.pendentes = [p for p in self.pendentes if p[1] < len(p[0])]
+        return self.completo
+
+def secoes_completas(texto):
+    """
+    Verifica se o cabeçalho e todas as seções usadas pelos extratores já
+    foram lidos. Depois disso, as páginas seguintes (fotos, anexos) podem
+    ser ignoradas.
+    """
+    return LeituraSecoes().acrescentar(texto)
+
+def _ler_paginas(origem, backend, podar, tempos):
+    """
+    Lê as páginas em ordem, parando na primeira em que o relatório fica completo.
+    Acumula em `tempos` a abertura do documento, a extração do texto e as
+    verificações de poda.
+    """
+    inicio = time.perf_counter()
+    abrir, poda = tempos['abrir'], tempos['poda']
+    paginas = BACKENDS_TEXTO[backend](origem, tempos)
+    leitura = LeituraSecoes() if podar else None
+    partes, total = [], 0
+    try:
+        for total, texto_pagina in paginas:
+            partes.append(texto_pagina)
+            if leitura is not None and len(partes) < total:
+                inicio_poda = time.perf_counter()
+                completo = leitura.acrescentar(texto_pagina)
+                tempos['poda'] += time.perf_counter() - inicio_poda
+                if completo:
+                    break
+    finally:
+        paginas.close()
+    texto = "\n".join(partes)
+    decorrido = time.perf_counter() - inicio
+    tempos['texto'] += decorrido - (tempos['abrir'] - abrir) - (tempos['poda'] - poda)
+    return texto, {'backend': backend, 'paginas': len(partes), 'paginas_total': total, 'tempos': tempos}
+
+def extrair_texto_pdf(origem, backend=BACKEND_PADRAO, podar=False):
+    """
+    Extrai o texto das páginas de um PDF. A origem pode ser um caminho ou o
+    próprio conteúdo em memória (bytes/memoryview).
+    Com podar=True, a leitura para assim que o cabeçalho e todas as seções
+    necessárias (com seus terminadores) foram encontrados; coordenadas e
+    ofícios GFIS só são procurados nas páginas lidas até ali.
+    Se o texto do backend escolhido não passar na verificação, o PDF é
+    relido com o backend de reserva.
+    Retorna (texto, info) com o backend utilizado, as páginas lidas e o
+    tempo gasto em cada etapa ('abrir', 'texto' e 'poda', somando as
+    tentativas).
+    """
+    tempos = {'abrir': 0.0, 'texto': 0.0, 'poda': 0.0}
+    texto, info = _ler_paginas(origem, backend, podar, tempos)
+    if backend != BACKEND_RESERVA and not texto_valido(texto):
+        return _ler_paginas(origem, BACKEND_RESERVA, podar, tempos)
+    return texto, info
+
+def versao_extracao(backend=BACKEND_PADRAO, podar=False):
+    """Versão usada como chave de cache para a combinação de opções de extração"""
+    return f"{EXTRATOR_VERSAO}-{backend}{'-podado' if podar else ''}"
+
+def processar_pdf(conteudo, filename, temp_dir=None, backend=BACKEND_PADRAO, podar=False, manter_texto=True):
+    """
+    Extrai texto e dados de todos os módulos de um PDF.
+    O conteúdo é lido direto da memória; o diretório temporário só é usado
+    quando informado, para parsers que exigem um caminho em disco.
+    Com manter_texto=False, o texto é descartado assim que os registros são
+    produzidos e não é devolvido nem armazenado no cache.
+    Erros de leitura são devolvidos como {'erro': mensagem} para não
+    interromper o lote.
+    """
+    temp_path = None
+    try:
+        inicio = time.perf_counter()
+        if temp_dir is None:
+            texto, info = extrair_texto_pdf(conteudo, backend, podar)
+        else:
+            temp_path = os.path.join(temp_dir, f"{os.getpid()}_{os.path.basename(filename)}")
+            with open(temp_path, "wb") as f:
+                f.write(conteudo)
+            texto, info = extrair_texto_pdf(temp_path, backend, podar)
+        inicio_extratores = time.perf_counter()
+        resultado = extrair_todos_modulos(texto, filename)
+        info['tempos']['extratores'] = time.perf_counter() - inicio_extratores
+        if not manter_texto:
+            del resultado['texto']
+        info['tempo'] = time.perf_counter() - inicio
+        resultado.update(info)
+        return resultado
+    except Exception as e:
+        return {'erro': f"{type(e).__name__}: {e}"}
+    finally:
+        if temp_path and os.path.exists(temp_path):
+            os.unlink(temp_path)
+
+def criar_pool(workers, tarefas_por_processo=None):
+    """
+    Cria um pool de processos para extração paralela. Com
+    tarefas_por_processo, cada processo é substituído após esse número de
+    arquivos, devolvendo ao sistema a memória acumulada pelos parsers.
+    """
+    opcoes = {'max_tasks_per_child': tarefas_por_processo} if tarefas_por_processo else {}
+    return ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"), **opcoes)
+
+def pool_quebrado(pool):
+    """Indica se um processo do pool terminou de forma anormal, inutilizando-o"""
+    return bool(getattr(pool, '_broken', False))
+
+def iterar_lote(itens, pool=None, temp_dir=None, backend=BACKEND_PADRAO, podar=False, janela=None,
+                manter_texto=True):
+    """
+    Processa (conteudo, filename) de um iterável e gera os resultados na
+    mesma ordem, à medida que ficam prontos. Com um pool, cada arquivo é
+    processado em um processo separado e apenas os dicionários de resultado
+    retornam. Com uma janela, no máximo `janela` arquivos ficam em
+    processamento ao mesmo tempo e os itens só são lidos do iterável quando
+    há vaga, limitando a memória ao tamanho da janela. A janela pode ser uma
+    função, consultada a cada vaga, para ajustá-la durante o lote.
+    Se a iteração for interrompida, os arquivos ainda não iniciados são cancelados.
+    Se um processo do pool terminar de forma anormal, os arquivos que estavam
+    em processamento e os ainda não enviados são processados no próprio
+    processo; só geram erro se falharem também aqui.
+    """
+    if pool is None:
+        for conteudo, filename in itens:
+            yield processar_pdf(conteudo, filename, temp_dir, backend, podar, manter_texto)
+        return
+
+    limite_janela = janela if callable(janela) else (lambda: janela)
+    itens = iter(itens)
+    futuros = deque()
+    restantes = None
+    try:
+        while True:
+            while restantes is None and (janela is None or len(futuros) < limite_janela()):
+                item = next(itens, None)
+                if item is None:
+                    break
+                try:
+                    futuros.append((pool.submit(processar_pdf, *item, temp_dir, backend, podar, manter_texto), item))
+                except BrokenProcessPool:
+                    # Pool inutilizado (processo filho encerrado); o restante é processado no próprio processo
+                    restantes = itertools.chain([item], itens)
+            if not futuros:
+                break
+            futuro, item = futuros.popleft()
+            try:
+                resultado = futuro.result()
+            except BrokenProcessPool:
+                # Em processamento quando o pool quebrou (talvez por causa de outro arquivo)
+                resultado = processar_pdf(*item, temp_dir, backend, podar, manter_texto)
+            except Exception as e:
+                resultado = {'erro': f"{type(e).__name__}: {e}"}
+            yield resultado
+    finally:
+        for futuro, _ in futuros:
+            futuro.cancel()
+
+    if restantes is not None:
+        yield from iterar_lote(restantes, None, temp_dir, backend, podar, manter_texto=manter_texto)
+
+def processar_lote(itens, pool=None, temp_dir=None, backend=BACKEND_PADRAO, podar=False):
+    """Processa uma lista de (conteudo, filename) e devolve os resultados na mesma ordem"""
+    return list(iterar_lote(itens, pool, temp_dir, backend, podar))
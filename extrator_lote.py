@@ -0,0 +1,262 @@
+"""
+Extração em lote, sem interface, para diretórios com milhares de relatórios.
+
+Percorre um diretório (ou padrão glob) em ordem determinística, extrai os
+dados de cada PDF com as mesmas funções do Extrator PDF Consolidado e grava
+um registro por arquivo, em lotes, em Parquet ou CSV. A memória usada não
+depende do número de arquivos. Um checkpoint gravado a cada lote permite
+retomar a execução após uma interrupção (--retomar).
+
+Uso:
+    python extrator_lote.py /arquivo/relatorios -o saida_parquet
+    python extrator_lote.py "/arquivo/2025/**/*.pdf" -o extrato.csv --formato csv --retomar
+"""
+import argparse
+import csv
+import glob
+import json
+import logging
+import os
+import sys
+import time
+
+from cache_extracao import CacheExtracao, calcular_hash
+from consolidacao import formatar_ramos
+from extracao import (
+    BACKEND_PADRAO, BACKENDS_TEXTO, criar_pool, processar_lote, renomear_resultado, versao_extracao
+)
+from historico import HistoricoExtracoes
+
+# Colunas do registro por arquivo e seus tipos no Parquet
+COLUNAS_REGISTRO = [
+    ('Arquivo', 'string'),
+    ('Hash', 'string'),
+    ('Data Relatório', 'string'),
+    ('Fiscal', 'string'),
+    ('Endereço', 'string'),
+    ('Latitude', 'float64'),
+    ('Longitude', 'float64'),
+    ('CONTRATADO', 'int64'),
+    ('RESPONSAVEL TECNICO', 'int64'),
+    ('Vínculos', 'int64'),
+    ('Ofícios GFIS', 'string'),
+    ('S.I', 'int64'),
+    ('Ramo', 'string'),
+    ('Qtd. Ramo', 'string'),
+    ('Protocolo', 'string'),
+    ('Legalização', 'string'),
+    ('Qtd. Protocolo', 'int64'),
+    ('Qtd. Legalização', 'int64'),
+    ('Informações', 'string'),
+    ('Backend', 'string'),
+    ('Páginas', 'int64'),
+    ('Erro', 'string'),
+]
+
+# =================== PERCURSO DOS ARQUIVOS ===================
+def _chave_ordem(caminho):
+    """Chave de ordenação compatível com o percurso do diretório"""
+    return tuple(os.path.normpath(caminho).split(os.sep))
+
+def _percorrer_diretorio(raiz):
+    """Gera os PDFs da árvore em ordem lexicográfica de componentes do caminho"""
+    try:
+        entradas = sorted(os.scandir(raiz), key=lambda e: e.name)
+    except OSError:
+        return
+    for entrada in entradas:
+        if entrada.is_dir(follow_symlinks=False):
+            yield from _percorrer_diretorio(entrada.path)
+        elif entrada.name.lower().endswith('.pdf'):
+            yield entrada.path
+
+def listar_pdfs(entrada):
+    """Gera os PDFs de um diretório (recursivo) ou de um padrão glob"""
+    if os.path.isdir(entrada):
+        yield from _percorrer_diretorio(entrada)
+    else:
+        caminhos = (c for c in glob.iglob(entrada, recursive=True) if c.lower().endswith('.pdf'))
+        yield from sorted(caminhos, key=_chave_ordem)
+
+# =================== SAÍDAS ===================
+class SaidaCSV:
+    """Acrescenta registros a um único arquivo CSV"""
+
+    def __init__(self, caminho, retomar):
+        novo = not (retomar and os.path.exists(caminho))
+        self._arquivo = open(caminho, 'w' if novo else 'a', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._arquivo, fieldnames=[c for c, _ in COLUNAS_REGISTRO])
+        if novo:
+            self._writer.writeheader()
+
+    def gravar(self, registros):
+        self._writer.writerows(registros)
+        self._arquivo.flush()
+        os.fsync(self._arquivo.fileno())
+
+    def fechar(self):
+        self._arquivo.close()
+
+class SaidaParquet:
+    """Grava cada lote como uma parte de um dataset Parquet (diretório)"""
+
+    def __init__(self, caminho, retomar):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self._pa, self._pq = pa, pq
+        self._schema = pa.schema([(coluna, getattr(pa, tipo)()) for coluna, tipo in COLUNAS_REGISTRO])
+        self._pasta = caminho
+        os.makedirs(caminho, exist_ok=True)
+        if not retomar:
+            for antigo in glob.glob(os.path.join(caminho, 'parte-*.parquet')):
+                os.unlink(antigo)
+        self._parte = len(glob.glob(os.path.join(caminho, 'parte-*.parquet')))
+
+    def gravar(self, registros):
+        colunas = {coluna: [r[coluna] for r in registros] for coluna, _ in COLUNAS_REGISTRO}
+        tabela = self._pa.Table.from_pydict(colunas, schema=self._schema)
+        self._parte += 1
+        destino = os.path.join(self._pasta, f"parte-{self._parte:06d}.parquet")
+        self._pq.write_table(tabela, destino + '.tmp')
+        os.replace(destino + '.tmp', destino)
+
+    def fechar(self):
+        pass
+
+SAIDAS = {'parquet': SaidaParquet, 'csv': SaidaCSV}
+
+# =================== CHECKPOINT ===================
+def ler_checkpoint(caminho):
+    """Retorna o último arquivo processado registrado no checkpoint"""
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, encoding='utf-8') as f:
+        return json.load(f).get('ultimo_arquivo')
+
+def gravar_checkpoint(caminho, ultimo_arquivo, processados):
+    """Grava o checkpoint de forma atômica"""
+    with open(caminho + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({'ultimo_arquivo': ultimo_arquivo, 'processados': processados}, f, ensure_ascii=False)
+    os.replace(caminho + '.tmp', caminho)
+
+# =================== PROCESSAMENTO ===================
+def montar_registro(caminho, hash_conteudo, resultado):
+    """Achata o resultado dos quatro módulos em um registro por arquivo"""
+    registro = {coluna: None for coluna, _ in COLUNAS_REGISTRO}
+    registro.update({'Arquivo': caminho, 'Hash': hash_conteudo})
+    if 'erro' in resultado:
+        registro['Erro'] = resultado['erro']
+        return registro
+    for modulo in ('vs', 'ra', 'pp', 'ic'):
+        registro.update({k: v for k, v in resultado[modulo].items() if k in registro and k != 'Arquivo'})
+    registro['Ramo'], registro['Qtd. Ramo'] = formatar_ramos(resultado['ra']['Ramos'])
+    registro['Backend'] = resultado.get('backend')
+    registro['Páginas'] = resultado.get('paginas')
+    return registro
+
+def processar_bloco(caminhos, pool, cache, args, historico=None):
+    """Lê e extrai um bloco de arquivos, usando o cache quando disponível"""
+    versao = versao_extracao(args.backend, args.podar)
+    conteudos, hashes, resultados = [], [], []
+    for caminho in caminhos:
+        try:
+            with open(caminho, 'rb') as f:
+                conteudo = f.read()
+        except OSError as e:
+            conteudo = None
+            resultados.append({'erro': f"{type(e).__name__}: {e}"})
+        else:
+            resultados.append(None)
+        conteudos.append(conteudo)
+        hashes.append(calcular_hash(conteudo) if conteudo is not None else None)
+
+    if cache:
+        for i, h in enumerate(hashes):
+            if h is not None:
+                resultados[i] = cache.obter(h, versao)
+
+    pendentes = [i for i, r in enumerate(resultados) if r is None]
+    itens = [(conteudos[i], os.path.basename(caminhos[i])) for i in pendentes]
+    for i, resultado in zip(pendentes, processar_lote(itens, pool, backend=args.backend, podar=args.podar)):
+        if cache and 'erro' not in resultado:
+            cache.gravar(hashes[i], versao, resultado)
+        resultados[i] = resultado
+
+    if historico:
+        historico.gravar([
+            (h, renomear_resultado(r, os.path.basename(c)))
+            for c, h, r in zip(caminhos, hashes, resultados) if 'erro' not in r
+        ])
+
+    return [montar_registro(c, h, r) for c, h, r in zip(caminhos, hashes, resultados)]
+
+def executar(args):
+    checkpoint = args.checkpoint or f"{args.saida.rstrip(os.sep)}.checkpoint.json"
+    ultimo = ler_checkpoint(checkpoint) if args.retomar else None
+    chave_ultimo = _chave_ordem(ultimo) if ultimo else None
+
+    saida = SAIDAS[args.formato](args.saida, args.retomar)
+    cache = CacheExtracao(args.cache) if args.cache else None
+    historico = HistoricoExtracoes(args.historico) if args.historico else None
+    pool = criar_pool(args.workers) if args.workers > 1 else None
+
+    processados, erros, inicio = 0, 0, time.perf_counter()
+    bloco = []
+
+    def descarregar():
+        nonlocal processados, erros
+        registros = processar_bloco(bloco, pool, cache, args, historico)
+        saida.gravar(registros)
+        processados += len(registros)
+        erros += sum(1 for r in registros if r['Erro'])
+        gravar_checkpoint(checkpoint, bloco[-1], processados)
+        logging.info("%d arquivo(s) processados (%.1f/s), %d erro(s)",
+                     processados, processados / (time.perf_counter() - inicio), erros)
+        bloco.clear()
+
+    try:
+        for caminho in listar_pdfs(args.entrada):
+            if chave_ultimo and _chave_ordem(caminho) <= chave_ultimo:
+                continue
+            bloco.append(caminho)
+            if len(bloco) >= args.lote:
+                descarregar()
+        if bloco:
+            descarregar()
+    finally:
+        saida.fechar()
+        if pool:
+            pool.shutdown()
+
+    logging.info("Concluído: %d arquivo(s) em %.1f s, %d erro(s)",
+                 processados, time.perf_counter() - inicio, erros)
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Extração em lote de relatórios de fiscalização (sem interface)",
+        formatter_class=argparse.RawDescriptionHelpFormatter, epilog=__doc__
+    )
+    parser.add_argument('entrada', help='Diretório (percorrido recursivamente) ou padrão glob')
+    parser.add_argument('-o', '--saida', required=True,
+                        help='Diretório do dataset Parquet ou arquivo CSV')
+    parser.add_argument('--formato', choices=list(SAIDAS), default='parquet')
+    parser.add_argument('--lote', type=int, default=200, help='Arquivos por lote gravado')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--backend', choices=list(BACKENDS_TEXTO), default=BACKEND_PADRAO)
+    parser.add_argument('--sem-podar', dest='podar', action='store_false',
+                        help='Lê todas as páginas, mesmo após as seções do relatório')
+    parser.add_argument('--cache', help='Caminho do cache de extração (SQLite) a reutilizar')
+    parser.add_argument('--historico',
+                        help='Histórico (SQLite) onde os registros também são gravados, por hash do conteúdo')
+    parser.add_argument('--retomar', action='store_true',
+                        help='Continua a partir do último arquivo registrado no checkpoint')
+    parser.add_argument('--checkpoint', help='Arquivo de checkpoint (padrão: <saida>.checkpoint.json)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    logging.getLogger('pdfminer').setLevel(logging.ERROR)
+    return executar(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime
+
+MODULOS = ('vs', 'ra', 'pp', 'ic')
+
+# =================== HISTÓRICO DE EXTRAÇÕES ===================
+def data_iso(data_relatorio):
+    """Converte 'dd/mm/aaaa' em 'aaaa-mm-dd' (None se vazia ou inválida)"""
+    try:
+        return datetime.strptime(data_relatorio or '', '%d/%m/%Y').date().isoformat()
+    except ValueError:
+        return None
+
+def _coordenadas(resultado):
+    """(latitude, longitude) extraídas em Vínculos e S.I (None se ausentes)"""
+    vs = resultado['vs']
+    return vs.get('Latitude'), vs.get('Longitude')
+
+class HistoricoExtracoes:
+    """
+    Armazenamento local (SQLite) dos registros extraídos, um por arquivo,
+    identificado pelo SHA-256 do conteúdo e indexado por fiscal e data do
+    relatório. Gravar o mesmo arquivo de novo substitui o registro
+    (idempotente), de modo que extratos de qualquer período podem ser
+    montados por consulta, sem reenviar os PDFs. As coordenadas e os ramos
+    ficam também em colunas próprias, para o mapa de fiscalizações.
+    Uma única instância pode ser compartilhada entre sessões e threads.
+    """
+
+    def __init__(self, caminho):
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(caminho, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS registros (
+                hash TEXT PRIMARY KEY,
+                arquivo TEXT NOT NULL,
+                fiscal TEXT NOT NULL,
+                data TEXT,
+                latitude REAL,
+                longitude REAL,
+                dados BLOB NOT NULL,
+                gravado_em REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_fiscal_data ON registros (fiscal, data)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_data ON registros (data)")
+        # Ramos de cada registro, para filtrar o mapa sem decodificar os dados
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS ramos (
+                hash TEXT NOT NULL,
+                ramo TEXT NOT NULL,
+                qtd INTEGER NOT NULL,
+                PRIMARY KEY (hash, ramo)
+            )
+        """)
+        colunas = {linha[1] for linha in self._conn.execute("PRAGMA table_info(registros)")}
+        if 'latitude' not in colunas:
+            self._migrar_coordenadas()
+        self._conn.commit()
+
+    def _migrar_coordenadas(self):
+        """Acrescenta as colunas de coordenadas e a tabela de ramos a um histórico antigo"""
+        self._conn.execute("ALTER TABLE registros ADD COLUMN latitude REAL")
+        self._conn.execute("ALTER TABLE registros ADD COLUMN longitude REAL")
+        for hash_conteudo, dados in self._conn.execute("SELECT hash, dados FROM registros").fetchall():
+            resultado = json.loads(zlib.decompress(dados).decode('utf-8'))
+            self._conn.execute(
+                "UPDATE registros SET latitude = ?, longitude = ? WHERE hash = ?",
+                (*_coordenadas(resultado), hash_conteudo)
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO ramos (hash, ramo, qtd) VALUES (?, ?, ?)",
+                [(hash_conteudo, ramo, qtd) for ramo, qtd in resultado['ra']['Ramos']]
+            )
+
+    def gravar(self, registros):
+        """
+        Insere ou substitui registros (hash, resultado), em que resultado traz
+        os quatro módulos ('vs', 'ra', 'pp', 'ic') de um arquivo
+        """
+        agora = time.time()
+        linhas, ramos = [], []
+        for hash_conteudo, resultado in registros:
+            pp = resultado['pp']
+            dados = {modulo: resultado[modulo] for modulo in MODULOS}
+            linhas.append((
+                hash_conteudo, pp['Arquivo'], pp['Fiscal'] or '', data_iso(pp['Data Relatório']),
+                *_coordenadas(resultado),
+                zlib.compress(json.dumps(dados, ensure_ascii=False).encode('utf-8')), agora
+            ))
+            ramos += [(hash_conteudo, ramo, qtd) for ramo, qtd in resultado['ra']['Ramos']]
+        with self._lock:
+            self._conn.executemany("""
+                INSERT INTO registros (hash, arquivo, fiscal, data, latitude, longitude, dados, gravado_em)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (hash) DO UPDATE SET
+                    arquivo = excluded.arquivo, fiscal = excluded.fiscal, data = excluded.data,
+                    latitude = excluded.latitude, longitude = excluded.longitude,
+                    dados = excluded.dados, gravado_em = excluded.gravado_em
+            """, linhas)
+            self._conn.executemany("DELETE FROM ramos WHERE hash = ?", [(linha[0],) for linha in linhas])
+            self._conn.executemany("INSERT OR REPLACE INTO ramos (hash, ramo, qtd) VALUES (?, ?, ?)", ramos)
+            self._conn.commit()
+        return len(linhas)
+
+    def remover(self, hashes):
+        """Remove os registros (e os seus ramos) dos hashes informados"""
+        parametros = [(hash_conteudo,) for hash_conteudo in hashes]
+        with self._lock:
+            self._conn.executemany("DELETE FROM registros WHERE hash = ?", parametros)
+            self._conn.executemany("DELETE FROM ramos WHERE hash = ?", parametros)
+            self._conn.commit()
+        return len(parametros)
+
+    def consultar(self, fiscal=None, inicio=None, fim=None, incluir_sem_data=False):
+        """
+        Registros de um fiscal (ou de todos) com data do relatório entre
+        `inicio` e `fim` (date, inclusive), em ordem de data e arquivo.
+        Registros sem Data Relatório só entram com um período se
+        `incluir_sem_data` for True.
+        Retorna uma lista de resultados com os quatro módulos.
+        """
+        condicoes, parametros = [], []
+        if fiscal is not None:
+            condicoes.append("fiscal = ?")
+            parametros.append(fiscal)
+        periodo = []
+        if inicio is not None:
+            periodo.append("data >= ?")
+            parametros.append(inicio.isoformat())
+        if fim is not None:
+            periodo.append("data <= ?")
+            parametros.append(fim.isoformat())
+        if periodo:
+            periodo = ' AND '.join(periodo)
+            condicoes.append(f"(data IS NULL OR ({periodo}))" if incluir_sem_data else periodo)
+        where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+        with self._lock:
+            linhas = self._conn.execute(
+                f"SELECT dados FROM registros {where} ORDER BY data, arquivo", parametros
+            ).fetchall()
+        return [json.loads(zlib.decompress(dados).decode('utf-8')) for dados, in linhas]
+
+    def fiscais(self):
+        """
+        Fiscais presentes no histórico, com o número de registros, o período
+        coberto e quantos registros não têm Data Relatório
+        """
+        with self._lock:
+            return self._conn.execute("""
+                SELECT fiscal, COUNT(*), MIN(data), MAX(data), SUM(data IS NULL)
+                FROM registros GROUP BY fiscal ORDER BY fiscal
+            """).fetchall()
+
+    def versao(self):
+        """Muda sempre que registros são gravados; identifica o conjunto atual para caches"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*), MAX(gravado_em) FROM registros").fetchone()
+
+    def coordenadas(self):
+        """(hash, fiscal, data, latitude, longitude) dos registros com coordenadas"""
+        with self._lock:
+            return self._conn.execute("""
+                SELECT hash, fiscal, data, latitude, longitude FROM registros
+                WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+            """).fetchall()
+
+    def ramos(self):
+        """(hash, ramo) de todos os registros"""
+        with self._lock:
+            return self._conn.execute("SELECT hash, ramo FROM ramos").fetchall()
+
+    def estatisticas(self):
+        """Retorna o número de registros e o tamanho dos dados armazenados"""
+        with self._lock:
+            registros, tamanho = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(dados)), 0) FROM registros"
+            ).fetchone()
+        return {'registros': registros, 'tamanho': tamanho}
@@ -0,0 +1,122 @@
+import zipfile
+from collections import deque
+from contextlib import nullcontext
+from cache_extracao import calcular_hash
+from extracao import BACKEND_PADRAO, iterar_lote
+
+# =================== DOCUMENTOS ENVIADOS ===================
+def _membro_pdf(info):
+    """Indica se um membro do ZIP é um PDF (ignorando pastas e metadados do macOS)"""
+    nome = info.filename.replace('\\', '/')
+    return (
+        not info.is_dir()
+        and nome.lower().endswith('.pdf')
+        and not nome.startswith('__MACOSX/')
+        and not nome.rsplit('/', 1)[-1].startswith('._')
+    )
+
+def _ler_e_liberar(arquivo, zf=None, info=None):
+    """Lê um upload (ou o último PDF de um ZIP) e libera o buffer em seguida"""
+    try:
+        return zf.read(info) if zf is not None else arquivo.getvalue()
+    finally:
+        if zf is not None:
+            zf.close()
+        arquivo.close()
+
+def listar_documentos(arquivos, liberar=False):
+    """
+    Lista os PDFs enviados, soltos ou dentro de arquivos ZIP (incluindo
+    pastas), como (nome, ler), em que ler() devolve o conteúdo. Nada é lido
+    aqui: os membros do ZIP são descompactados um a um, apenas quando ler()
+    é chamado. Os membros recebem o caminho dentro do ZIP como nome.
+    Com liberar=True, o buffer de cada upload é fechado assim que foi lido
+    (no caso de um ZIP, após o último PDF), e os documentos só podem ser
+    lidos uma vez.
+
+    Retorna (documentos, erros), com um erro por ZIP que não pôde ser aberto.
+    """
+    documentos, erros = [], []
+    for arquivo in arquivos:
+        if not arquivo.name.lower().endswith('.zip'):
+            ler = (lambda arquivo=arquivo: _ler_e_liberar(arquivo)) if liberar else arquivo.getvalue
+            documentos.append((arquivo.name, ler))
+            continue
+        try:
+            zf = zipfile.ZipFile(arquivo)
+        except (zipfile.BadZipFile, OSError) as e:
+            erros.append({'Arquivo': arquivo.name, 'Erro': f"{type(e).__name__}: {e}"})
+            continue
+        membros = sorted(filter(_membro_pdf, zf.infolist()), key=lambda i: i.filename)
+        for indice, info in enumerate(membros, 1):
+            if liberar and indice == len(membros):
+                ler = lambda arquivo=arquivo, zf=zf, info=info: _ler_e_liberar(arquivo, zf, info)
+            else:
+                ler = lambda zf=zf, info=info: zf.read(info)
+            documentos.append((info.filename, ler))
+        if liberar and not membros:
+            zf.close()
+            arquivo.close()
+    return documentos, erros
+
+def iterar_documentos(documentos, cache, versao, pool=None, temp_dir=None,
+                      backend=BACKEND_PADRAO, podar=False, janela=None, diagnostico=None,
+                      manter_texto=True):
+    """
+    Gera (nome, hash, resultado, do_cache) na ordem dos documentos.
+
+    Cada documento é lido, tem o hash calculado e é procurado no cache apenas
+    quando há vaga na janela de extração; os ausentes do cache são extraídos
+    (em paralelo, com um pool) e gravados nele. Com uma janela, no máximo
+    `janela` documentos ficam em memória ao mesmo tempo, qualquer que seja o
+    tamanho do lote ou do ZIP; a janela pode ser uma função (ver iterar_lote).
+    Com manter_texto=False, o texto dos PDFs não é devolvido nem vai ao cache.
+    Falhas de leitura viram {'erro': mensagem}.
+    """
+    etapa = diagnostico.etapa if diagnostico else (lambda nome: nullcontext())
+    ordem = deque()  # [nome, hash, resultado ou None se em extração, do_cache]
+
+    def pendentes():
+        for nome, ler in documentos:
+            try:
+                with etapa('leitura'):
+                    conteudo = ler()
+            except Exception as e:
+                ordem.append([nome, None, {'erro': f"{type(e).__name__}: {e}"}, False])
+                continue
+            with etapa('cache'):
+                hash_conteudo = calcular_hash(conteudo)
+                resultado = cache.obter(hash_conteudo, versao)
+            ordem.append([nome, hash_conteudo, resultado, resultado is not None])
+            if resultado is None:
+                yield conteudo, nome
+            conteudo = None
+
+    extraidos = iterar_lote(pendentes(), pool, temp_dir, backend, podar, janela, manter_texto)
+    prontos = deque()
+    try:
+        while True:
+            if not ordem:
+                # Avança a leitura até o próximo documento a extrair (ou o fim)
+                with etapa('extracao'):
+                    resultado = next(extraidos, None)
+                if resultado is None and not ordem:
+                    return
+                if resultado is not None:
+                    prontos.append(resultado)
+                continue
+
+            nome, hash_conteudo, resultado, do_cache = ordem.popleft()
+            if resultado is None:
+                if not prontos:
+                    with etapa('extracao'):
+                        prontos.append(next(extraidos))
+                resultado = prontos.popleft()
+                if 'erro' not in resultado:
+                    with etapa('cache'):
+                        cache.gravar(hash_conteudo, versao, resultado)
+            if not manter_texto:
+                resultado.pop('texto', None)  # Entradas gravadas antes no cache ainda trazem o texto
+            yield nome, hash_conteudo, resultado, do_cache
+    finally:
+        extraidos.close()
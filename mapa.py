@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+# Lado da célula da grade, em graus (1 grau de latitude ≈ 111 km)
+TAMANHOS_CELULA = {
+    "≈ 500 m": 0.005,
+    "≈ 1 km": 0.01,
+    "≈ 5 km": 0.05,
+    "≈ 10 km": 0.1,
+    "≈ 50 km": 0.5,
+}
+CORES = np.array([
+    (255, 255, 178), (254, 204, 92), (253, 141, 60), (240, 59, 32), (189, 0, 38)
+], dtype=np.uint8)
+
+# =================== ÍNDICE DA GRADE ===================
+class IndiceMapa:
+    """
+    Fiscalizações agregadas em uma grade regular de `tamanho` graus. Cada
+    célula ocupada recebe um número e tem a geometria calculada uma única
+    vez; as contagens ficam pré-agregadas por (célula, fiscal, data) e, à
+    parte, por (célula, fiscal, data, ramo). Os filtros apenas selecionam e
+    somam linhas desses cubos, sem revisitar os pontos nem refazer as células.
+    """
+
+    def __init__(self, pontos, ramos, tamanho):
+        self.tamanho = tamanho
+        df = pd.DataFrame(pontos, columns=['hash', 'fiscal', 'data', 'latitude', 'longitude'])
+        df = df[df['latitude'].between(-90, 90) & df['longitude'].between(-180, 180)]
+        self.pontos = len(df)
+        linha = np.floor(df['latitude'].to_numpy() / tamanho).astype('int64')
+        coluna = np.floor(df['longitude'].to_numpy() / tamanho).astype('int64')
+        # Número de cada célula ocupada, na ordem em que aparece; as linhas e
+        # colunas (negativas no hemisfério sul e a oeste de Greenwich) vêm do índice
+        celula, pares = pd.MultiIndex.from_arrays([linha, coluna]).factorize()
+        self.celulas = self._geometria(
+            pares.get_level_values(0).to_numpy(), pares.get_level_values(1).to_numpy()
+        )
+
+        df = pd.DataFrame({
+            'hash': df['hash'].to_numpy(),
+            'celula': celula,
+            'fiscal': pd.Categorical(df['fiscal']),
+            'data': pd.to_datetime(df['data'], format='%Y-%m-%d', errors='coerce').to_numpy(),
+        })
+        chaves = ['celula', 'fiscal', 'data']
+        self.cubo = df.groupby(chaves, observed=True, dropna=False).size().rename('quantidade').reset_index()
+
+        ramos = pd.DataFrame(ramos, columns=['hash', 'ramo'])
+        ramos['ramo'] = ramos['ramo'].astype('category')
+        self.cubo_ramos = (
+            df.merge(ramos, on='hash')
+            .groupby([*chaves, 'ramo'], observed=True, dropna=False).size().rename('quantidade').reset_index()
+        )
+
+    def _geometria(self, linhas, colunas):
+        """Centro e vértices (para o PolygonLayer) de cada célula, na ordem dos números das células"""
+        t = self.tamanho
+        sul, oeste = linhas * t, colunas * t
+        return pd.DataFrame({
+            'latitude': sul + t / 2,
+            'longitude': oeste + t / 2,
+            'poligono': [
+                [[o, s], [o + t, s], [o + t, s + t], [o, s + t]] for s, o in zip(sul.tolist(), oeste.tolist())
+            ],
+        })
+
+    @property
+    def fiscais(self):
+        return sorted(self.cubo['fiscal'].cat.categories)
+
+    @property
+    def ramos(self):
+        return sorted(self.cubo_ramos['ramo'].cat.categories) if len(self.cubo_ramos) else []
+
+    def periodo(self):
+        """Primeira e última data dos relatórios com coordenadas (None se não houver)"""
+        datas = self.cubo['data'].dropna()
+        return (datas.min().date(), datas.max().date()) if len(datas) else None
+
+    def agregar(self, fiscais=None, inicio=None, fim=None, ramo=None):
+        """
+        Células com ao menos uma fiscalização que atenda aos filtros, com
+        centro, vértices, quantidade e cor
+        """
+        cubo = self.cubo if ramo is None else self.cubo_ramos
+        filtro = np.ones(len(cubo), dtype=bool)
+        if ramo is not None:
+            filtro &= (cubo['ramo'] == ramo).to_numpy()
+        if fiscais:
+            filtro &= cubo['fiscal'].isin(fiscais).to_numpy()
+        if inicio is not None:
+            filtro &= (cubo['data'] >= pd.Timestamp(inicio)).to_numpy()
+        if fim is not None:
+            filtro &= (cubo['data'] <= pd.Timestamp(fim)).to_numpy()
+        quantidades = cubo[filtro].groupby('celula')['quantidade'].sum()
+
+        celulas = self.celulas.iloc[quantidades.index.to_numpy()].reset_index(drop=True)
+        celulas['quantidade'] = quantidades.to_numpy()
+        # Cores em escala logarítmica: poucas células muito densas não apagam as demais
+        if len(celulas):
+            escala = np.log1p(celulas['quantidade'].to_numpy())
+            indice = np.minimum((escala / escala.max() * len(CORES)).astype(int), len(CORES) - 1)
+            celulas['cor'] = CORES[indice].tolist()
+        else:
+            celulas['cor'] = []
+        return celulas
@@ -0,0 +1,74 @@
+import gc
+import os
+import sys
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Fração do limite a partir da qual a extração passa a um arquivo por vez
+FRACAO_ALERTA = 0.8
+
+# =================== MEDIÇÃO ===================
+def rss_mb(pid=None):
+    """
+    Memória residente atual de um processo, em MB. No Linux lê
+    /proc/<pid>/statm; nos demais sistemas só o processo atual é medido,
+    pelo pico do getrusage (None se indisponível).
+    """
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, IndexError):
+        pass
+    if pid is not None or resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / 2**20 if sys.platform == 'darwin' else pico / 1024  # bytes no macOS, KB no Linux
+
+# =================== LIMITE DE MEMÓRIA ===================
+class LimiteMemoria:
+    """
+    Acompanha a memória residente do processo principal somada à dos
+    processos de extração (quando há um pool) e registra o pico da execução.
+    Serve de janela dinâmica para iterar_lote: perto do limite, os
+    coletores do Python são acionados e a extração segue com um arquivo
+    por vez até a memória voltar a cair.
+    """
+
+    def __init__(self, limite_mb, pool=None, janela_max=None):
+        self.limite_mb = limite_mb
+        self.pool = pool
+        self.janela_max = janela_max
+        self.atual_mb = 0.0
+        self.pico_mb = 0.0
+        self.excedido = 0
+
+    def _pids(self):
+        processos = getattr(self.pool, '_processes', None) or {}
+        return [None, *list(processos)]
+
+    def medir(self):
+        """Mede a memória atual (MB), atualizando o pico e as vezes em que o limite foi excedido"""
+        medidas = [rss_mb(pid) for pid in self._pids()]
+        self.atual_mb = sum(m for m in medidas if m is not None)
+        self.pico_mb = max(self.pico_mb, self.atual_mb)
+        if self.limite_mb and self.atual_mb > self.limite_mb:
+            self.excedido += 1
+        return self.atual_mb
+
+    def janela(self):
+        """Número de arquivos que podem estar em extração ao mesmo tempo"""
+        if self.limite_mb and self.medir() > self.limite_mb * FRACAO_ALERTA:
+            gc.collect()
+            return 1
+        return self.janela_max
+
+    def resumo(self):
+        """Pico, limite e número de medições acima do limite, para logs e relatórios"""
+        return {
+            'pico_rss_mb': round(self.pico_mb, 1),
+            'limite_mb': self.limite_mb,
+            'limite_excedido': self.excedido
+        }
@@ -0,0 +1,329 @@
+"""
+Ingestão contínua de uma pasta de entrega de relatórios.
+
+Monitora um diretório (recursivamente) e extrai apenas os PDFs novos ou
+alterados, gravando os registros no histórico lido pela interface ("Gerar a
+partir do histórico"). Cada arquivo só é processado depois de ficar
+`--espera` segundos sem alterações (arquivos ainda em cópia são ignorados até
+lá). Um índice local guarda o mtime, o tamanho e o SHA-256 de cada arquivo
+já visto: arquivos com o mesmo mtime e tamanho não são lidos, e arquivos
+regravados com o mesmo conteúdo não são extraídos de novo.
+
+Ao iniciar, a pasta é conferida com o índice (apenas stat, sem leitura dos
+arquivos inalterados) para recuperar o que chegou com o serviço parado; depois
+disso, cada arquivo novo custa uma única extração, sem varrer a pasta.
+
+Uso:
+    python monitor_pasta.py /compartilhado/relatorios
+    python monitor_pasta.py /compartilhado/relatorios --historico historico.sqlite --polling
+"""
+import argparse
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+from watchdog.observers.polling import PollingObserver
+
+from cache_extracao import CacheExtracao, calcular_hash
+from extracao import (
+    BACKEND_PADRAO, BACKENDS_TEXTO, criar_pool, processar_lote, renomear_resultado, versao_extracao
+)
+from extrator_lote import listar_pdfs
+from historico import HistoricoExtracoes
+
+HISTORICO_PADRAO = os.environ.get(
+    "EXTRATOR_HISTORICO",
+    os.path.join(tempfile.gettempdir(), "extratorfiscal", "historico.sqlite")
+)
+
+# =================== ÍNDICE DE ARQUIVOS VISTOS ===================
+class IndiceArquivos:
+    """
+    Arquivos já ingeridos (SQLite), com o mtime, o tamanho e o SHA-256 do
+    conteúdo na última leitura.
+    """
+
+    def __init__(self, caminho):
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(caminho, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS arquivos (
+                caminho TEXT PRIMARY KEY,
+                mtime REAL NOT NULL,
+                tamanho INTEGER NOT NULL,
+                hash TEXT NOT NULL,
+                visto_em REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def assinaturas(self):
+        """Dicionário caminho -> (mtime, tamanho, hash) de todos os arquivos vistos"""
+        with self._lock:
+            linhas = self._conn.execute("SELECT caminho, mtime, tamanho, hash FROM arquivos").fetchall()
+        return {caminho: (mtime, tamanho, hash_conteudo) for caminho, mtime, tamanho, hash_conteudo in linhas}
+
+    def obter(self, caminho):
+        """(mtime, tamanho, hash) da última leitura do arquivo, ou None"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT mtime, tamanho, hash FROM arquivos WHERE caminho = ?", (caminho,)
+            ).fetchone()
+
+    def registrar(self, arquivos):
+        """Grava (caminho, mtime, tamanho, hash) dos arquivos lidos"""
+        agora = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO arquivos (caminho, mtime, tamanho, hash, visto_em) VALUES (?, ?, ?, ?, ?)",
+                [(*arquivo, agora) for arquivo in arquivos]
+            )
+            self._conn.commit()
+
+    def remover(self, caminhos):
+        """Esquece arquivos removidos da pasta (os registros no histórico são mantidos)"""
+        with self._lock:
+            self._conn.executemany("DELETE FROM arquivos WHERE caminho = ?", [(c,) for c in caminhos])
+            self._conn.commit()
+
+# =================== MONITOR ===================
+def _assinatura(caminho):
+    """(mtime, tamanho) do arquivo, ou None se não existir mais"""
+    try:
+        estado = os.stat(caminho)
+    except OSError:
+        return None
+    return estado.st_mtime, estado.st_size
+
+class MonitorPasta:
+    """
+    Agenda os PDFs alterados (por eventos do sistema de arquivos ou pela
+    conferência inicial) e os extrai quando ficam estáveis por `espera`
+    segundos, gravando os resultados no histórico e no índice.
+    """
+
+    def __init__(self, raiz, indice, historico, cache=None, pool=None,
+                 backend=BACKEND_PADRAO, podar=True, espera=2.0):
+        self.raiz = os.path.abspath(raiz)
+        self.indice = indice
+        self.historico = historico
+        self.cache = cache
+        self.pool = pool
+        self.backend = backend
+        self.podar = podar
+        self.espera = espera
+        self.versao = versao_extracao(backend, podar)
+        self.extraidos = 0
+        self._pendentes = {}  # caminho -> (instante do último evento, assinatura na última conferência)
+        self._lock = threading.Lock()
+
+    def agendar(self, caminho, assinatura=None):
+        """Marca um arquivo para ingestão após o período de espera (reiniciado a cada evento)"""
+        if caminho.lower().endswith('.pdf'):
+            with self._lock:
+                anterior = self._pendentes.get(caminho)
+                if assinatura is None and anterior:
+                    assinatura = anterior[1]
+                self._pendentes[caminho] = (time.monotonic(), assinatura)
+
+    def esquecer(self, caminho):
+        """Retira um arquivo removido da fila e do índice"""
+        if caminho.lower().endswith('.pdf'):
+            with self._lock:
+                self._pendentes.pop(caminho, None)
+            self.indice.remover([caminho])
+
+    def conferir_pasta(self):
+        """Agenda os arquivos novos ou alterados desde a última execução e esquece os removidos"""
+        vistos = self.indice.assinaturas()
+        agendados = 0
+        for caminho in listar_pdfs(self.raiz):
+            caminho = os.path.abspath(caminho)
+            anterior = vistos.pop(caminho, None)
+            assinatura = _assinatura(caminho)
+            if anterior is None or anterior[:2] != assinatura:
+                self.agendar(caminho, assinatura)
+                agendados += 1
+        self.indice.remover(list(vistos))
+        logging.info("Conferência da pasta: %d arquivo(s) a ingerir, %d removido(s) do índice",
+                     agendados, len(vistos))
+
+    def estaveis(self, limite=None):
+        """Retira da fila (até `limite`) os arquivos sem alterações há `espera` segundos"""
+        agora = time.monotonic()
+        prontos = []
+        with self._lock:
+            for caminho, (instante, assinatura_anterior) in list(self._pendentes.items()):
+                if limite and len(prontos) >= limite:
+                    break
+                if agora - instante < self.espera:
+                    continue
+                assinatura = _assinatura(caminho)
+                if assinatura is None:
+                    del self._pendentes[caminho]
+                elif assinatura != assinatura_anterior:
+                    # Ainda mudando desde a última conferência: aguarda mais um período
+                    self._pendentes[caminho] = (agora, assinatura)
+                else:
+                    del self._pendentes[caminho]
+                    prontos.append((caminho, assinatura))
+        return prontos
+
+    def ingerir(self, arquivos):
+        """
+        Lê os arquivos estáveis e extrai apenas os de conteúdo novo. O
+        registro da versão anterior de um arquivo alterado sai do histórico,
+        a menos que o mesmo conteúdo ainda esteja em outro caminho.
+        """
+        lidos, itens, substituidos = [], [], set()
+        for caminho, (mtime, tamanho) in arquivos:
+            anterior = self.indice.obter(caminho)
+            if anterior and anterior[:2] == (mtime, tamanho):
+                continue
+            try:
+                with open(caminho, 'rb') as f:
+                    conteudo = f.read()
+            except OSError as e:
+                logging.warning("%s: %s; nova tentativa no próximo evento", caminho, e)
+                continue
+            hash_conteudo = calcular_hash(conteudo)
+            lidos.append((caminho, mtime, tamanho, hash_conteudo))
+            if anterior and anterior[2] == hash_conteudo:
+                continue  # Regravado com o mesmo conteúdo
+            if anterior:
+                substituidos.add(anterior[2])
+            resultado = self.cache.obter(hash_conteudo, self.versao) if self.cache else None
+            itens.append((caminho, hash_conteudo, conteudo if resultado is None else None, resultado))
+
+        pendentes = [i for i, (_, _, conteudo, _) in enumerate(itens) if conteudo is not None]
+        extraidos = processar_lote(
+            [(itens[i][2], os.path.basename(itens[i][0])) for i in pendentes],
+            self.pool, backend=self.backend, podar=self.podar
+        )
+        resultados = [resultado for _, _, _, resultado in itens]
+        for i, resultado in zip(pendentes, extraidos):
+            if self.cache and 'erro' not in resultado:
+                self.cache.gravar(itens[i][1], self.versao, resultado)
+            resultados[i] = resultado
+
+        registros = []
+        for (caminho, hash_conteudo, _, _), resultado in zip(itens, resultados):
+            if 'erro' in resultado:
+                logging.warning("%s: %s", caminho, resultado['erro'])
+            else:
+                registros.append((hash_conteudo, renomear_resultado(resultado, os.path.basename(caminho))))
+        if substituidos:
+            alterados = {caminho for caminho, _, _, _ in lidos}
+            em_uso = {hash_conteudo for _, _, _, hash_conteudo in lidos}
+            em_uso.update(
+                assinatura[2] for caminho, assinatura in self.indice.assinaturas().items()
+                if caminho not in alterados
+            )
+            self.historico.remover(substituidos - em_uso)
+        self.historico.gravar(registros)
+        self.indice.registrar(lidos)
+        self.extraidos += len(pendentes)
+        if itens:
+            logging.info("%d arquivo(s) ingerido(s) (%d extraído(s), %d do cache), %d erro(s)",
+                         len(itens), len(pendentes), len(itens) - len(pendentes),
+                         len(itens) - len(registros))
+
+class _EventosPasta(FileSystemEventHandler):
+    """Repassa ao monitor os eventos de PDFs da pasta"""
+
+    def __init__(self, monitor):
+        self.monitor = monitor
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.monitor.agendar(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.monitor.agendar(event.src_path)
+
+    def on_closed(self, event):
+        if not event.is_directory:
+            self.monitor.agendar(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.monitor.esquecer(event.src_path)
+            self.monitor.agendar(event.dest_path)
+
+    def on_deleted(self, event):
+        if not event.is_directory:
+            self.monitor.esquecer(event.src_path)
+
+# =================== EXECUÇÃO ===================
+def executar(args):
+    historico = HistoricoExtracoes(args.historico)
+    indice = IndiceArquivos(args.indice or f"{os.path.splitext(args.historico)[0]}_monitor.sqlite")
+    cache = CacheExtracao(args.cache) if args.cache else None
+    pool = criar_pool(args.workers) if args.workers > 1 else None
+    monitor = MonitorPasta(args.pasta, indice, historico, cache, pool, args.backend, args.podar, args.espera)
+
+    # Pastas de rede (SMB/NFS) nem sempre emitem eventos: --polling compara o stat periodicamente
+    observador = PollingObserver(timeout=args.intervalo_polling) if args.polling else Observer()
+    observador.schedule(_EventosPasta(monitor), monitor.raiz, recursive=True)
+    observador.start()
+    logging.info("Monitorando %s (histórico: %s, índice: %s)", monitor.raiz, historico.caminho, indice.caminho)
+    try:
+        monitor.conferir_pasta()
+        while True:
+            prontos = monitor.estaveis(args.lote)
+            if prontos:
+                monitor.ingerir(prontos)
+            else:
+                time.sleep(min(1.0, args.espera / 2))
+    except KeyboardInterrupt:
+        logging.info("Encerrando: %d arquivo(s) extraídos nesta execução", monitor.extraidos)
+    finally:
+        observador.stop()
+        observador.join()
+        if pool:
+            pool.shutdown()
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Ingestão contínua de relatórios de fiscalização de uma pasta",
+        formatter_class=argparse.RawDescriptionHelpFormatter, epilog=__doc__
+    )
+    parser.add_argument('pasta', help='Diretório monitorado (recursivamente)')
+    parser.add_argument('--historico', default=HISTORICO_PADRAO,
+                        help='Histórico (SQLite) lido pela interface (padrão: EXTRATOR_HISTORICO)')
+    parser.add_argument('--indice', help='Índice de arquivos vistos (padrão: <historico>_monitor.sqlite)')
+    parser.add_argument('--cache', help='Caminho do cache de extração (SQLite) a reutilizar')
+    parser.add_argument('--espera', type=float, default=2.0,
+                        help='Segundos sem alterações antes de ler um arquivo (padrão: 2)')
+    parser.add_argument('--lote', type=int, default=200,
+                        help='Máximo de arquivos lidos de uma vez (limita a memória na conferência inicial)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--backend', choices=list(BACKENDS_TEXTO), default=BACKEND_PADRAO)
+    parser.add_argument('--sem-podar', dest='podar', action='store_false',
+                        help='Lê todas as páginas, mesmo após as seções do relatório')
+    parser.add_argument('--polling', action='store_true',
+                        help='Detecta alterações por varredura periódica (pastas de rede sem eventos)')
+    parser.add_argument('--intervalo-polling', type=float, default=10.0,
+                        help='Segundos entre varreduras com --polling (padrão: 10)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    logging.getLogger('pdfminer').setLevel(logging.ERROR)
+    logging.getLogger('watchdog').setLevel(logging.WARNING)
+    return executar(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,281 @@
+import os
+import threading
+from datetime import datetime, time
+from io import BytesIO
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from openpyxl import load_workbook
+from cache_extracao import calcular_hash
+
+# Linhas da planilha convertidas para Arrow de cada vez (as tuplas do openpyxl
+# de um bloco são descartadas assim que o bloco vira colunas Arrow)
+LINHAS_POR_BLOCO = 5_000
+# Alterar quando a conversão mudar: invalida as planilhas já convertidas no cache
+VERSAO_LEITOR = 1
+
+# =================== LEITURA EM BLOCOS ===================
+def listar_abas(conteudo):
+    """Nomes das abas da pasta de trabalho (lê apenas o índice do arquivo)"""
+    wb = load_workbook(BytesIO(conteudo), read_only=True)
+    try:
+        return wb.sheetnames
+    finally:
+        wb.close()
+
+def _vazia(linha):
+    return all(v is None or v == '' for v in linha)
+
+def _nomes_colunas(cabecalho):
+    """Nomes do cabeçalho sem repetições; colunas sem título recebem 'Coluna N'"""
+    nomes, vistos = [], set()
+    for i, valor in enumerate(cabecalho, start=1):
+        nome = str(valor).strip() if valor is not None else ''
+        nome = nome or f"Coluna {i}"
+        base, n = nome, 2
+        while nome in vistos:
+            nome, n = f"{base} ({n})", n + 1
+        vistos.add(nome)
+        nomes.append(nome)
+    return nomes
+
+def _texto(valor):
+    """Valor de uma coluna convertida em texto, com datas no formato usado nos relatórios"""
+    if valor is None or isinstance(valor, str):
+        return valor
+    if isinstance(valor, datetime):
+        return valor.strftime('%d/%m/%Y' if valor.time() == time() else '%d/%m/%Y %H:%M:%S')
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor)
+
+def _coluna_texto(valores):
+    return pa.array([_texto(v) for v in valores], type=pa.string())
+
+def _coluna_arrow(valores):
+    """Coluna Arrow com o tipo inferido; colunas com tipos misturados viram texto"""
+    try:
+        return pa.array(valores)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+        return _coluna_texto(valores)
+
+def iterar_blocos(conteudo, aba=None, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """
+    Gera a planilha em tabelas Arrow de até `linhas_por_bloco` linhas,
+    lendo as linhas em modo contínuo (read-only) do openpyxl. A primeira
+    linha não vazia é o cabeçalho; linhas vazias são ignoradas e células
+    além da última coluna do cabeçalho são descartadas.
+    """
+    wb = load_workbook(BytesIO(conteudo), read_only=True, data_only=True)
+    try:
+        ws = wb[aba] if aba else wb.worksheets[0]
+        # Dimensões gravadas por alguns exportadores estão erradas; as linhas são lidas como estão
+        ws.reset_dimensions()
+        linhas = ws.iter_rows(values_only=True)
+        nomes = None
+        for linha in linhas:
+            if not _vazia(linha):
+                nomes = _nomes_colunas(linha)
+                break
+        if nomes is None:
+            return
+        largura = len(nomes)
+
+        bloco, gerados = [], 0
+        for linha in linhas:
+            if _vazia(linha):
+                continue
+            if len(linha) < largura:
+                linha = linha + (None,) * (largura - len(linha))
+            bloco.append(linha[:largura])
+            if len(bloco) >= linhas_por_bloco:
+                yield pa.table([_coluna_arrow(c) for c in zip(*bloco)], names=nomes)
+                bloco, gerados = [], gerados + 1
+        # Uma aba só com o cabeçalho gera uma tabela vazia com as colunas
+        if bloco or not gerados:
+            colunas = zip(*bloco) if bloco else ([] for _ in nomes)
+            yield pa.table([_coluna_arrow(c) for c in colunas], names=nomes)
+    finally:
+        wb.close()
+
+def _tipo_comum(tipos):
+    """Tipo em que todos os blocos de uma coluna cabem (texto se forem incompatíveis)"""
+    tipos = [t for t in tipos if t != pa.null()]
+    if not tipos:
+        return pa.string()
+    try:
+        return pa.unify_schemas(
+            [pa.schema([('c', t)]) for t in tipos], promote_options='permissive'
+        ).field('c').type
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.string()
+
+def ler_planilha(conteudo, aba=None, linhas_por_bloco=LINHAS_POR_BLOCO, progresso=None):
+    """
+    Converte uma aba (a primeira, se não indicada) em uma única tabela
+    Arrow. Cada bloco tem o tipo das colunas inferido separadamente; ao
+    final, as colunas são promovidas a um tipo comum (inteiros misturados a
+    números fracionários viram float; tipos incompatíveis, texto). Colunas sem título e sem
+    nenhum valor são removidas. `progresso(linhas)` é chamado a cada bloco.
+    """
+    blocos, linhas = [], 0
+    for bloco in iterar_blocos(conteudo, aba, linhas_por_bloco):
+        blocos.append(bloco)
+        linhas += bloco.num_rows
+        if progresso:
+            progresso(linhas)
+    if not blocos:
+        return pa.table({})
+
+    campos = []
+    for nome in blocos[0].column_names:
+        tipos = [b.schema.field(nome).type for b in blocos]
+        if nome.startswith("Coluna ") and all(t == pa.null() for t in tipos):
+            continue
+        campos.append(pa.field(nome, _tipo_comum(tipos)))
+    esquema = pa.schema(campos)
+    return pa.concat_tables([_converter(b, esquema) for b in blocos])
+
+def _converter(bloco, esquema):
+    """Bloco com as colunas e os tipos do esquema final"""
+    colunas = []
+    for campo in esquema:
+        coluna = bloco[campo.name]
+        if coluna.type == campo.type:
+            colunas.append(coluna)
+        elif campo.type == pa.string():
+            # Mesma formatação das colunas que já viraram texto na leitura do bloco
+            colunas.append(_coluna_texto(coluna.to_pylist()))
+        else:
+            colunas.append(coluna.cast(campo.type))
+    return pa.table(colunas, schema=esquema)
+
+# =================== CACHE EM PARQUET ===================
+class CachePlanilhas:
+    """
+    Planilhas já convertidas, gravadas em Parquet (um arquivo por conteúdo,
+    aba e versão do leitor). Reabrir uma planilha grande lê apenas o
+    Parquet, sem passar pelo openpyxl. O tamanho total da pasta é limitado e
+    os arquivos usados há mais tempo são removidos primeiro (LRU pela data
+    de modificação, atualizada a cada acesso).
+    """
+
+    def __init__(self, pasta, tamanho_max=1024 * 1024 * 1024):
+        os.makedirs(pasta, exist_ok=True)
+        self.pasta = pasta
+        self.tamanho_max = tamanho_max
+        self.acertos = 0
+        self.falhas = 0
+        self._lock = threading.Lock()
+
+    def caminho(self, hash_conteudo, aba):
+        chave = calcular_hash(f"{VERSAO_LEITOR}:{hash_conteudo}:{aba or ''}".encode('utf-8'))
+        return os.path.join(self.pasta, f"{chave}.parquet")
+
+    def obter(self, hash_conteudo, aba):
+        """
+        Tabela Arrow da planilha convertida ou None se não estiver no cache.
+        As colunas de texto são lidas com dicionário (cada valor distinto
+        uma única vez), o que reduz a memória e acelera os agrupamentos.
+        """
+        caminho = self.caminho(hash_conteudo, aba)
+        try:
+            textos = [campo.name for campo in pq.read_schema(caminho) if pa.types.is_string(campo.type)]
+            tabela = pq.read_table(caminho, memory_map=True, read_dictionary=textos)
+            os.utime(caminho)
+        except (OSError, pa.ArrowInvalid):
+            self.falhas += 1
+            return None
+        self.acertos += 1
+        return tabela
+
+    def gravar(self, hash_conteudo, aba, tabela):
+        """Grava a tabela (de forma atômica) e aplica o limite de tamanho"""
+        caminho = self.caminho(hash_conteudo, aba)
+        temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+        pq.write_table(tabela, temporario, compression='zstd')
+        os.replace(temporario, caminho)
+        with self._lock:
+            self._remover_excedente()
+        return caminho
+
+    def _remover_excedente(self):
+        """Remove os arquivos menos usados até caber no tamanho máximo"""
+        arquivos = []
+        for entrada in os.scandir(self.pasta):
+            if entrada.name.endswith('.parquet'):
+                estado = entrada.stat()
+                arquivos.append((estado.st_mtime, estado.st_size, entrada.path))
+        total = sum(tamanho for _, tamanho, _ in arquivos)
+        for _, tamanho, caminho in sorted(arquivos):
+            if total <= self.tamanho_max:
+                break
+            try:
+                os.unlink(caminho)
+            except OSError:
+                continue
+            total -= tamanho
+
+    def estatisticas(self):
+        """Retorna contadores de acertos/falhas e ocupação do cache"""
+        tamanhos = [e.stat().st_size for e in os.scandir(self.pasta) if e.name.endswith('.parquet')]
+        return {
+            'acertos': self.acertos,
+            'falhas': self.falhas,
+            'entradas': len(tamanhos),
+            'tamanho': sum(tamanhos)
+        }
+
+# =================== CONSOLIDAÇÃO ===================
+COLUNA_CONTAGEM = 'Autuações'
+
+def coluna_contagem(tabela):
+    """
+    Nome da coluna com o número de autuações (linhas): 'Autuações' ou, se a
+    planilha já tiver uma coluna com esse nome, 'Autuações (2)', 'Autuações (3)'...
+    """
+    nome, n = COLUNA_CONTAGEM, 2
+    while nome in tabela.column_names:
+        nome, n = f"{COLUNA_CONTAGEM} ({n})", n + 1
+    return nome
+
+def colunas_numericas(tabela):
+    """Colunas que podem ser somadas"""
+    return [
+        campo.name for campo in tabela.schema
+        if pa.types.is_integer(campo.type) or pa.types.is_floating(campo.type) or pa.types.is_decimal(campo.type)
+    ]
+
+def colunas_valores(tabela):
+    """
+    Colunas numéricas com casas decimais (valores de multa, por exemplo);
+    colunas inteiras costumam ser códigos, como o número do auto
+    """
+    return [
+        campo.name for campo in tabela.schema
+        if pa.types.is_floating(campo.type) or pa.types.is_decimal(campo.type)
+    ]
+
+def totais(tabela, somar):
+    """Número de autuações (linhas) e a soma de cada coluna em `somar`"""
+    resultado = {coluna_contagem(tabela): tabela.num_rows}
+    for coluna in somar:
+        resultado[coluna] = pc.sum(tabela[coluna]).as_py() or 0
+    return resultado
+
+def consolidar(tabela, agrupar_por, somar):
+    """
+    Quantidade de autuações e somas por grupo (group_by do Arrow, sem
+    passar pelas linhas em Python), da maior quantidade para a menor.
+    Valores vazios formam um grupo próprio; colunas de `somar` que também
+    estão em `agrupar_por` são ignoradas. A quantidade fica na coluna
+    coluna_contagem(tabela).
+    """
+    somar = [coluna for coluna in somar if coluna not in agrupar_por]
+    contagem = coluna_contagem(tabela)
+    agregado = tabela.group_by(list(agrupar_por), use_threads=True).aggregate(
+        [([], 'count_all'), *[(coluna, 'sum') for coluna in somar]]
+    )
+    nomes = {'count_all': contagem, **{f"{coluna}_sum": coluna for coluna in somar}}
+    agregado = agregado.rename_columns([nomes.get(n, n) for n in agregado.column_names])
+    return agregado.sort_by([(contagem, 'descending')]).select([*agrupar_por, contagem, *somar])
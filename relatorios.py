@@ -0,0 +1,417 @@
+import os
+import re
+import unicodedata
+import zipfile
+from concurrent.futures import as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from functools import lru_cache
+from io import BytesIO
+from fpdf import FPDF
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.styles import Font
+from openpyxl.utils import get_column_letter
+from consolidacao import particionar_por_fiscal, ranking_ramos
+from tabela_pdf import desenhar_tabela
+
+LOGO_PATH = "10.png"
+
+COLUNAS_INFORMACOES = [
+    ('Arquivo', 60, 'L', True),
+    ('Informações', 130, 'L', True),
+]
+
+# =================== LOGO ===================
+@lru_cache(maxsize=None)
+def _logo_decodificado():
+    """PNG do logo decodificado pelo FPDF uma única vez por processo (None se ausente ou inválido)"""
+    try:
+        return FPDF()._parsepng(LOGO_PATH) if os.path.exists(LOGO_PATH) else None
+    except Exception:
+        return None
+
+def adicionar_logo(pdf, x=10, y=8, w=40):
+    """Insere o logo reaproveitando a imagem já decodificada"""
+    info = _logo_decodificado()
+    if info is None:
+        return
+    if LOGO_PATH not in pdf.images:
+        # Cópia: ao gerar o arquivo, o FPDF descarta os dados da imagem do documento
+        pdf.images[LOGO_PATH] = dict(info, i=len(pdf.images) + 1)
+    pdf.image(LOGO_PATH, x=x, y=y, w=w)
+
+# =================== TOTAIS ===================
+def totais_consolidados(df_vs, df_ra, df_pp):
+    """Totais do resumo geral, na ordem em que aparecem nos relatórios"""
+    total_vs = df_vs[df_vs['Arquivo'] == 'TOTAL']
+    total_pp = df_pp[df_pp['Arquivo'] == 'TOTAL GERAL']
+    return [
+        ("TOTAL AÇÕES", len(df_vs[df_vs['Arquivo'] != 'TOTAL'])),  # Total de documentos analisados
+        ("TOTAL VÍNCULOS", total_vs['Vínculos'].values[0]),
+        ("TOTAL S.I", total_vs['S.I'].values[0]),
+        ("TOTAL DE RAMO DE ATIVIDADE", int(df_ra['Qtd'].sum()) if 'Qtd' in df_ra.columns else 0),
+        ("TOTAL PROTOCOLO", total_pp['Qtd. Protocolo'].values[0]),
+        ("TOTAL LEGALIZAÇÃO", total_pp['Qtd. Legalização'].values[0]),
+    ]
+
+# =================== GERADORES DE RELATÓRIO PDF ===================
+def gerar_relatorio_vinculos_si(df):
+    """Gera PDF para Vínculos e S.I"""
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_auto_page_break(auto=True, margin=15)
+
+    pdf.set_font('Arial', 'B', 16)
+    pdf.cell(0, 10, 'Relatório Vínculos e S.I', 0, 1, 'C')
+    pdf.set_font('Arial', '', 10)
+    pdf.cell(0, 10, f'Gerado em: {datetime.now().strftime("%d/%m/%Y %H:%M:%S")}', 0, 1)
+    pdf.ln(10)
+
+    colunas = [
+        ('Arquivo', 120, 'L', True),
+        ('Vínculos', 30, 'C', False),
+        ('S.I', 30, 'C', False),
+    ]
+    linhas = df.loc[df['Arquivo'] != 'TOTAL', ['Arquivo', 'Vínculos', 'S.I']].itertuples(index=False, name=None)
+    total = df[df['Arquivo'] == 'TOTAL'].iloc[0]
+    desenhar_tabela(
+        pdf, colunas, linhas, totais=('TOTAL GERAL', total['Vínculos'], total['S.I']), altura_linha=8,
+        fonte=('Arial', '', 10), fonte_cabecalho=('Arial', 'B', 12), fonte_totais=('Arial', 'B', 10)
+    )
+
+    return pdf.output(dest='S').encode('latin1')
+
+def gerar_relatorio_ramo_atividade(df):
+    """Gera PDF para Ramo de Atividade a partir da tabela longa (Arquivo, Ramo, Qtd)"""
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_auto_page_break(auto=True, margin=15)
+
+    pdf.set_font("Arial", 'B', 16)
+    pdf.cell(0, 10, "RELATÓRIO DE RAMOS DE ATIVIDADE", 0, 1, 'C')
+    pdf.ln(10)
+
+    # Totais por ramo, ordenados por quantidade
+    ranking = ranking_ramos(df)
+    total = int(ranking['Qtd'].sum())
+
+    colunas = [
+        ('RAMO DE ATIVIDADE', 120, 'L', True),
+        ('QUANTIDADE', 30, 'C', False),
+        ('PORCENTAGEM', 30, 'C', False),
+    ]
+    linhas = (
+        (ramo, qtd, f"{porcentagem:.1f}%") for ramo, qtd, porcentagem in ranking.itertuples(index=False)
+    )
+    desenhar_tabela(
+        pdf, colunas, linhas, totais=('TOTAL GERAL', total, '100%'), altura_linha=7,
+        fonte=('Arial', '', 9), fonte_cabecalho=('Arial', 'B', 10), fonte_totais=('Arial', 'B', 10)
+    )
+
+    pdf.ln(10)
+    pdf.set_font("Arial", 'I', 8)
+    pdf.cell(0, 10, f"Gerado em: {datetime.now().strftime('%d/%m/%Y %H:%M')}", 0, 0, 'C')
+
+    return pdf.output(dest='S').encode('latin1')
+
+def gerar_relatorio_processo_protocolo(df):
+    """Gera PDF para Processo/Protocolo com foco em Legalização"""
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_auto_page_break(auto=True, margin=15)
+
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(0, 10, "RELATÓRIO DE PROCESSOS/PROTOCOLOS", 0, 1, 'C')
+    pdf.ln(8)
+
+    colunas = [
+        ('Arquivo', 35, 'L', True),
+        ('Fiscal', 30, 'C', True),
+        ('Protocolo', 40, 'C', True),
+        ('Legalização', 40, 'L', True),
+        ('Protocolo', 20, 'C', False),
+        ('Legalização', 20, 'C', False),
+    ]
+    dados = df[df['Arquivo'] != 'TOTAL GERAL']
+    linhas = dados[
+        ['Arquivo', 'Fiscal', 'Protocolo', 'Legalização', 'Qtd. Protocolo', 'Qtd. Legalização']
+    ].itertuples(index=False, name=None)
+
+    totais = None
+    if 'TOTAL GERAL' in df['Arquivo'].values:
+        total = df[df['Arquivo'] == 'TOTAL GERAL'].iloc[0]
+        totais = ('TOTAL GERAL', '', '', '', total['Qtd. Protocolo'], total['Qtd. Legalização'])
+    desenhar_tabela(pdf, colunas, linhas, totais=totais, altura_linha=5)
+
+    pdf.ln(12)
+    pdf.set_font("Arial", 'I', 8)
+    pdf.cell(0, 10, f"Gerado em: {datetime.now().strftime('%d/%m/%Y %H:%M')}", 0, 0, 'C')
+
+    return pdf.output(dest='S').encode('latin1')
+
+def gerar_relatorio_informacoes_complementares(df):
+    """Gera PDF para Informações Complementares com dados entre parênteses"""
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_auto_page_break(auto=True, margin=15)
+
+    # Cabeçalho padrão
+    pdf.set_font("Arial", 'B', 14)
+    pdf.cell(0, 10, "RELATÓRIO DE INFORMAÇÕES COMPLEMENTARES", 0, 1, 'C')
+    pdf.ln(5)
+
+    pdf.set_font("Arial", '', 10)
+    pdf.cell(0, 10, f"Gerado em: {datetime.now().strftime('%d/%m/%Y %H:%M')}", 0, 1)
+    pdf.ln(10)
+
+    # Conteúdo apenas para arquivos com informações entre parênteses
+    linhas = df.loc[df['Informações'].astype(bool), ['Arquivo', 'Informações']].itertuples(index=False, name=None)
+    desenhar_tabela(
+        pdf, COLUNAS_INFORMACOES, linhas, altura_linha=6,
+        fonte=('Arial', '', 10), fonte_cabecalho=('Arial', 'B', 10)
+    )
+
+    return pdf.output(dest='S').encode('latin1')
+
+def gerar_extrato_consolidado(df_vs, df_ra, df_pp, df_ic, fiscal, data_inicio, data_fim):
+    """Gera o PDF do Extrato Consolidado de Produtividade"""
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_auto_page_break(auto=True, margin=15)
+
+    # Adiciona logo
+    adicionar_logo(pdf)
+
+    # Título
+    pdf.set_font('Arial', 'B', 16)
+    pdf.cell(0, 30, "EXTRATO CONSOLIDADO PRODUTIVIDADE", 0, 1, 'C')
+
+    # Informações do cabeçalho
+    pdf.set_font('Arial', '', 12)
+    pdf.cell(0, 10, f"Agente de Fiscalização: {fiscal}", 0, 1)
+    pdf.cell(0, 10, f"Período: {data_inicio} a {data_fim}", 0, 1)
+    pdf.ln(10)
+
+    # Dados consolidados
+    pdf.set_font('Arial', 'B', 14)
+    pdf.cell(0, 10, "RESUMO GERAL", 0, 1, 'C')
+    pdf.ln(5)
+
+    # Adiciona os totais ao PDF (começando com TOTAL AÇÕES)
+    pdf.set_font('Arial', 'B', 12)
+    for rotulo, valor in totais_consolidados(df_vs, df_ra, df_pp):
+        pdf.cell(0, 10, f"{rotulo}: {valor}", 0, 1)
+    pdf.ln(15)
+
+    # Filtra apenas arquivos com informações complementares entre parênteses
+    df_ic_filtrado = df_ic[df_ic['Informações'] != '']
+
+    if not df_ic_filtrado.empty:
+        # Informações complementares (apenas para arquivos com dados entre parênteses)
+        pdf.set_font('Arial', 'B', 14)
+        pdf.cell(0, 10, "INFORMAÇÕES COMPLEMENTARES:", 0, 1)
+        pdf.ln(5)
+
+        linhas = df_ic_filtrado[['Arquivo', 'Informações']].itertuples(index=False, name=None)
+        desenhar_tabela(
+            pdf, COLUNAS_INFORMACOES, linhas, altura_linha=6,
+            fonte=('Arial', '', 10), fonte_cabecalho=('Arial', 'B', 10)
+        )
+
+    # Data de geração
+    pdf.ln(10)
+    pdf.set_font('Arial', 'I', 10)
+    pdf.cell(0, 10, f"Gerado em: {datetime.now().strftime('%d/%m/%Y %H:%M')}", 0, 0, 'C')
+
+    return pdf.output(dest='S').encode('latin1')
+
+# =================== EXCEL CONSOLIDADO ===================
+COLUNAS_EXCEL = {
+    'vs': ['Arquivo', 'Vínculos', 'S.I'],
+    'ra': ['Arquivo', 'Ramo', 'Qtd'],
+    'pp': ['Arquivo', 'Fiscal', 'Protocolo', 'Legalização', 'Qtd. Protocolo', 'Qtd. Legalização'],
+    'ic': ['Arquivo', 'Informações'],
+}
+
+def _valor_excel(valor):
+    """
+    Converte valores ausentes (NaN) em células vazias e remove dos textos os
+    caracteres de controle que o openpyxl recusa (vindos do texto dos PDFs)
+    """
+    if isinstance(valor, str):
+        return ILLEGAL_CHARACTERS_RE.sub('', valor)
+    return None if valor is None or (isinstance(valor, float) and valor != valor) else valor
+
+def _escrever_planilha(wb, titulo, colunas, linhas, totais=None, larguras=None):
+    """
+    Acrescenta uma planilha no modo de escrita contínua: cada linha é
+    gravada assim que é recebida e não fica retida na memória.
+    """
+    ws = wb.create_sheet(titulo)
+    for i, largura in enumerate(larguras or [], start=1):
+        ws.column_dimensions[get_column_letter(i)].width = largura
+    ws.freeze_panes = 'A2'
+
+    negrito = Font(bold=True)
+
+    def linha_negrito(valores):
+        celulas = []
+        for valor in valores:
+            celula = WriteOnlyCell(ws, _valor_excel(valor))
+            celula.font = negrito
+            celulas.append(celula)
+        return celulas
+
+    ws.append(linha_negrito(colunas))
+    for linha in linhas:
+        ws.append([_valor_excel(v) for v in linha])
+    if totais is not None:
+        ws.append(linha_negrito(totais))
+    return ws
+
+def gerar_excel_consolidado(df_vs, df_ra, df_pp, df_ic, fiscal, data_inicio, data_fim):
+    """
+    Gera o Excel Consolidado: uma planilha de resumo e uma por módulo.
+    A pasta de trabalho é escrita em modo contínuo (write-only) direto em
+    memória, de modo que o consumo não cresce com o número de linhas.
+    """
+    wb = Workbook(write_only=True)
+
+    # Resumo: cabeçalho, totais e ranking de ramos
+    ws = wb.create_sheet("Resumo")
+    ws.column_dimensions['A'].width = 45
+    ws.column_dimensions['B'].width = 18
+    ws.column_dimensions['C'].width = 14
+    negrito = Font(bold=True)
+    titulo = WriteOnlyCell(ws, "EXTRATO CONSOLIDADO PRODUTIVIDADE")
+    titulo.font = Font(bold=True, size=14)
+    ws.append([titulo])
+    ws.append(["Agente de Fiscalização", _valor_excel(fiscal)])
+    ws.append(["Período", f"{data_inicio} a {data_fim}"])
+    ws.append(["Gerado em", datetime.now().strftime('%d/%m/%Y %H:%M')])
+    ws.append([])
+    for rotulo, valor in totais_consolidados(df_vs, df_ra, df_pp):
+        celula = WriteOnlyCell(ws, rotulo)
+        celula.font = negrito
+        ws.append([celula, _valor_excel(valor)])
+
+    ranking = ranking_ramos(df_ra)
+    if not ranking.empty:
+        ws.append([])
+        cabecalho = []
+        for texto in ("RAMO DE ATIVIDADE", "QUANTIDADE", "PORCENTAGEM"):
+            celula = WriteOnlyCell(ws, texto)
+            celula.font = negrito
+            cabecalho.append(celula)
+        ws.append(cabecalho)
+        for ramo, qtd, porcentagem in ranking.itertuples(index=False):
+            celula = WriteOnlyCell(ws, porcentagem / 100)
+            celula.number_format = '0.0%'
+            ws.append([_valor_excel(ramo), int(qtd), celula])
+
+    total_vs = df_vs[df_vs['Arquivo'] == 'TOTAL'].iloc[0]
+    _escrever_planilha(
+        wb, "Vínculos e S.I", COLUNAS_EXCEL['vs'],
+        df_vs.loc[df_vs['Arquivo'] != 'TOTAL', COLUNAS_EXCEL['vs']].itertuples(index=False, name=None),
+        totais=('TOTAL GERAL', total_vs['Vínculos'], total_vs['S.I']), larguras=[60, 12, 12]
+    )
+    _escrever_planilha(
+        wb, "Ramo de Atividade", COLUNAS_EXCEL['ra'],
+        df_ra[COLUNAS_EXCEL['ra']].itertuples(index=False, name=None),
+        totais=('TOTAL GERAL', '', int(df_ra['Qtd'].sum())), larguras=[60, 50, 10]
+    )
+    total_pp = df_pp[df_pp['Arquivo'] == 'TOTAL GERAL'].iloc[0]
+    _escrever_planilha(
+        wb, "Processo-Protocolo", COLUNAS_EXCEL['pp'],
+        df_pp.loc[df_pp['Arquivo'] != 'TOTAL GERAL', COLUNAS_EXCEL['pp']].itertuples(index=False, name=None),
+        totais=('TOTAL GERAL', '', '', '', total_pp['Qtd. Protocolo'], total_pp['Qtd. Legalização']),
+        larguras=[60, 30, 40, 60, 15, 17]
+    )
+    _escrever_planilha(
+        wb, "Informações Complementares", COLUNAS_EXCEL['ic'],
+        df_ic[COLUNAS_EXCEL['ic']].itertuples(index=False, name=None), larguras=[60, 120]
+    )
+
+    buffer = BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+# =================== PLANILHAS DE AUTUAÇÕES ===================
+def gerar_excel_autuacoes(colunas, linhas, totais):
+    """
+    Gera o Excel da consolidação de uma planilha de autuações: uma linha por
+    grupo e a linha de total geral (`totais` por nome de coluna).
+    """
+    wb = Workbook(write_only=True)
+    total = [totais.get(coluna, '') for coluna in colunas]
+    if colunas and colunas[0] not in totais:
+        total[0] = 'TOTAL GERAL'
+    _escrever_planilha(wb, "Consolidado", colunas, linhas, totais=total, larguras=[40] * len(colunas))
+    buffer = BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+# =================== EXTRATOS POR FISCAL ===================
+def nome_arquivo_fiscal(fiscal):
+    """Nome de arquivo seguro (ASCII) para o extrato de um fiscal"""
+    ascii_ = unicodedata.normalize('NFKD', fiscal).encode('ascii', 'ignore').decode('ascii')
+    return f"extrato_{re.sub(r'[^A-Za-z0-9]+', '_', ascii_).strip('_').lower() or 'fiscal'}.pdf"
+
+def _gerar_extrato_particao(particao):
+    """Renderiza o extrato de uma partição de particionar_por_fiscal"""
+    return gerar_extrato_consolidado(
+        particao['df_vs'], particao['df_ra'], particao['df_pp'], particao['df_ic'],
+        particao['fiscal'], particao['data_inicio'], particao['data_fim']
+    )
+
+def _extratos_renderizados(particoes, executor):
+    """
+    Gera (partição, PDF) à medida que cada extrato fica pronto. Com um
+    executor, as partições (já ordenadas da maior para a menor) são
+    renderizadas em paralelo; se o pool estiver quebrado, no próprio processo.
+    """
+    if executor is not None and len(particoes) > 1:
+        try:
+            futuros = {executor.submit(_gerar_extrato_particao, p): p for p in particoes}
+        except BrokenProcessPool:
+            futuros = None
+        if futuros is not None:
+            try:
+                for futuro in as_completed(futuros):
+                    particao = futuros[futuro]
+                    try:
+                        pdf = futuro.result()
+                    except BrokenProcessPool:
+                        pdf = _gerar_extrato_particao(particao)
+                    yield particao, pdf
+            finally:
+                for futuro in futuros:
+                    futuro.cancel()
+            return
+    for particao in particoes:
+        yield particao, _gerar_extrato_particao(particao)
+
+def gerar_zip_extratos_por_fiscal(df_vs, df_ra, df_pp, df_ic, executor=None):
+    """
+    Gera um Extrato Consolidado por Agente de Fiscalização, cada um com o
+    período das suas próprias datas, e os grava em um único ZIP à medida
+    que ficam prontos. Com um executor de processos, o tempo total fica
+    próximo ao da maior partição.
+    """
+    particoes = particionar_por_fiscal(df_vs, df_ra, df_pp, df_ic)
+    nomes, usados = {}, set()
+    for particao in particoes:
+        nome = nome_arquivo_fiscal(particao['fiscal'])
+        base, sufixo = nome[:-4], 2
+        while nome in usados:
+            nome, sufixo = f"{base}_{sufixo}.pdf", sufixo + 1
+        usados.add(nome)
+        nomes[particao['fiscal']] = nome
+
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for particao, pdf in _extratos_renderizados(particoes, executor):
+            zf.writestr(nomes[particao['fiscal']], pdf)
+    return buffer.getvalue()
@@ -0,0 +1,192 @@
+"""
+Renderização de tabelas em PDF (FPDF) para os relatórios.
+
+Cada tabela é descrita por uma lista de colunas (título, largura, alinhamento,
+quebra) e recebe as linhas como tuplas. A altura de cada célula com quebra
+de texto é medida uma única vez, a partir da tabela de larguras da fonte, e
+as páginas são montadas em uma só passada, repetindo o cabeçalho em cada
+página. Linhas maiores que uma página são continuadas na página seguinte.
+"""
+from itertools import repeat
+
+FONTE_CABECALHO = ('Arial', 'B', 8)
+FONTE_LINHAS = ('Arial', '', 8)
+FONTE_TOTAIS = ('Arial', 'B', 8)
+
+# =================== MEDIÇÃO ===================
+def _medidor(pdf):
+    """Retorna uma função que mede a largura de um texto na fonte atual"""
+    larguras = pdf.current_font['cw']
+    escala = pdf.font_size / 1000.0
+    memoria = {}
+
+    def medir(texto):
+        largura = memoria.get(texto)
+        if largura is None:
+            largura = sum(map(larguras.get, texto, repeat(0))) * escala
+            if len(memoria) < 50000:
+                memoria[texto] = largura
+        return largura
+    return medir
+
+def _cortar_palavra(palavra, largura, medir):
+    """Divide uma palavra maior que a coluna em pedaços que cabem nela"""
+    pedacos, atual, largura_atual = [], '', 0.0
+    for c in palavra:
+        w = medir(c)
+        if atual and largura_atual + w > largura:
+            pedacos.append(atual)
+            atual, largura_atual = '', 0.0
+        atual += c
+        largura_atual += w
+    pedacos.append(atual)
+    return pedacos
+
+def quebrar_texto(texto, largura, medir):
+    """Divide o texto em linhas que cabem na largura, quebrando entre palavras"""
+    linhas = []
+    espaco = medir(' ')
+    for paragrafo in texto.split('\n'):
+        atual, largura_atual = '', 0.0
+        for palavra in paragrafo.split(' '):
+            w = medir(palavra)
+            if not atual:
+                candidata = w
+            else:
+                candidata = largura_atual + espaco + w
+            if candidata <= largura:
+                atual = f"{atual} {palavra}" if atual else palavra
+                largura_atual = candidata
+                continue
+            if atual:
+                linhas.append(atual)
+            if w > largura:
+                *completos, palavra = _cortar_palavra(palavra, largura, medir)
+                linhas.extend(completos)
+                w = medir(palavra)
+            atual, largura_atual = palavra, w
+        linhas.append(atual)
+    return linhas
+
+def truncar_texto(texto, largura, medir):
+    """Corta o texto com reticências para caber em uma única linha"""
+    if medir(texto) <= largura:
+        return texto
+    limite = largura - medir('...')
+    largura_atual = 0.0
+    for i, c in enumerate(texto):
+        largura_atual += medir(c)
+        if largura_atual > limite:
+            return texto[:i] + '...'
+    return texto
+
+# =================== DESENHO ===================
+def desenhar_tabela(pdf, colunas, linhas, totais=None, altura_linha=6,
+                    fonte=FONTE_LINHAS, fonte_cabecalho=FONTE_CABECALHO, fonte_totais=FONTE_TOTAIS):
+    """
+    Desenha uma tabela a partir da posição atual do PDF.
+
+    colunas: lista de (título, largura, alinhamento, quebra). Colunas com
+    quebra=True distribuem o texto em várias linhas; as demais são truncadas.
+    linhas: iterável de tuplas com um valor por coluna (percorrido uma vez).
+    totais: tupla opcional desenhada ao final com a fonte de totais.
+    """
+    titulos = [c[0] for c in colunas]
+    larguras = [c[1] for c in colunas]
+    alinhamentos = [c[2] for c in colunas]
+    quebras = [c[3] for c in colunas]
+    margem = pdf.c_margin
+    uteis = [w - 2 * margem for w in larguras]
+    x_inicial = pdf.l_margin
+    limite = pdf.h - pdf.b_margin
+
+    # A paginação é feita aqui; a quebra automática do FPDF fica suspensa
+    quebra_automatica, margem_quebra = pdf.auto_page_break, pdf.b_margin
+    pdf.set_auto_page_break(False)
+
+    # Operadores da página atual, enviados ao FPDF de uma só vez
+    k, altura_folha = pdf.k, pdf.h
+    operadores = []
+
+    def descarregar():
+        if operadores:
+            pdf._out('\n'.join(operadores))
+            operadores.clear()
+
+    def retangulo(x, y, w, h):
+        operadores.append(f"{x * k:.2f} {(altura_folha - y) * k:.2f} {w * k:.2f} {-h * k:.2f} re S")
+
+    def texto_celula(x, y, w, h, texto, alinhamento, medir):
+        if not texto:
+            return
+        if alinhamento == 'C':
+            dx = (w - medir(texto)) / 2
+        elif alinhamento == 'R':
+            dx = w - margem - medir(texto)
+        else:
+            dx = margem
+        base = altura_folha - (y + .5 * h + .3 * pdf.font_size)
+        operador = f"BT {(x + dx) * k:.2f} {base * k:.2f} Td ({pdf._escape(texto)}) Tj ET"
+        operadores.append(f"q {pdf.text_color} {operador} Q" if pdf.color_flag else operador)
+
+    def cabecalho():
+        pdf.set_font(*fonte_cabecalho)
+        pdf.set_x(x_inicial)
+        for titulo, w in zip(titulos, larguras):
+            pdf.cell(w, altura_cabecalho, titulo, 1, 0, 'C')
+        pdf.ln()
+
+    def nova_pagina(estilo):
+        descarregar()
+        pdf.add_page()
+        cabecalho()
+        pdf.set_font(*estilo)
+
+    def desenhar_linha(valores, medir, estilo):
+        celulas = []
+        for valor, w, quebra in zip(valores, uteis, quebras):
+            texto = '' if valor is None else str(valor)
+            celulas.append(quebrar_texto(texto, w, medir) if quebra else [truncar_texto(texto, w, medir)])
+
+        inicio, total_linhas = 0, max(len(c) for c in celulas)
+        # Uma linha que cabe em uma página nova não é dividida
+        altura_total = total_linhas * altura_linha
+        if pdf.y + altura_total > limite and altura_total <= altura_pagina:
+            nova_pagina(estilo)
+        while inicio < total_linhas:
+            parte = min(total_linhas - inicio, max(1, int((limite - pdf.y) // altura_linha)))
+            altura = parte * altura_linha
+            y, x = pdf.y, x_inicial
+            for texto, w, alinhamento, quebra in zip(celulas, larguras, alinhamentos, quebras):
+                retangulo(x, y, w, altura)
+                if quebra:
+                    for i, linha in enumerate(texto[inicio:inicio + parte]):
+                        texto_celula(x, y + i * altura_linha, w, altura_linha, linha, alinhamento, medir)
+                elif inicio == 0:
+                    # Texto de uma linha, centralizado verticalmente na célula
+                    texto_celula(x, y, w, altura, texto[0], alinhamento, medir)
+                x += w
+            pdf.set_xy(x_inicial, y + altura)
+            inicio += parte
+            if inicio < total_linhas:
+                nova_pagina(estilo)
+
+    altura_cabecalho = altura_linha + 2
+    altura_pagina = limite - pdf.t_margin - altura_cabecalho
+    if pdf.get_y() + altura_cabecalho + altura_linha > limite:
+        pdf.add_page()
+    cabecalho()
+    pdf.set_font(*fonte)
+    medir = _medidor(pdf)
+    for valores in linhas:
+        desenhar_linha(valores, medir, fonte)
+
+    if totais is not None:
+        # set_font escreve direto na página: as linhas pendentes saem antes, com a fonte delas
+        descarregar()
+        pdf.set_font(*fonte_totais)
+        desenhar_linha(totais, _medidor(pdf), fonte_totais)
+
+    descarregar()
+
+    pdf.set_auto_page_break(quebra_automatica, margem_quebra)
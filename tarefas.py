@@ -0,0 +1,172 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from extracao import BACKEND_PADRAO, renomear_resultado
+from ingestao import iterar_documentos
+
+NA_FILA = 'na fila'
+EM_EXECUCAO = 'em execução'
+CONCLUIDA = 'concluída'
+CANCELADA = 'cancelada'
+FALHOU = 'falhou'
+ESTADOS_FINAIS = (CONCLUIDA, CANCELADA, FALHOU)
+
+# =================== TAREFAS ===================
+class Tarefa:
+    """
+    Uma extração em segundo plano. O estado, os contadores de progresso e os
+    dados parciais (em `dados`) são atualizados pela thread da tarefa e
+    lidos pela interface a cada consulta.
+    """
+
+    def __init__(self, total):
+        self.id = uuid.uuid4().hex[:12]
+        self.estado = NA_FILA
+        self.criada_em = time.time()
+        self.iniciada_em = None
+        self.concluida_em = None
+        self.total = total
+        self.processados = 0
+        self.falha = None
+        self.dados = {}
+        self._cancelar = threading.Event()
+        self._futuro = None
+
+    @property
+    def cancelada(self):
+        """Indica se o cancelamento foi solicitado"""
+        return self._cancelar.is_set()
+
+    @property
+    def finalizada(self):
+        return self.estado in ESTADOS_FINAIS
+
+    def duracao(self):
+        """Segundos em execução até agora (ou até o fim)"""
+        if self.iniciada_em is None:
+            return 0.0
+        return (self.concluida_em or time.time()) - self.iniciada_em
+
+class FilaTarefas:
+    """
+    Fila de tarefas do processo, compartilhada por todas as sessões: no
+    máximo `simultaneas` tarefas executam ao mesmo tempo e as demais
+    aguardam na ordem de envio. As tarefas continuam em execução quando a
+    página é recarregada ou o script é reexecutado, e as finalizadas ficam
+    disponíveis por `retencao` segundos.
+    """
+
+    def __init__(self, simultaneas, retencao=3600):
+        self.simultaneas = simultaneas
+        self.retencao = retencao
+        self._executor = ThreadPoolExecutor(max_workers=simultaneas, thread_name_prefix='tarefa-extracao')
+        self._tarefas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submeter(self, funcao, total, *args, **kwargs):
+        """Enfileira funcao(tarefa, *args, **kwargs) e devolve a tarefa criada"""
+        tarefa = Tarefa(total)
+        with self._lock:
+            self._remover_expiradas()
+            self._tarefas[tarefa.id] = tarefa
+        tarefa._futuro = self._executor.submit(self._executar, tarefa, funcao, args, kwargs)
+        return tarefa
+
+    def _executar(self, tarefa, funcao, args, kwargs):
+        if tarefa.cancelada:
+            tarefa.estado, tarefa.concluida_em = CANCELADA, time.time()
+            return
+        tarefa.estado, tarefa.iniciada_em = EM_EXECUCAO, time.time()
+        try:
+            funcao(tarefa, *args, **kwargs)
+            tarefa.estado = CANCELADA if tarefa.cancelada else CONCLUIDA
+        except Exception as e:
+            tarefa.falha = f"{type(e).__name__}: {e}"
+            tarefa.estado = FALHOU
+        finally:
+            tarefa.concluida_em = time.time()
+
+    def obter(self, tarefa_id):
+        """Tarefa pelo ID (None se desconhecida ou expirada)"""
+        with self._lock:
+            return self._tarefas.get(tarefa_id)
+
+    def cancelar(self, tarefa_id):
+        """Solicita o cancelamento; uma tarefa ainda na fila nem chega a iniciar"""
+        tarefa = self.obter(tarefa_id)
+        if tarefa is None or tarefa.finalizada:
+            return False
+        tarefa._cancelar.set()
+        if tarefa._futuro.cancel():
+            tarefa.estado, tarefa.concluida_em = CANCELADA, time.time()
+        return True
+
+    def ativas(self):
+        """Número de tarefas em execução e na fila"""
+        with self._lock:
+            estados = [t.estado for t in self._tarefas.values()]
+        return estados.count(EM_EXECUCAO), estados.count(NA_FILA)
+
+    def _remover_expiradas(self):
+        limite = time.time() - self.retencao
+        for tarefa_id in [i for i, t in self._tarefas.items() if t.finalizada and t.concluida_em < limite]:
+            del self._tarefas[tarefa_id]
+
+# =================== EXTRAÇÃO EM SEGUNDO PLANO ===================
+def extrair_documentos(tarefa, documentos, cache, versao, pool=None, temp_dir=None,
+                       backend=BACKEND_PADRAO, podar=False, janela=None, diagnostico=None,
+                       manter_texto=True, memoria=None, guardar_registros=False):
+    """
+    Tarefa de extração: percorre iterar_documentos acumulando em
+    tarefa.dados os registros de cada módulo ('vs', 'ra', 'pp', 'ic'), as
+    datas e fiscais dos relatórios, os detalhes por arquivo e os erros. Com
+    guardar_registros, acumula também os pares (hash, módulos) para o
+    histórico, sem o texto do PDF. Para no próximo documento se a tarefa
+    for cancelada.
+    """
+    dados = tarefa.dados
+    dados.update({
+        'vs': [], 'ra': [], 'pp': [], 'ic': [], 'registros': [], 'datas': [], 'fiscais': set(),
+        'detalhes': [], 'erros': dados.get('erros', []), 'lidos_cache': 0
+    })
+    processamento = iterar_documentos(
+        documentos, cache, versao, pool, temp_dir, backend, podar, janela, diagnostico, manter_texto
+    )
+    try:
+        for nome, hash_conteudo, resultado, do_cache in processamento:
+            if diagnostico:
+                diagnostico.registrar_arquivo(nome, resultado, do_cache)
+            if memoria:
+                memoria.medir()
+
+            if 'erro' in resultado:
+                dados['erros'].append({'Arquivo': nome, 'Erro': resultado['erro']})
+            else:
+                dados['detalhes'].append({
+                    'Arquivo': nome,
+                    'Backend': resultado.get('backend', ''),
+                    'Tempo (s)': round(resultado.get('tempo', 0.0), 3),
+                    'Páginas lidas': resultado.get('paginas', 0),
+                    'Páginas': resultado.get('paginas_total', 0),
+                    'Cache': 'Sim' if do_cache else 'Não'
+                })
+                resultado = renomear_resultado(resultado, nome)
+                if guardar_registros:
+                    dados['registros'].append((hash_conteudo, {m: resultado[m] for m in ('vs', 'ra', 'pp', 'ic')}))
+                for modulo in ('vs', 'ra', 'pp', 'ic'):
+                    dados[modulo].append(resultado[modulo])
+
+                # Data do relatório e fiscal para o extrato consolidado (já extraídos em Processo/Protocolo)
+                if resultado['pp']['Data Relatório']:
+                    dados['datas'].append(resultado['pp']['Data Relatório'])
+                if resultado['pp']['Fiscal']:
+                    dados['fiscais'].add(resultado['pp']['Fiscal'])
+
+            dados['lidos_cache'] += do_cache
+            tarefa.processados += 1
+            if tarefa.cancelada:
+                break
+    finally:
+        processamento.close()  # Cancela os arquivos ainda não iniciados no pool
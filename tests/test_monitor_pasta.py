@@ -0,0 +1,81 @@
+"""
+Ingestão da pasta monitorada: um relatório regravado com outro conteúdo
+substitui o registro da versão anterior no histórico.
+
+Uso:
+    python -m pytest -q tests
+"""
+import os
+import shutil
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fpdf import FPDF
+from historico import HistoricoExtracoes
+from monitor_pasta import IndiceArquivos, MonitorPasta, _assinatura
+
+def gravar_relatorio(caminho, data, mtime):
+    """Grava um relatório mínimo com a data informada e fixa o seu mtime"""
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font('Arial', '', 10)
+    for linha in (
+        f"Data Relatório: {data}",
+        "Agente de Fiscalização: FISCAL TESTE",
+        "Fato Gerador: PROCESSO/PROTOCOLO - 2025123456",
+        "01 - Endereço Empreendimento",
+        "Rua Exemplo, Centro",
+        "02 - Descritivo",
+        "04 - Identificação",
+        "CONTRATADO: EMPRESA EXEMPLO",
+        "RESPONSAVEL TECNICO: ENGENHEIRO EXEMPLO",
+        "Ramo Atividade: ENGENHARIA CIVIL",
+        "05 - Documentos Solicitados",
+        "06 - Documentos Recebidos",
+        "OUTROS: ART registrada",
+        "07 - Outras Informações",
+        "Informações Complementares: (exemplo)",
+        "08 - Registro Fotográfico",
+    ):
+        pdf.cell(0, 6, linha, 0, 1)
+    pdf.output(caminho)
+    os.utime(caminho, (mtime, mtime))
+
+def criar_monitor(pasta):
+    historico = HistoricoExtracoes(os.path.join(pasta, "historico.sqlite"))
+    indice = IndiceArquivos(os.path.join(pasta, "indice.sqlite"))
+    return MonitorPasta(os.path.join(pasta, "entrada"), indice, historico, espera=0)
+
+def ingerir(monitor, *caminhos):
+    monitor.ingerir([(caminho, _assinatura(caminho)) for caminho in caminhos])
+
+def test_arquivo_regravado_substitui_o_registro(tmp_path):
+    monitor = criar_monitor(str(tmp_path))
+    os.makedirs(monitor.raiz)
+    caminho = os.path.join(monitor.raiz, "relatorio.pdf")
+
+    gravar_relatorio(caminho, "10/03/2025", 1_700_000_000)
+    ingerir(monitor, caminho)
+    gravar_relatorio(caminho, "11/03/2025", 1_700_000_100)
+    ingerir(monitor, caminho)
+
+    registros = monitor.historico.consultar()
+    assert len(registros) == 1
+    assert registros[0]['pp']['Data Relatório'] == "11/03/2025"
+    assert len(monitor.historico.ramos()) == 1
+
+def test_conteudo_ainda_em_outro_caminho_e_mantido(tmp_path):
+    monitor = criar_monitor(str(tmp_path))
+    os.makedirs(monitor.raiz)
+    caminho = os.path.join(monitor.raiz, "relatorio.pdf")
+    copia = os.path.join(monitor.raiz, "copia.pdf")
+
+    gravar_relatorio(caminho, "10/03/2025", 1_700_000_000)
+    shutil.copy2(caminho, copia)
+    ingerir(monitor, caminho, copia)
+    gravar_relatorio(caminho, "11/03/2025", 1_700_000_100)
+    ingerir(monitor, caminho)
+
+    datas = sorted(r['pp']['Data Relatório'] for r in monitor.historico.consultar())
+    assert datas == ["10/03/2025", "11/03/2025"]